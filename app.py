@@ -1,19 +1,42 @@
+import argparse
+import importlib
+import sys
 import streamlit as st
-from data_processing.data_manager import DataManager
-from data_processing.sample_data_generator import generate_sample_data
-import components.data_management as dm
-import components.export as export
-import components.insights as insights
-import components.overview as overview
-import components.campaigns as campaigns
-import components.influencers as influencers
-import components.roas_calculator as roas_calculator
-import components.payouts as payouts
-# ... import other components as they are implemented
+from data_processing.data_manager import DEFAULT_BACKEND, DataManager
+from data_processing.sql_backend import BACKENDS
+from components.debug_panel import debug_recorder, show_debug_panel
+from utils.instrumentation import recording, trace_methods
+
+# Sidebar label -> (module, function) rendering the page. Page modules, and
+# plotly, openpyxl and ReportLab with them, are imported when their page is
+# first opened rather than on startup; Python keeps them loaded after that.
+PAGES = {
+    "🏠 Home & Guide": None,
+    "📁 Data Management": ('components.data_management', 'show_data_management'),
+    "📊 Overview Dashboard": ('components.overview', 'show_overview'),
+    "📈 Campaign Performance": ('components.campaigns', 'show_campaign_performance'),
+    "👥 Influencer Analytics": ('components.influencers', 'show_influencers'),
+    "💰 ROAS Calculator": ('components.roas_calculator', 'show_roas_calculator'),
+    "💳 Payout Tracker": ('components.payouts', 'show_payouts'),
+    "💡 Automated Insights": ('components.insights', 'show_insights'),
+    "📤 Export Data": ('components.export', 'show_export_data'),
+}
+
+# Trace the data manager's steps for the debug panel; accessors called many
+# times per render are left out to keep the recording readable
+trace_methods('data', exclude=('table_source', 'row_count', 'data_key', '_current', '_attach', '_seed'))(DataManager)
+
+def startup_backend():
+    """Data backend chosen at startup: `streamlit run app.py -- --backend sql` or ANALYTICS_BACKEND"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND)
+    args, _ = parser.parse_known_args(sys.argv[1:])
+    return args.backend
+
 
 def initialize_session_state():
     if 'data_manager' not in st.session_state:
-        st.session_state.data_manager = DataManager()
+        st.session_state.data_manager = DataManager(backend=startup_backend())
     if 'data_loaded' not in st.session_state:
         st.session_state.data_loaded = False
 
@@ -156,20 +179,7 @@ def main():
     
     # Enhanced sidebar with better organization
     st.sidebar.markdown("### 🧭 **Navigation**")
-    page = st.sidebar.selectbox(
-        "Choose a section:",
-        [
-            "🏠 Home & Guide",
-            "📁 Data Management", 
-            "📊 Overview Dashboard",
-            "📈 Campaign Performance",
-            "👥 Influencer Analytics",
-            "💰 ROAS Calculator",
-            "💳 Payout Tracker",
-            "💡 Automated Insights",
-            "📤 Export Data"
-        ]
-    )
+    page = st.sidebar.selectbox("Choose a section:", list(PAGES))
     
     # Add data status indicator in sidebar
     st.sidebar.markdown("---")
@@ -180,7 +190,7 @@ def main():
         **Data Summary:**
         - 👥 {len(dm_obj.influencers_df)} Influencers
         - 📝 {len(dm_obj.posts_df)} Posts  
-        - 📊 {len(dm_obj.tracking_df)} Tracking Records
+        - 📊 {dm_obj.row_count('tracking')} Tracking Records
         - 💳 {len(dm_obj.payouts_df)} Payouts
         """)
     else:
@@ -201,25 +211,21 @@ def main():
     for tip in tips:
         st.sidebar.markdown(f"• {tip}")
     
-    # Route to appropriate page
-    if page == "🏠 Home & Guide":
+    st.sidebar.markdown("---")
+    recorder = debug_recorder()
+    with recording(recorder):
+        route(page)
+    show_debug_panel(recorder)
+
+
+def route(page):
+    """Render the selected page, importing its module on first use"""
+    target = PAGES[page]
+    if target is None:
         show_tool_description()
-    elif page == "📁 Data Management":
-        dm.show_data_management()
-    elif page == "📊 Overview Dashboard":
-        overview.show_overview()
-    elif page == "📈 Campaign Performance":
-        campaigns.show_campaign_performance()
-    elif page == "👥 Influencer Analytics":
-        influencers.show_influencers()
-    elif page == "💰 ROAS Calculator":
-        roas_calculator.show_roas_calculator()
-    elif page == "💳 Payout Tracker":
-        payouts.show_payouts()
-    elif page == "💡 Automated Insights":
-        insights.show_insights()
-    elif page == "📤 Export Data":
-        export.show_export_data()
+        return
+    module, function = target
+    getattr(importlib.import_module(module), function)()
 
 if __name__ == "__main__":
     main()
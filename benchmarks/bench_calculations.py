@@ -0,0 +1,78 @@
+"""
+Microbenchmark: row-wise apply vs array kernels in utils/calculations
+
+Run with: python -m benchmarks.bench_calculations [--rows 1000000]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.calculations import (
+    calculate_roas, calculate_roas_array,
+    calculate_engagement_rate, calculate_engagement_rate_array,
+)
+
+
+def make_posts(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    reach = rng.integers(0, 100_000, rows)
+    likes = (reach * rng.uniform(0.01, 0.1, rows)).astype('int64')
+    return pd.DataFrame({
+        'reach': reach,
+        'likes': likes,
+        'comments': (likes * rng.uniform(0.05, 0.2, rows)).astype('int64'),
+        'revenue': rng.uniform(0, 20_000, rows).round(2),
+        'total_payout': rng.choice([0.0, 500.0, 1500.0], rows),
+    })
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(rows: int, repeat: int = 3) -> list:
+    posts = make_posts(rows)
+    cases = [
+        (
+            'engagement_rate',
+            lambda: posts.apply(lambda x: calculate_engagement_rate(x['likes'], x['comments'], x['reach']), axis=1),
+            lambda: calculate_engagement_rate_array(posts['likes'], posts['comments'], posts['reach']),
+        ),
+        (
+            'roas',
+            lambda: posts.apply(lambda x: calculate_roas(x['revenue'], x['total_payout']), axis=1),
+            lambda: calculate_roas_array(posts['revenue'], posts['total_payout']),
+        ),
+    ]
+    results = []
+    for name, row_wise, vectorized in cases:
+        # Row-wise apply is slow enough that one run is representative
+        apply_seconds = best_of(row_wise, 1)
+        array_seconds = best_of(vectorized, repeat)
+        results.append({
+            'kernel': name,
+            'rows': rows,
+            'apply_seconds': apply_seconds,
+            'array_seconds': array_seconds,
+            'speedup': apply_seconds / array_seconds,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    for result in run(args.rows, args.repeat):
+        print(f"{result['kernel']:<16} rows={result['rows']:,}  apply={result['apply_seconds']:.3f}s  "
+              f"array={result['array_seconds']:.4f}s  speedup={result['speedup']:,.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Benchmark suite for the compute path behind every dashboard page
+
+Times the data work each page does (no Streamlit rendering) on synthetic
+datasets at several tracking-table sizes, records peak traced memory per
+case, and writes the results as JSON. Given a stored baseline it exits
+non-zero when any case regresses past the threshold.
+
+    python -m benchmarks.bench_pages --rows 10000 1000000 --output bench.json
+    python -m benchmarks.bench_pages --baseline bench.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from components.campaigns import compute_campaign_performance
+from components.export import to_pdf_bytes, write_csv, write_excel
+from components.influencers import compute_category_bands, compute_conversion_funnel, compute_post_attribution
+from components.insights import compute_insights
+from components.overview import compute_overview
+from components.payouts import compute_payout_trends, filter_payouts_by_date
+from components.roas_calculator import compute_campaign_roas
+from data_processing.data_manager import DataManager
+from data_processing.registry import DatasetRegistry
+from data_processing.sample_data_generator import BASE_TRACKING_ROWS, generate_sample_data
+from data_processing.sketches import DistinctSketch
+from utils.calculations import analyze_influencer_performance
+from utils.filter_index import FilterIndex
+from utils.pdf_reports import write_pdf_report
+
+DEFAULT_ROWS = [10_000, 1_000_000, 10_000_000]
+# Excel rows are written one at a time, so the Excel case exports a fixed slice
+EXCEL_ROWS = 100_000
+REPORT_ROWS = 100_000
+END_DATE = date(2024, 12, 31)
+
+
+def prepare(rows: int, seed: int) -> dict:
+    """Synthetic raw tables for a tracking table of the given size"""
+    tables = generate_sample_data(scale=rows / BASE_TRACKING_ROWS, seed=seed, end_date=END_DATE)
+    return dict(zip(['influencers', 'posts', 'tracking', 'payouts'], tables))
+
+
+def loaded_manager(raw: dict, registry: DatasetRegistry = None) -> DataManager:
+    dm = DataManager(registry)
+    dm.set_data(raw['influencers'], raw['posts'], raw['tracking'], raw['payouts'])
+    return dm
+
+
+def campaign_filters(dm: DataManager):
+    sales = dm.cube.sales
+    index = FilterIndex(sales)
+    positions = index.select(
+        {'brand': index.options['brand'][0], 'platform': index.options['platform'][0]},
+        (index.date_min, index.date_max - pd.Timedelta(days=30)),
+    )
+    filtered = sales.iloc[positions]
+    return compute_campaign_performance(dm.cube, filtered, index.options['campaign'][0])
+
+
+def payout_range(dm: DataManager):
+    """A payment date range narrowed by a month at either end, as when dragging the date filter"""
+    dates = dm.payouts_df['payment_date']
+    return (dates.min() + pd.Timedelta(days=30)).date(), (dates.max() - pd.Timedelta(days=30)).date()
+
+
+def export_to_file(writer, df: pd.DataFrame, suffix: str, **kwargs):
+    """Stream df through an export writer into a temp file, as the export page does"""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        for _ in writer(df, path, **kwargs):
+            pass
+    finally:
+        os.remove(path)
+
+
+def cases(raw: dict, dm: DataManager) -> dict:
+    """Benchmark name -> zero-argument callable"""
+    cube = dm.cube
+    return {
+        # A fresh registry, so repeats parse and aggregate instead of hitting the shared copy
+        'load_and_build_cube': lambda: loaded_manager(raw, DatasetRegistry()),
+        'overview_kpis': lambda: compute_overview(cube, dm.influencers_df, dm.leaderboard('influencer_revenue')),
+        'campaign_filters_and_aggregates': lambda: campaign_filters(dm),
+        'influencer_performance': lambda: analyze_influencer_performance(dm.posts_df, cube.revenue_by('influencer_id'), cube.cost_by('influencer_id')),
+        'conversion_funnel': lambda: compute_conversion_funnel(dm.posts_df, cube, dm.tracking_df.columns),
+        'post_attribution': lambda: compute_post_attribution(dm.posts_df, dm.tracking_df, cube),
+        'buyer_sketch': lambda: DistinctSketch.from_events(dm.tracking_df),
+        'category_bands': lambda: compute_category_bands({name: dm.sketch(name) for name in ('roas', 'engagement', 'buyers')},
+                                                         dm.influencers_df, dm.influencers_df['id']),
+        'campaign_roas': lambda: compute_campaign_roas(cube),
+        'monthly_payouts': lambda: compute_payout_trends(dm.time_index('payouts'), dm.time_index('influencer_payouts'),
+                                                         dm.influencers_df, *payout_range(dm)),
+        'payout_date_filter': lambda: filter_payouts_by_date(
+            dm.payouts_df, *payout_range(dm),
+            dm.cached('payout_date_index', lambda: FilterIndex(dm.payouts_df, [], 'payment_date'))),
+        'insights': lambda: compute_insights(cube, dm.influencers_df, dm.leaderboard('influencer_roas'),
+                                             dm.leaderboard('campaign_revenue')),
+        'export_csv': lambda: export_to_file(write_csv, dm.tracking_df, '.csv'),
+        'export_excel': lambda: export_to_file(write_excel, dm.payouts_df.head(EXCEL_ROWS), '.xlsx', sheet_name='Payouts'),
+        'export_pdf': lambda: to_pdf_bytes(dm.tracking_df),
+        'pdf_report': lambda: export_to_file(write_pdf_report, dm.payouts_df.head(REPORT_ROWS), '.pdf', title='Payouts'),
+    }
+
+
+def measure(func, repeat: int) -> dict:
+    """Best wall time over repeat runs, then one traced run for peak memory"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': min(timings), 'median_seconds': float(np.median(timings)), 'peak_bytes': peak}
+
+
+def run_suite(rows_list, repeat: int = 3, seed: int = 0, only=None, log=print) -> dict:
+    results = []
+    for rows in rows_list:
+        log(f"Preparing {rows:,} tracking rows...")
+        raw = prepare(rows, seed)
+        dm = loaded_manager(raw)
+        for name, func in cases(raw, dm).items():
+            if only and name not in only:
+                continue
+            result = {'case': name, 'rows': rows, **measure(func, repeat)}
+            results.append(result)
+            log(f"  {name:<34} {result['seconds']:>9.4f}s  peak {result['peak_bytes'] / 2**20:>9.1f} MB")
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.platform(),
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def find_regressions(current: dict, baseline: dict, threshold: float, min_seconds: float = 0.005) -> list:
+    """Cases slower, or with higher peak memory, than baseline by more than threshold.
+
+    Cases faster than min_seconds in the baseline are too noisy to judge on time.
+    """
+    previous = {(r['case'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['case'], result['rows']))
+        if before is None:
+            continue
+        metrics = ['seconds', 'peak_bytes'] if before['seconds'] >= min_seconds else ['peak_bytes']
+        for metric in metrics:
+            if before[metric] and result[metric] > before[metric] * (1 + threshold):
+                regressions.append(
+                    f"{result['case']} @ {result['rows']:,} rows: {metric} "
+                    f"{before[metric]:.4g} -> {result[metric]:.4g} "
+                    f"(+{result[metric] / before[metric] - 1:.0%})"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the compute path of every dashboard page")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="Tracking-table sizes")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--case', action='append', help="Only run the named case (repeatable)")
+    parser.add_argument('--output', default='bench_results.json', help="Where to write results JSON")
+    parser.add_argument('--baseline', help="Results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed relative slowdown, e.g. 0.25")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.rows, args.repeat, args.seed, args.case)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) past {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
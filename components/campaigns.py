@@ -1,9 +1,82 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
+from data_processing.cube import attach_influencer_attributes
 from data_processing.data_manager import DataManager
-from utils.visualizations import create_dynamic_filters
+from data_processing.sql_backend import SQLMetricsCube
+from utils.calculations import calculate_roas_array
+from utils.filter_index import FilterIndex
+from utils.visualizations import create_dynamic_filters, figure_key, filter_widgets, plot_line, plot_scatter, show_chart
+from utils.instrumentation import traced
 
+# Filters whose date-range totals a prefix-sum index answers on its own
+RANGE_TOTAL_INDEXES = {'campaign': 'campaign_sales', 'brand': 'brand_sales'}
+
+
+def range_totals(dm: DataManager, filters: dict):
+    """Orders and revenue of the filtered slice from the sales prefix sums.
+
+    None unless the selection is a date range plus at most one campaign or
+    brand; other combinations are summed from the filtered rows.
+    """
+    dates = filters.get('date_range')
+    if not (isinstance(dates, tuple) and len(dates) == 2):
+        dates = (None, None)
+    selected = {col: value for col, value in filters.items() if col != 'date_range' and value not in (None, 'All')}
+    if len(selected) > 1 or not set(selected) <= set(RANGE_TOTAL_INDEXES):
+        return None
+    if not selected:
+        return dm.time_index('sales').total(*dates)
+    (col, value), = selected.items()
+    return dm.time_index(RANGE_TOTAL_INDEXES[col]).total(*dates, key=value)
+
+
+def unique_buyers(dm: DataManager, filters: dict):
+    """Estimated distinct buyers of the filtered slice, merged from per-cell sketches.
+
+    None when tracking carries no user_id.
+    """
+    if 'user_id' not in dm.table_source('tracking').columns:
+        return None
+    sketch = dm.sketch('buyers')
+    # Sketch cells carry the sales keys; influencer attributes make the same filters apply
+    index = dm.cached('buyer_filter_index', lambda: FilterIndex(attach_influencer_attributes(sketch.cells, dm.influencers_df)))
+    dates = filters.get('date_range')
+    date_range = dates if isinstance(dates, tuple) and len(dates) == 2 else None
+    return sketch.estimate(index.select(filters, date_range))
+
+
+@traced
+def compute_campaign_performance(cube, filtered_df, campaign='All', totals=None) -> dict:
+    """Metrics and chart data for a filtered slice of the sales cube.
+
+    filtered_df is a slice of the cube's sales, or for the SQL backend a
+    SalesSelection (None for all rows). totals, when given, are the slice's
+    orders and revenue already summed (see range_totals).
+    """
+    # Filter payouts based on campaign filter
+    costs_df = cube.costs
+    if campaign != 'All':
+        costs_df = costs_df[costs_df['campaign'] == campaign]
+    if totals is None:
+        totals = cube.totals(filtered_df)
+    total_revenue = float(totals['revenue'])
+    total_cost = costs_df['total_payout'].sum()
+    # Performance by influencer, with cost per influencer merged in
+    perf_df = cube.revenue_by(['influencer_id', 'name'], filtered_df)
+    cost_df = cube.cost_by('influencer_id', costs_df)
+    perf_df = perf_df.merge(cost_df, on='influencer_id', how='left').fillna(0)
+    perf_df['roas'] = calculate_roas_array(perf_df['revenue'], perf_df['total_payout']).round(2)
+    return {
+        'total_orders': int(round(totals['orders'])),
+        'total_revenue': total_revenue,
+        'total_cost': total_cost,
+        'avg_roas': (total_revenue / total_cost) if total_cost > 0 else 0,
+        'influencers': perf_df,
+        'timeline': cube.revenue_by('date', filtered_df),
+        'platforms': cube.revenue_by('platform', filtered_df),
+    }
+
+@traced(category='page')
 def show_campaign_performance():
     st.title("📈 Campaign Performance")
     st.markdown("### Deep-dive into campaign metrics and ROI analysis")
@@ -15,7 +88,7 @@ def show_campaign_performance():
         st.markdown("""
         **This page provides:**
         - 🎯 Campaign filtering by date, brand, platform
-        - 📊 Performance metrics (orders, revenue, ROAS)
+        - 📊 Performance metrics (orders, revenue, ROAS, unique buyers)
         - 🔍 Influencer performance scatter plots
         - 📅 Timeline analysis of orders and revenue
         - 🏆 Platform comparison insights
@@ -24,63 +97,54 @@ def show_campaign_performance():
 
     st.info("💡 **Tip:** Use the filters below to analyze specific campaigns, date ranges, or platforms")
 
-    # Get merged tracking data
-    _, tracking_with_influencers = dm.get_merged_data()
+    cube = dm.cube
 
-    # Apply dynamic filters
-    filtered_df, filters = create_dynamic_filters(tracking_with_influencers)
+    if isinstance(cube, SQLMetricsCube):
+        # The filters become a WHERE clause, so the sales grain stays on disk
+        sales_filter = dm.cached('sales_filter', cube.sales_filter)
+        filters, date_range = filter_widgets(sales_filter)
+        filtered_df = sales_filter.select(filters, date_range)
+    else:
+        # Apply dynamic filters to the sales cube, which already carries influencer attributes
+        filter_index = dm.cached('sales_filter_index', lambda: FilterIndex(cube.sales))
+        filtered_df, filters = create_dynamic_filters(cube.sales, filter_index)
 
     # Performance metrics
-    total_orders = int(filtered_df['orders'].sum())
-    total_revenue = filtered_df['revenue'].sum()
-    # Filter payouts based on campaign filter
-    payouts_df = dm.payouts_df
-    if filters['campaign'] != 'All':
-        payouts_df = payouts_df[payouts_df['campaign'] == filters['campaign']]
-    total_cost = payouts_df['total_payout'].sum()
-    avg_roas = (total_revenue / total_cost) if total_cost > 0 else 0
+    performance = compute_campaign_performance(cube, filtered_df, filters['campaign'], range_totals(dm, filters))
 
     # Display metrics
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Orders", total_orders)
-    col2.metric("Total Revenue", f"₹{total_revenue:,.2f}")
-    col3.metric("Total Cost", f"₹{total_cost:,.2f}")
-    col4.metric("Avg ROAS", f"{avg_roas:.2f}x")
+    buyers = unique_buyers(dm, filters)
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Total Orders", performance['total_orders'])
+    col2.metric("Total Revenue", f"₹{performance['total_revenue']:,.2f}")
+    col3.metric("Total Cost", f"₹{performance['total_cost']:,.2f}")
+    col4.metric("Avg ROAS", f"{performance['avg_roas']:.2f}x")
+    col5.metric("Unique Buyers", "–" if buyers is None else f"≈{buyers:,.0f}",
+                help="HyperLogLog estimate, about 2% error")
 
     st.markdown("---")
 
-    # Performance by Influencer
-    perf_df = (filtered_df.groupby(['influencer_id', 'name'])
-               .agg(orders=('orders', 'sum'), revenue=('revenue', 'sum'))
-               .reset_index())
-    # Merge cost per influencer
-    cost_df = payouts_df.groupby('influencer_id')['total_payout'].sum().reset_index()
-    perf_df = perf_df.merge(cost_df, on='influencer_id', how='left').fillna(0)
-    perf_df['roas'] = perf_df.apply(lambda x: x['revenue'] / x['total_payout'] if x['total_payout'] > 0 else 0, axis=1)
-    perf_df['roas'] = perf_df['roas'].round(2)
+    # Every chart below depends only on the data and the filter values
+    def chart_key(chart):
+        return figure_key(dm, 'campaigns', chart, **filters)
 
+    # Performance by Influencer
     st.subheader("Influencer Performance Scatter")
-    fig_scatter = px.scatter(perf_df, x='revenue', y='roas', size='orders',
-                             hover_data=['name'], title="ROAS vs Revenue by Influencer")
-    st.plotly_chart(fig_scatter, use_container_width=True, key="campaign_scatter_chart")
+    plot_scatter(performance['influencers'], x='revenue', y='roas', size='orders',
+                 hover_name='name', title="ROAS vs Revenue by Influencer", key="campaign_scatter_chart",
+                 cache_key=chart_key('scatter'))
 
     st.markdown("---")
 
     # Timeline: revenue and orders over time
-    time_df = (filtered_df.groupby('date')
-               .agg(orders=('orders', 'sum'), revenue=('revenue', 'sum'))
-               .reset_index())
-    time_df['date'] = pd.to_datetime(time_df['date'])
     st.subheader("Timeline: Orders and Revenue Over Time")
-    fig_time = px.line(time_df, x='date', y=['orders', 'revenue'], title="Orders and Revenue Trend")
-    st.plotly_chart(fig_time, use_container_width=True, key="campaign_time_chart")
+    plot_line(performance['timeline'], x='date', y=['orders', 'revenue'], title="Orders and Revenue Trend",
+              key="campaign_time_chart", cache_key=chart_key('timeline'))
 
     st.markdown("---")
 
     # Platform comparison
-    plat_df = (filtered_df.groupby('platform')['revenue']
-               .sum().reset_index())
     st.subheader("Revenue by Platform")
-    fig_platform = px.bar(plat_df, x='platform', y='revenue',
-                          title="Revenue by Platform", labels={'revenue':'Revenue (₹)'})
-    st.plotly_chart(fig_platform, use_container_width=True, key="campaign_platform_chart")
+    fig_platform = lambda: px.bar(performance['platforms'], x='platform', y='revenue',
+                                  title="Revenue by Platform", labels={'revenue':'Revenue (₹)'})
+    show_chart(fig_platform, key="campaign_platform_chart", cache_key=chart_key('platforms'))
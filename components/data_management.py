@@ -1,8 +1,166 @@
+import time
 import streamlit as st
-from data_processing.data_manager import DataManager
+from data_processing.data_manager import TABLE_NAMES, table_for_file
 from data_processing.sample_data_generator import generate_sample_data
+from data_processing.schema import frame_memory, measure_ingestion
+from data_processing.snapshots import list_snapshots
+from utils.instrumentation import traced
 
 
+def format_bytes(num_bytes):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if num_bytes < 1024 or unit == 'GB':
+            return f"{num_bytes:,.1f} {unit}"
+        num_bytes /= 1024
+
+
+@traced(category='page')
+def show_memory_footprint(dm, uploaded_files):
+    """Per-table memory use of the typed frames, with an optional comparison against plain read_csv"""
+    with st.expander("💾 **Memory Footprint**", expanded=False):
+        rows = []
+        for table in TABLE_NAMES:
+            source = dm.table_source(table)
+            stats = dm.load_stats.get(table, {})
+            # Tables the SQL backend keeps on disk hold no frame in memory
+            on_disk = table in dm.sql_tables
+            memory_bytes = 0 if on_disk else stats.get('memory_bytes', frame_memory(source))
+            disk_bytes = source.disk_bytes() if on_disk else stats.get('disk_bytes')
+            rows.append({
+                'table': table,
+                'rows': len(source),
+                'on disk': format_bytes(disk_bytes) if disk_bytes else '-',
+                'in memory': format_bytes(memory_bytes),
+                'memory / disk': f"{memory_bytes / disk_bytes:.1f}x" if disk_bytes else '-',
+            })
+        st.table(rows)
+        shared = dm.registry.stats()
+        st.caption(
+            f"Shared across sessions: {shared['entries']} cached tables and results, "
+            f"{format_bytes(shared['bytes'])} of {format_bytes(shared['memory_cap'])}, "
+            f"{shared['referenced']} in use, {shared['hits']} hits, {shared['evictions']} evictions."
+        )
+        if uploaded_files and st.button("Compare with untyped read_csv", key="measure_ingestion_btn"):
+            comparison = []
+            with st.spinner("Reading each file twice..."):
+                for file in uploaded_files:
+                    table = table_for_file(file.name)
+                    if table is None:
+                        continue
+                    result = measure_ingestion(file, table)
+                    for path_name, stats in result.items():
+                        comparison.append({
+                            'table': table,
+                            'path': path_name,
+                            'seconds': round(stats['seconds'], 2),
+                            'peak': format_bytes(stats['peak_bytes']),
+                            'frame': format_bytes(stats['frame_bytes']),
+                        })
+                    file.seek(0)
+            st.table(comparison)
+
+
+@traced(category='page')
+def show_append_batches(dm):
+    """Append daily delta files of tracking or payout rows to the loaded data"""
+    st.markdown("---")
+    st.markdown("#### ➕ **Append Daily Batch**")
+    st.markdown("Add new tracking or payout rows without re-uploading the full history. Rows whose id is already loaded are skipped.")
+    delta_files = st.file_uploader(
+        "Upload tracking or payouts delta CSVs", type=["csv"], accept_multiple_files=True, key="append_uploader"
+    )
+    if not delta_files:
+        return
+    with st.spinner("Appending new rows..."):
+        results = dm.append_csv_files(delta_files)
+    for name, result in results.items():
+        if result['status'] == 'unsupported':
+            st.warning(f"{name}: only tracking and payouts files can be appended")
+        elif result['status'] == 'unchanged':
+            st.caption(f"♻️ {name}: already appended")
+        else:
+            st.caption(f"➕ {name}: {result['rows']:,} new {result['table']} rows, {result['duplicates']:,} duplicates skipped")
+
+
+@traced(category='page')
+def show_snapshots(dm):
+    """Save the loaded dataset as a columnar snapshot or reopen a saved one"""
+    st.markdown("---")
+    st.markdown("#### 🗂️ **Saved Snapshots**")
+    st.markdown("Save validated data to disk and reopen it instantly in later sessions")
+    if st.session_state.get('data_loaded', False):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            name = st.text_input("Snapshot name", key="snapshot_name_input")
+        with col2:
+            st.write("")
+            save = st.button("💾 Save Snapshot", key="save_snapshot_btn")
+        if save:
+            with st.spinner("Writing snapshot..."):
+                path = dm.save_snapshot(name)
+            st.success(f"Snapshot saved as '{path.name}'.")
+
+    saved = list_snapshots()
+    if not saved:
+        st.caption("No snapshots saved yet.")
+        return
+    st.table([
+        {
+            'name': manifest['name'],
+            'saved at': manifest['saved_at'],
+            'tracking rows': manifest['tables'].get('tracking', {}).get('rows', 0),
+            'size': format_bytes(sum(t['bytes'] for t in manifest['tables'].values())),
+        }
+        for manifest in saved
+    ])
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        choice = st.selectbox("Snapshot to open", [manifest['name'] for manifest in saved])
+    with col2:
+        st.write("")
+        open_clicked = st.button("📂 Open Snapshot", key="open_snapshot_btn")
+    if open_clicked:
+        seconds = dm.open_snapshot(choice)
+        st.session_state.data_loaded = True
+        st.success(f"Opened '{choice}' in {seconds:.2f}s.")
+
+
+@traced(category='page')
+def show_load_timings(dm, files_loaded, seconds):
+    """Per-file hash and parse times of the last upload; files are read concurrently"""
+    loaded = [table for table, status in files_loaded.items() if status == 'loaded']
+    if not loaded:
+        return
+    with st.expander(f"⏱️ **Load Timing** ({seconds:.2f}s total)", expanded=False):
+        rows = []
+        for table in loaded:
+            stats = dm.load_stats[table]
+            rows.append({
+                'file': stats['file'],
+                'rows': f"{stats['rows']:,}",
+                'size': format_bytes(stats['disk_bytes']),
+                'hash (s)': round(stats['hash_seconds'], 2),
+                'parse (s)': round(stats['parse_seconds'], 2),
+                'source': 'shared' if stats['shared'] else 'parsed',
+            })
+        st.table(rows)
+        st.caption("Files are hashed and parsed in parallel, so the total is close to the slowest file, not the sum.")
+
+
+@traced(category='page')
+def show_validation_issues(report):
+    """Failed checks with their row counts and a sample of the offending rows"""
+    st.error(f"Data validation failed ({len(report.issues)} checks, {report.seconds:.2f}s):")
+    for issue in report.issues:
+        if issue.sample is None or issue.sample.empty:
+            st.write(f"- {issue.message}")
+            continue
+        with st.expander(f"⚠️ {issue.message}"):
+            st.caption("Sample rows, indexed by row number in the table")
+            st.dataframe(issue.sample)
+
+
+@traced(category='page')
 def show_data_management():
     st.title("📁 Data Management")
     st.markdown("### Upload your data or explore with sample datasets")
@@ -52,25 +210,42 @@ def show_data_management():
 
     if demo:
         with st.spinner("Generating demo data..."):
-            influencers_df, posts_df, tracking_df, payouts_df = generate_sample_data()
-            dm.influencers_df = influencers_df
-            dm.posts_df = posts_df
-            dm.tracking_df = tracking_df
-            dm.payouts_df = payouts_df
+            dm.set_data(*generate_sample_data())
             st.success("Demo data loaded.")
         st.session_state.data_loaded = True
 
     elif uploaded_files:
-        files_loaded = dm.load_csv_files(uploaded_files)
-        valid, errors = dm.validate_data()
-        if not valid:
-            st.error("Data validation failed:")
-            for err in errors:
-                st.write(f"- {err}")
+        with st.spinner("Reading changed files..."):
+            start = time.perf_counter()
+            files_loaded = dm.load_csv_files(uploaded_files)
+            load_seconds = time.perf_counter() - start
+        for table, status in files_loaded.items():
+            if status == 'unchanged':
+                st.caption(f"♻️ {table}: unchanged, reused")
+            elif dm.load_stats.get(table, {}).get('shared'):
+                st.caption(f"🔗 {table}: already loaded by another session, shared")
+            else:
+                st.caption(f"📥 {table}: loaded")
+        show_load_timings(dm, files_loaded, load_seconds)
+        report = dm.validation_report()
+        if not report.valid:
+            show_validation_issues(report)
         else:
             st.success("All files loaded and validated.")
+            st.caption(f"⏱️ Validated in {report.seconds:.2f}s")
             st.session_state.data_loaded = True
 
+    if st.session_state.get('data_loaded', False):
+        show_append_batches(dm)
+
+    if dm.sql_tables:
+        st.caption("🗄️ SQL backend: tracking data is queried from disk, so snapshots are not needed.")
+    else:
+        show_snapshots(dm)
+
+    if st.session_state.get('data_loaded', False):
+        show_memory_footprint(dm, uploaded_files)
+
     # Preview
     if st.session_state.get('data_loaded', False):
         st.subheader("Influencers")
@@ -78,7 +253,9 @@ def show_data_management():
         st.subheader("Posts")
         st.dataframe(dm.posts_df)
         st.subheader("Tracking Data")
-        st.dataframe(dm.tracking_df)
+        if 'tracking' in dm.sql_tables:
+            st.caption(f"First 1,000 of {dm.row_count('tracking'):,} rows, read from disk")
+        st.dataframe(dm.preview('tracking'))
         st.subheader("Payouts")
         st.dataframe(dm.payouts_df)
 
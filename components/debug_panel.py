@@ -0,0 +1,29 @@
+import streamlit as st
+from utils.instrumentation import PROFILE_DEFAULT, Recorder
+
+
+def debug_recorder():
+    """The session's recorder when Debug Timings is switched on in the sidebar, else None"""
+    enabled = st.sidebar.toggle("🐞 Debug timings", value=PROFILE_DEFAULT, key='debug_timings',
+                                help="Record wall time, rows and memory of each step of this session")
+    if not enabled:
+        return None
+    if 'debug_recorder' not in st.session_state:
+        st.session_state.debug_recorder = Recorder()
+    return st.session_state.debug_recorder
+
+
+def show_debug_panel(recorder):
+    """Sidebar summary of the recorded steps with JSON and Chrome-trace downloads"""
+    if recorder is None:
+        return
+    with st.sidebar.expander("🐞 **Debug Timings**", expanded=True):
+        summary = recorder.summary()
+        st.caption(f"{len(recorder.events):,} calls recorded this session")
+        st.dataframe(summary.head(15).round(2), hide_index=True)
+        st.download_button("Download JSON", data=recorder.to_json, file_name="timings.json",
+                           mime="application/json", on_click='ignore', key='debug_json')
+        st.download_button("Download Chrome trace", data=recorder.to_chrome_trace, file_name="timings.trace.json",
+                           mime="application/json", on_click='ignore', key='debug_trace')
+        if st.button("Clear", key='debug_clear'):
+            recorder.clear()
@@ -1,52 +1,99 @@
+import os
+from contextlib import nullcontext
+from functools import partial
+from io import BytesIO
+from pathlib import Path
 import streamlit as st
 import pandas as pd
-from io import BytesIO
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
+from components.roas_calculator import compute_campaign_roas
+from data_processing.sql_backend import iter_frames
+from utils.export_files import discard, finished, new_export_file
+from utils.instrumentation import traced
 
+EXPORT_CHUNK_ROWS = 50_000
+# One header row plus data rows fills an Excel sheet; longer tables continue on further sheets
+EXCEL_SHEET_ROWS = 1_048_575
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
-def show_export_data():
-    st.title("📤 Export Data")
-    dm = st.session_state.data_manager
-    if not st.session_state.get('data_loaded', False):
-        st.info("Load data on Data Management page first.")
-        return
 
-    datasets = {
-        "Influencers": dm.influencers_df,
-        "Posts": dm.posts_df,
-        "Tracking Data": dm.tracking_df,
-        "Payouts": dm.payouts_df
-    }
-    dataset_name = st.selectbox("Select dataset to export", list(datasets.keys()))
-    df = datasets[dataset_name]
-    st.write(df.head())
+def write_csv(df, target, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Write df as CSV to a path or binary file chunk by chunk, yielding rows written so far.
 
-    # CSV export
-    csv_bytes = df.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        label=f"Download {dataset_name} as CSV",
-        data=csv_bytes,
-        file_name=f"{dataset_name}.csv",
-        mime="text/csv"
-    )
+    df may also be a SQLStore, which is read from disk chunk by chunk.
+    """
+    with open(target, 'wb') if isinstance(target, (str, os.PathLike)) else nullcontext(target) as f:
+        if len(df) == 0:
+            pd.DataFrame(columns=df.columns).to_csv(f, index=False, encoding='utf-8')
+        written = 0
+        for chunk in iter_frames(df, chunk_rows):
+            chunk.to_csv(f, index=False, header=written == 0, encoding='utf-8')
+            written += len(chunk)
+            yield written
+
+
+def _excel_rows(chunk: pd.DataFrame):
+    # Python scalars with None for missing values; openpyxl cannot write NaN or NaT
+    values = chunk.astype(object)
+    return values.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def _sheet_title(sheet_name: str, part: int) -> str:
+    suffix = '' if part == 1 else f' ({part})'
+    return sheet_name[:31 - len(suffix)] + suffix
+
+
+def write_excel(df, target, sheet_name: str, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Write df as xlsx in openpyxl write-only mode, yielding rows written so far.
+
+    Rows stream to disk as they are appended, so memory stays bounded by the
+    chunk size. Tables longer than one sheet continue on numbered sheets.
+    """
+    # openpyxl and ReportLab load on first export, not with the page
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    header = [str(col) for col in df.columns]
+    sheet, part, sheet_rows, written = None, 0, EXCEL_SHEET_ROWS, 0
+    if len(df) == 0:
+        workbook.create_sheet(_sheet_title(sheet_name, 1)).append(header)
+    for chunk in iter_frames(df, chunk_rows):
+        for row in _excel_rows(chunk):
+            if sheet_rows == EXCEL_SHEET_ROWS:
+                part += 1
+                sheet = workbook.create_sheet(_sheet_title(sheet_name, part))
+                sheet.append(header)
+                sheet_rows = 0
+            sheet.append(row)
+            sheet_rows += 1
+        written += len(chunk)
+        yield written
+    workbook.save(target)
+
+
+def _drain(writer):
+    for _ in writer:
+        pass
+
+
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    buffer = BytesIO()
+    _drain(write_csv(df, buffer))
+    return buffer.getvalue()
 
-    # Excel export
-    excel_buffer = BytesIO()
-    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name=dataset_name)
-    st.download_button(
-        label=f"Download {dataset_name} as Excel",
-        data=excel_buffer.getvalue(),
-        file_name=f"{dataset_name}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
 
-    # PDF export (first 20 rows)
+def to_excel_bytes(df: pd.DataFrame, sheet_name: str) -> bytes:
+    buffer = BytesIO()
+    _drain(write_excel(df, buffer, sheet_name))
+    return buffer.getvalue()
+
+
+def to_pdf_bytes(df: pd.DataFrame, rows: int = 20) -> bytes:
+    """PDF table of the first rows of df"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
     pdf_buffer = BytesIO()
     doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
-    data = [df.columns.tolist()] + df.head(20).values.tolist()
+    data = [df.columns.tolist()] + df.head(rows).values.tolist()
     table = Table(data)
     table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -55,9 +102,132 @@ def show_export_data():
         ('GRID', (0, 0), (-1, -1), 1, colors.black),
     ]))
     doc.build([table])
+    return pdf_buffer.getvalue()
+
+
+def run_export(df, writer, suffix: str):
+    """Stream df to a temp file with a progress bar and a cancel control.
+
+    Clicking Cancel reruns the script, which interrupts this run at the next
+    progress update; the partial file is removed. Returns the finished path,
+    in the swept export directory (utils.export_files).
+    """
+    progress = st.progress(0.0, text="Starting export...")
+    st.button("Cancel export", key='cancel_export')
+    path = new_export_file(suffix, 'export_')
+    total = max(len(df), 1)
+    try:
+        for done in writer(df, path):
+            progress.progress(done / total, text=f"Exported {done:,} of {len(df):,} rows")
+    except BaseException:
+        discard(path)
+        raise
+    finished(path)
+    progress.empty()
+    return path
+
+
+@st.fragment(run_every=1.0)
+def _poll_report(job):
+    if job.status != 'running':
+        st.rerun()
+    st.progress(job.progress, text=f"Rendering {job.title}: {job.rows_done:,} of {job.total_rows:,} rows")
+    if st.button("Cancel report", key='cancel_report'):
+        job.cancel()
+        st.rerun()
+
+
+@traced(category='page')
+def show_report(job):
+    """Progress while a report renders in the background, then its download"""
+    status = job.status
+    if status == 'running':
+        _poll_report(job)
+    elif status == 'done':
+        st.download_button(
+            label=f"Download {job.title} PDF report",
+            data=Path(job.path).read_bytes,
+            file_name=f"{job.title} report.pdf",
+            mime="application/pdf",
+            on_click='ignore',
+        )
+    elif status == 'failed':
+        st.error(f"Rendering the {job.title} report failed: {job.future.exception()}")
+    else:
+        st.caption(f"{job.title} report cancelled.")
+
+
+@traced(category='page')
+def show_export_data():
+    st.title("📤 Export Data")
+    dm = st.session_state.data_manager
+    if not st.session_state.get('data_loaded', False):
+        st.info("Load data on Data Management page first.")
+        return
+
+    # Tables the SQL backend keeps on disk are exported straight from the database
+    datasets = {
+        "Influencers": dm.table_source('influencers'),
+        "Posts": dm.table_source('posts'),
+        "Tracking Data": dm.table_source('tracking'),
+        "Payouts": dm.table_source('payouts')
+    }
+    dataset_name = st.selectbox("Select dataset to export", list(datasets.keys()))
+    df = datasets[dataset_name]
+    st.write(df.head(5))
+
+    # Finished exports live in the export directory until the data changes or a sweep removes them
+    exports = st.session_state.setdefault('exports', {})
+    for key, (version, path) in list(exports.items()):
+        if version != dm.version or not os.path.exists(path):
+            discard(path)
+            del exports[key]
+
+    formats = {
+        'CSV': (write_csv, '.csv', "text/csv"),
+        'Excel': (partial(write_excel, sheet_name=dataset_name), '.xlsx', EXCEL_MIME),
+    }
+    st.caption(f"{len(df):,} rows. Files are generated only when you ask for them.")
+    for label, (writer, suffix, mime) in formats.items():
+        key = (dataset_name, label)
+        if st.button(f"Prepare {dataset_name} as {label}", key=f"prepare_{label}"):
+            if key in exports:
+                discard(exports.pop(key)[1])
+            exports[key] = (dm.version, run_export(df, writer, suffix))
+        if key in exports:
+            path = exports[key][1]
+            st.download_button(
+                label=f"Download {dataset_name} as {label}",
+                data=Path(path).read_bytes,
+                file_name=f"{dataset_name}{suffix}",
+                mime=mime,
+                on_click='ignore',
+            )
+
+    # PDF export (first 20 rows), rendered when the button is clicked
     st.download_button(
         label=f"Download {dataset_name} as PDF (first 20 rows)",
-        data=pdf_buffer.getvalue(),
+        data=partial(to_pdf_bytes, df),
         file_name=f"{dataset_name}.pdf",
-        mime="application/pdf"
+        mime="application/pdf",
+        on_click='ignore',
     )
+
+    # Full-table PDF reports render on a worker pool so the page stays responsive
+    st.markdown("---")
+    st.subheader("PDF Reports")
+    reports = {**datasets, "Campaign ROAS": dm.cached('campaign_roas', lambda: compute_campaign_roas(dm.cube))}
+    report_name = st.selectbox("Select table to report", list(reports.keys()), index=3)
+    jobs = st.session_state.setdefault('pdf_reports', {})
+    for name, (version, job) in list(jobs.items()):
+        if version != dm.version or (job.status == 'done' and not os.path.exists(job.path)):
+            job.discard()
+            del jobs[name]
+    st.caption(f"Every row of {report_name}, paginated with the header repeated on each page.")
+    if st.button(f"Generate {report_name} PDF report", key='generate_report'):
+        if report_name in jobs:
+            jobs.pop(report_name)[1].discard()
+        from utils.pdf_reports import start_report
+        jobs[report_name] = (dm.version, start_report(reports[report_name], report_name))
+    if report_name in jobs:
+        show_report(jobs[report_name][1])
@@ -1,10 +1,67 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
+from data_processing.attribution import ATTRIBUTION_WINDOW_DAYS, attribute_orders
+from data_processing.cube import FUNNEL_KEYS, aggregate_posts
 from data_processing.data_manager import DataManager
-from utils.calculations import analyze_influencer_performance
+from data_processing.leaderboard import top_k
+from data_processing.sketches import DistinctSketch
+from utils.calculations import analyze_influencer_performance, build_conversion_funnel, build_post_performance, funnel_rates
+from utils.visualizations import figure_key, line_figure, show_chart
+from utils.instrumentation import traced
 
+FUNNEL_STAGES = ['reach', 'engagements', 'orders']
+FUNNEL_COUNTS = ['posts', 'reach', 'engagements', 'orders', 'revenue']
+ATTRIBUTION_WINDOWS = [1, 3, 7, 14, 30]
+BAND_QUANTILES = [0.5, 0.9]
+# sketch name -> column prefix in the category bands
+BAND_SKETCHES = {'roas': 'roas', 'engagement': 'engagement_rate', 'buyers': 'unique_buyers'}
 
+
+@traced
+def compute_conversion_funnel(posts_df, cube, tracking_columns) -> pd.DataFrame:
+    """Funnel cells per influencer x campaign x day, on the keys both posts and tracking carry"""
+    keys = [key for key in FUNNEL_KEYS if key in posts_df.columns and key in tracking_columns]
+    return build_conversion_funnel(aggregate_posts(posts_df, keys), cube.revenue_by(keys), keys)
+
+
+@traced
+def compute_post_attribution(posts_df, tracking, cube, window_days=ATTRIBUTION_WINDOW_DAYS) -> pd.DataFrame:
+    """Revenue, payout share and ROAS per post, crediting each event to the influencer's latest prior post"""
+    keys = [key for key in ('influencer_id', 'campaign') if key in posts_df.columns and key in cube.costs.columns]
+    return build_post_performance(attribute_orders(posts_df, tracking, window_days), cube.cost_by(keys), keys)
+
+
+@traced
+def compute_category_bands(sketches: dict, influencers_df, influencer_ids) -> pd.DataFrame:
+    """Median and p90 of each quantile sketch, and distinct counts, per category over influencer_ids.
+
+    sketches maps BAND_SKETCHES names to sketches keyed by influencer_id;
+    each is answered by merging the cells of the given influencers.
+    """
+    category = influencers_df.drop_duplicates('id').set_index('id')['category']
+    bands = []
+    for name, sketch in sketches.items():
+        ids = sketch.cells['influencer_id']
+        labels = ids.map(category).to_numpy()
+        positions = np.flatnonzero(ids.isin(influencer_ids))
+        prefix = BAND_SKETCHES[name]
+        if isinstance(sketch, DistinctSketch):
+            bands.append(sketch.estimate_by(labels, positions).round().rename(prefix))
+        else:
+            quantiles = sketch.quantiles_by(labels, BAND_QUANTILES, positions)[BAND_QUANTILES]
+            bands.append(quantiles.rename(columns={q: f'{prefix}_p{round(q * 100)}' for q in BAND_QUANTILES}))
+    bands = pd.concat(bands, axis=1) if bands else pd.DataFrame()
+    return bands.rename_axis('category').sort_index().reset_index()
+
+
+def summarize_funnel(funnel: pd.DataFrame, keys) -> pd.DataFrame:
+    """Funnel counts summed to keys, with rates recomputed from the sums"""
+    return funnel_rates(funnel.groupby(keys, observed=True)[FUNNEL_COUNTS].sum().reset_index())
+
+
+@traced(category='page')
 def show_influencers():
     st.title("👥 Influencer Analytics")
     dm: DataManager = st.session_state.data_manager
@@ -12,8 +69,9 @@ def show_influencers():
         st.info("Load data on Data Management page first.")
         return
 
+    # Revenue and cost come pre-aggregated from the cube
     perf = analyze_influencer_performance(
-        dm.posts_df, dm.tracking_df, dm.payouts_df
+        dm.posts_df, dm.cube.revenue_by('influencer_id'), dm.cube.cost_by('influencer_id')
     )
     perf['roas'] = perf['roas'].round(2)
     # Filters: Category and Follower Count
@@ -29,8 +87,94 @@ def show_influencers():
     perf = perf[(perf['follower_count'] >= fol_range[0]) & (perf['follower_count'] <= fol_range[1])]
     st.subheader("Influencer Performance Metrics")
     st.dataframe(perf)
+    show_category_bands(dm, perf['influencer_id'])
     # Top Influencers by ROAS
     st.markdown("---")
-    top_inf = perf.sort_values('roas', ascending=False).head(10)
-    fig_inf = px.bar(top_inf, x='name', y='roas', title='Top 10 Influencers by ROAS', labels={'roas':'ROAS','name':'Influencer'})
-    st.plotly_chart(fig_inf, use_container_width=True)
+    # The ROAS leaderboard ranks only the influencers left after the filters
+    top_inf = dm.leaderboard('influencer_roas').top(10, among=perf['influencer_id'])
+    top_inf = top_inf.merge(dm.influencers_df[['id', 'name']], left_on='influencer_id', right_on='id')
+    fig_inf = lambda: px.bar(top_inf, x='name', y='roas', title='Top 10 Influencers by ROAS', labels={'roas':'ROAS','name':'Influencer'})
+    show_chart(fig_inf, cache_key=figure_key(dm, 'influencers', 'top_roas', category=selected_cat, followers=fol_range))
+
+    st.markdown("---")
+    show_conversion_funnel(dm)
+
+    st.markdown("---")
+    show_post_attribution(dm)
+
+
+@traced(category='page')
+def show_category_bands(dm: DataManager, influencer_ids):
+    st.subheader("Percentile Bands by Category")
+    names = ['roas', 'engagement']
+    if 'user_id' in dm.table_source('tracking').columns:
+        names.append('buyers')
+    bands = compute_category_bands({name: dm.sketch(name) for name in names}, dm.influencers_df, influencer_ids)
+    st.caption("ROAS per influencer and engagement rate per post, for the influencers above. "
+               "Merged from per-cell sketches: percentiles within 1%, buyer counts within about 2%.")
+    st.dataframe(bands.round(2))
+
+
+@traced(category='page')
+def show_conversion_funnel(dm: DataManager):
+    st.subheader("Conversion Funnel")
+    funnel = dm.cached('conversion_funnel', lambda: compute_conversion_funnel(
+        dm.posts_df, dm.cube, dm.table_source('tracking').columns))
+    names = dm.influencers_df.set_index('id')['name']
+    col1, col2 = st.columns(2)
+    influencer = col1.selectbox('Influencer', ['All'] + sorted(names.dropna().unique()), key='funnel_influencer')
+    campaign = 'All'
+    if 'campaign' in funnel.columns:
+        campaigns = sorted(funnel['campaign'].dropna().unique())
+        campaign = col2.selectbox('Campaign', ['All'] + campaigns, key='funnel_campaign')
+    else:
+        col2.caption("Posts carry no campaign, so the funnel is per influencer and day.")
+
+    cells = funnel
+    if influencer != 'All':
+        cells = cells[cells['influencer_id'].isin(names.index[names == influencer])]
+    if campaign != 'All':
+        cells = cells[cells['campaign'] == campaign]
+    totals = funnel_rates(cells[FUNNEL_COUNTS].sum().to_frame().T)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Reach", f"{int(totals['reach'].iloc[0]):,}")
+    col2.metric("Engagement Rate", f"{totals['engagement_rate'].iloc[0]:.2f}%")
+    col3.metric("Conversion Rate", f"{totals['conversion_rate'].iloc[0]:.3f}%")
+    col4.metric("Revenue", f"₹{totals['revenue'].iloc[0]:,.2f}")
+    stages = pd.DataFrame({'stage': [stage.capitalize() for stage in FUNNEL_STAGES],
+                           'count': [int(totals[stage].iloc[0]) for stage in FUNNEL_STAGES]})
+    chart_filters = {'influencer': influencer, 'campaign': campaign}
+    show_chart(lambda: px.funnel(stages, x='count', y='stage', title="Reach → Engagements → Orders"), key="funnel_chart",
+               cache_key=figure_key(dm, 'influencers', 'funnel', **chart_filters))
+
+    if 'date' in cells.columns:
+        # The daily summary is only needed when the chart is not cached
+        show_chart(lambda: line_figure(summarize_funnel(cells, 'date'), x='date', y=['engagement_rate', 'conversion_rate'],
+                                       title="Daily Engagement and Conversion Rates (%)"),
+                   key="funnel_rates_chart", cache_key=figure_key(dm, 'influencers', 'funnel_rates', **chart_filters))
+    by_influencer = summarize_funnel(cells, 'influencer_id')
+    by_influencer.insert(1, 'name', by_influencer['influencer_id'].map(names))
+    st.dataframe(by_influencer.sort_values('conversion_rate', ascending=False).round(3))
+
+
+@traced(category='page')
+def show_post_attribution(dm: DataManager):
+    st.subheader("Revenue by Post")
+    if 'date' not in dm.posts_df.columns:
+        st.caption("Posts carry no date, so orders cannot be credited to individual posts.")
+        return
+    window = st.selectbox('Attribution window (days)', ATTRIBUTION_WINDOWS,
+                          index=ATTRIBUTION_WINDOWS.index(ATTRIBUTION_WINDOW_DAYS), key='attribution_window')
+    posts = dm.cached(f'post_attribution_{window}', lambda: compute_post_attribution(
+        dm.posts_df, dm.table_source('tracking'), dm.cube, window))
+    st.caption(f"Each order is credited to the influencer's most recent post published up to {window} days before it.")
+    total_revenue = dm.cube.total_revenue()
+    credited = posts['revenue'].sum()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Attributed Revenue", f"₹{credited:,.2f}")
+    col2.metric("Share of Revenue", f"{credited / total_revenue:.1%}" if total_revenue else "–")
+    col3.metric("Posts with Orders", f"{int((posts['orders'] > 0).sum()):,} of {len(posts):,}")
+    top_posts = top_k(posts, 'revenue', 20).merge(
+        dm.influencers_df[['id', 'name']], left_on='influencer_id', right_on='id', how='left').drop(columns='id')
+    st.dataframe(top_posts.round({'revenue': 2, 'cost': 2, 'roas': 2}))
@@ -2,8 +2,44 @@ import streamlit as st
 import pandas as pd
 from data_processing.data_manager import DataManager
 from utils.calculations import calculate_roas
+from utils.instrumentation import traced
 
 
+def monthly_revenue(sales: pd.DataFrame) -> pd.DataFrame:
+    """Revenue per calendar month with month-over-month change in percent.
+
+    Months without sales between the first and last month are kept with zero
+    revenue, so the change is always against the previous calendar month.
+    """
+    months = sales['date'].dt.to_period('M')
+    revenue = sales.groupby(months)['revenue'].sum()
+    if len(revenue):
+        revenue = revenue.reindex(pd.period_range(revenue.index.min(), revenue.index.max(), freq='M'), fill_value=0)
+    revenue.index = revenue.index.to_timestamp()
+    monthly = revenue.rename_axis('date').reset_index()
+    monthly['pct_change'] = monthly['revenue'].pct_change() * 100
+    return monthly
+
+
+@traced
+def compute_insights(cube, influencers_df, roas_leaders, campaign_leaders) -> dict:
+    """Headline figures, leaders and growth for the insights page"""
+    total_rev = cube.total_revenue()
+    total_cost = cube.total_cost()
+    # Top 5 influencers by ROAS and campaigns by revenue, from the per-version leaderboards
+    top_inf = roas_leaders.top(5).merge(influencers_df[['id', 'name']], left_on='influencer_id', right_on='id')
+    camp_rev = campaign_leaders.top(5)
+    return {
+        'total_revenue': total_rev,
+        'total_cost': total_cost,
+        'overall_roas': calculate_roas(total_rev, total_cost),
+        'top_influencers': top_inf,
+        'top_campaigns': camp_rev,
+        'monthly': monthly_revenue(cube.revenue_by('date')),
+    }
+
+
+@traced(category='page')
 def show_insights():
     st.title("💡 Automated Insights")
     dm: DataManager = st.session_state.data_manager
@@ -11,53 +47,27 @@ def show_insights():
         st.info("Load data on Data Management page first.")
         return
 
-    # Merge and prepare data
-    _, tracking_df = dm.get_merged_data()
-    tracking_df['date'] = pd.to_datetime(tracking_df['date'])
+    insights = compute_insights(dm.cube, dm.influencers_df, dm.leaderboard('influencer_roas'),
+                                dm.leaderboard('campaign_revenue'))
 
     # Overall metrics
-    total_rev = tracking_df['revenue'].sum()
-    total_cost = dm.payouts_df['total_payout'].sum()
-    overall_roas = calculate_roas(total_rev, total_cost)
-
     st.subheader("Overall Performance")
-    st.markdown(f"- Total Revenue: ₹{total_rev:,.2f}")
-    st.markdown(f"- Total Cost: ₹{total_cost:,.2f}")
-    st.markdown(f"- Overall ROAS: {overall_roas:.2f}x")
+    st.markdown(f"- Total Revenue: ₹{insights['total_revenue']:,.2f}")
+    st.markdown(f"- Total Cost: ₹{insights['total_cost']:,.2f}")
+    st.markdown(f"- Overall ROAS: {insights['overall_roas']:.2f}x")
 
     # Top 5 influencers by ROAS
-    perf = tracking_df.groupby('influencer_id').agg({'revenue': 'sum'}).reset_index()
-    cost_df = dm.payouts_df.groupby('influencer_id')['total_payout'].sum().reset_index()
-    perf = perf.merge(cost_df, on='influencer_id', how='left').fillna(0)
-    perf['roas'] = perf.apply(lambda x: calculate_roas(x['revenue'], x['total_payout']), axis=1)
-    top_inf = perf.sort_values('roas', ascending=False).head(5)
-    inf_df = dm.influencers_df[['id', 'name']]
-    top_inf = top_inf.merge(inf_df, left_on='influencer_id', right_on='id')
-
     st.subheader("Top 5 Influencers by ROAS")
-    for _, row in top_inf.iterrows():
+    for _, row in insights['top_influencers'].iterrows():
         st.markdown(f"- {row['name']}: {row['roas']:.2f}x")
 
     # Top 5 campaigns by revenue
-    camp_rev = (
-        tracking_df.groupby('campaign')['revenue']
-        .sum()
-        .reset_index()
-        .sort_values('revenue', ascending=False)
-        .head(5)
-    )
     st.subheader("Top 5 Campaigns by Revenue")
-    for _, row in camp_rev.iterrows():
+    for _, row in insights['top_campaigns'].iterrows():
         st.markdown(f"- {row['campaign']}: ₹{row['revenue']:,.2f}")
 
     # Revenue growth month-over-month
-    monthly = (
-        tracking_df.set_index('date')
-        .resample('M')['revenue']
-        .sum()
-        .reset_index()
-    )
-    monthly['pct_change'] = monthly['revenue'].pct_change() * 100
+    monthly = insights['monthly']
     if len(monthly) >= 2:
         latest = monthly.iloc[-1]
         change = latest['pct_change']
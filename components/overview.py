@@ -1,8 +1,28 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 from data_processing.data_manager import DataManager
+from utils.visualizations import figure_key, plot_line, show_chart
+from utils.instrumentation import traced
 
+@traced
+def compute_overview(cube, influencers_df, revenue_leaders) -> dict:
+    """KPIs and chart data for the overview page; revenue_leaders ranks influencers by revenue"""
+    total_revenue = cube.total_revenue()
+    total_cost = cube.total_cost()
+    status_counts = cube.costs.groupby('status', observed=True)['payouts'].sum().reset_index()
+    status_counts.columns = ['status', 'count']
+    return {
+        'total_revenue': total_revenue,
+        'active_campaigns': len(cube.revenue_by('campaign')),
+        'total_influencers': influencers_df.shape[0],
+        'avg_roas': (total_revenue / total_cost) if total_cost > 0 else 0,
+        'daily_revenue': cube.revenue_by('date'),
+        'brand_revenue': cube.revenue_by('brand'),
+        'top_influencers': revenue_leaders.top(5).merge(influencers_df[['id', 'name']], left_on='influencer_id', right_on='id', how='left'),
+        'status_counts': status_counts,
+    }
+
+@traced(category='page')
 def show_overview():
     st.title("📊 Overview Dashboard")
     st.markdown("### High-level performance metrics and trends")
@@ -24,80 +44,55 @@ def show_overview():
 
     st.success("✅ **Data Loaded Successfully** - Displaying campaign analytics")
     
-    # Key metrics
-    total_revenue = dm.tracking_df['revenue'].sum()
-    total_cost = dm.payouts_df['total_payout'].sum()
-    active_campaigns = dm.tracking_df['campaign'].nunique()
-    total_influencers = dm.influencers_df.shape[0]
-    avg_roas = (total_revenue / total_cost) if total_cost > 0 else 0
+    overview = compute_overview(dm.cube, dm.influencers_df, dm.leaderboard('influencer_revenue'))
 
+    # Key metrics
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Revenue", f"₹{total_revenue:,.2f}")
-    col2.metric("Active Campaigns", active_campaigns)
-    col3.metric("Total Influencers", total_influencers)
-    col4.metric("Avg ROAS", f"{avg_roas:.2f}x")
+    col1.metric("Total Revenue", f"₹{overview['total_revenue']:,.2f}")
+    col2.metric("Active Campaigns", overview['active_campaigns'])
+    col3.metric("Total Influencers", overview['total_influencers'])
+    col4.metric("Avg ROAS", f"{overview['avg_roas']:.2f}x")
 
     st.markdown("---")
 
     # Revenue Trend Over Time
-    daily_revenue = (
-        dm.tracking_df.groupby('date')['revenue']
-        .sum()
-        .reset_index()
-    )
-    daily_revenue['date'] = pd.to_datetime(daily_revenue['date'])
-    fig_trend = px.line(
-        daily_revenue,
+    plot_line(
+        overview['daily_revenue'],
         x='date', y='revenue',
         title='Revenue Trend Over Time',
-        labels={'revenue':'Revenue (₹)', 'date':'Date'}
+        labels={'revenue':'Revenue (₹)', 'date':'Date'},
+        key="overview_trend_chart",
+        cache_key=figure_key(dm, 'overview', 'trend'),
     )
-    st.plotly_chart(fig_trend, use_container_width=True, key="overview_trend_chart")
 
     st.markdown("---")
 
     # Brand Revenue Comparison
-    brand_rev = (
-        dm.tracking_df.groupby('brand')['revenue']
-        .sum()
-        .reset_index()
-    )
-    fig_brand = px.bar(
-        brand_rev,
+    fig_brand = lambda: px.bar(
+        overview['brand_revenue'],
         x='brand', y='revenue',
         title='Revenue by Brand',
         labels={'revenue':'Revenue (₹)', 'brand':'Brand'}
     )
-    st.plotly_chart(fig_brand, use_container_width=True, key="overview_brand_chart")
+    show_chart(fig_brand, key="overview_brand_chart", cache_key=figure_key(dm, 'overview', 'brand'))
 
     st.markdown("---")
     # Top 5 Influencers by Revenue
-    inf_rev = (
-        dm.tracking_df.groupby('influencer_id')['revenue']
-        .sum().reset_index()
-    )
-    inf_rev = inf_rev.merge(
-        dm.influencers_df[['id', 'name']],
-        left_on='influencer_id', right_on='id'
-    )
-    top_inf = inf_rev.nlargest(5, 'revenue')
-    fig_inf = px.bar(
-        top_inf, x='name', y='revenue',
+    fig_inf = lambda: px.bar(
+        overview['top_influencers'], x='name', y='revenue',
         title='Top 5 Influencers by Revenue',
         labels={'revenue':'Revenue (₹)', 'name':'Influencer'}
     )
-    st.plotly_chart(fig_inf, use_container_width=True, key="overview_top_influencers_chart")
+    show_chart(fig_inf, key="overview_top_influencers_chart", cache_key=figure_key(dm, 'overview', 'top_influencers'))
 
     st.markdown("---")
     # Payout Status Distribution
-    status_counts = dm.payouts_df['status'].value_counts().reset_index()
-    status_counts.columns = ['status', 'count']
     # Pie chart for payment status
-    fig_status = px.pie(
-        status_counts,
+    fig_status = lambda: px.pie(
+        overview['status_counts'],
         names='status',
         values='count',
         title='Payout Status Distribution'
     )
-    st.plotly_chart(fig_status, use_container_width=True, key="overview_status_pie_chart")
+    show_chart(fig_status, key="overview_status_pie_chart", cache_key=figure_key(dm, 'overview', 'status'))
     # Removed duplicate pie chart to avoid duplicate element IDs
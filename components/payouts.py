@@ -2,18 +2,62 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import date
+from pandas.api.types import is_datetime64_any_dtype
+from data_processing.leaderboard import top_k
+from data_processing.time_index import PrefixSums
+from utils.filter_index import FilterIndex
+from utils.visualizations import figure_key, show_chart
+from utils.instrumentation import traced
 
-def filter_payouts_by_date(df: pd.DataFrame, start_date: date, end_date: date) -> pd.DataFrame:
-    """Filter payouts DataFrame by date range using pandas Timestamps."""
-    df = df.copy()
-    df['payment_date'] = pd.to_datetime(df['payment_date'])
-    # Compare on pure date to avoid dtype mismatches
-    df['payment_date_date'] = df['payment_date'].dt.date
-    # Filter between Python date objects directly
-    mask = (df['payment_date_date'] >= start_date) & (df['payment_date_date'] <= end_date)
-    result = df.loc[mask].drop(columns=['payment_date_date'])
-    return result
+def filter_payouts_by_date(df: pd.DataFrame, start_date: date, end_date: date, index: FilterIndex = None) -> pd.DataFrame:
+    """Filter payouts DataFrame by date range using pandas Timestamps.
 
+    With a FilterIndex built on df's payment_date, the rows are found by
+    binary search on the sorted dates instead of comparing every row.
+    """
+    if index is not None:
+        return df.iloc[index.day_positions(start_date, end_date)]
+    payment_date = df['payment_date']
+    if not is_datetime64_any_dtype(payment_date):
+        df = df.copy()
+        payment_date = df['payment_date'] = pd.to_datetime(payment_date)
+    # Compare whole days: anything before the start of the day after end_date
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    mask = (payment_date >= start) & (payment_date < end)
+    return df.loc[mask]
+
+def month_edges(start, end) -> pd.DatetimeIndex:
+    """start, the first day of each later month up to end, and the day after end"""
+    start, end = pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)
+    months = pd.date_range(start.to_period('M').to_timestamp() + pd.offsets.MonthBegin(), end, freq='MS', inclusive='left')
+    return pd.DatetimeIndex([start]).append(months).append(pd.DatetimeIndex([end]))
+
+
+@traced
+def compute_payout_trends(daily_payouts: PrefixSums, influencer_payouts: PrefixSums, influencers_df: pd.DataFrame,
+                          start_date=None, end_date=None, payout_leaders=None):
+    """Monthly payout totals and the top 10 influencers by payout over start_date..end_date.
+
+    Both come from prefix sums over the cost cube, so their cost does not
+    grow with the number of days in the range. payout_leaders, the
+    leaderboard over all dates, answers the top 10 when the range is not
+    narrowed.
+    """
+    start_date = start_date or pd.Timestamp(daily_payouts.first_day, unit='D')
+    end_date = end_date or pd.Timestamp(daily_payouts.last_day, unit='D')
+    monthly = daily_payouts.between(month_edges(start_date, end_date))
+    # Months are labelled by their first day, also when the range starts mid-month
+    monthly = pd.DataFrame({'month': monthly['start'].dt.to_period('M').dt.to_timestamp(),
+                            'total_payout': monthly['total_payout']})
+    if payout_leaders is not None:
+        top_inf = payout_leaders.top(10)
+    else:
+        top_inf = top_k(influencer_payouts.totals(start_date, end_date), 'total_payout', 10)
+    top_inf = top_inf.merge(influencers_df[['id','name']], left_on='influencer_id', right_on='id')
+    return monthly, top_inf
+
+@traced(category='page')
 def show_payouts():
     st.title("💳 Payout Tracker")
     dm = st.session_state.data_manager
@@ -23,9 +67,8 @@ def show_payouts():
 
     st.subheader("Payout Records")
     # Date filter on payment_date
-    payouts_df = dm.payouts_df.copy()
+    payouts_df = dm.payouts_df
     # Use Python date for date_input defaults
-    payouts_df['payment_date'] = pd.to_datetime(payouts_df['payment_date'])
     min_date = payouts_df['payment_date'].min().date()
     max_date = payouts_df['payment_date'].max().date()
     # Allow unrestricted date selection for payment date filter
@@ -36,31 +79,33 @@ def show_payouts():
         min_value=min_date,
         max_value=max_date
     )
+    # Charts read prefix sums over the daily cost cube; the record table needs the raw rows
+    start_date, end_date = min_date, max_date
+    # The all-dates leaderboard answers the top 10 unless the range is narrowed
+    payout_leaders = dm.leaderboard('influencer_payout')
     if isinstance(selected_range, tuple) and len(selected_range) == 2:
         start_date, end_date = selected_range
-        payouts_df = filter_payouts_by_date(payouts_df, start_date, end_date)
+        date_index = dm.cached('payout_date_index', lambda: FilterIndex(dm.payouts_df, [], 'payment_date'))
+        payouts_df = filter_payouts_by_date(payouts_df, start_date, end_date, date_index)
+        if (start_date, end_date) != (min_date, max_date):
+            payout_leaders = None
     st.dataframe(payouts_df)
 
+    monthly, top_inf = compute_payout_trends(dm.time_index('payouts'), dm.time_index('influencer_payouts'),
+                                             dm.influencers_df, start_date, end_date, payout_leaders)
+
     st.markdown("---")
     # Monthly Payout Trend
-    payouts_df['month'] = payouts_df['payment_date'].dt.to_period('M').dt.to_timestamp()
-    monthly = payouts_df.groupby('month')['total_payout'].sum().reset_index()
-    fig_month = px.bar(
+    fig_month = lambda: px.bar(
         monthly, x='month', y='total_payout',
         title='Monthly Total Payouts', labels={'total_payout':'Total Payout (₹)','month':'Month'}
     )
-    st.plotly_chart(fig_month, use_container_width=True)
+    show_chart(fig_month, cache_key=figure_key(dm, 'payouts', 'monthly', dates=selected_range))
 
     st.markdown("---")
     # Top Influencers by Payout
-    top_inf = (
-        payouts_df.groupby('influencer_id')['total_payout']
-        .sum().reset_index()
-    )
-    top_inf = top_inf.merge(dm.influencers_df[['id','name']], left_on='influencer_id', right_on='id')
-    top_inf = top_inf.nlargest(10, 'total_payout')
-    fig_top = px.bar(
+    fig_top = lambda: px.bar(
         top_inf, x='name', y='total_payout',
         title='Top 10 Influencers by Payout', labels={'total_payout':'Total Payout (₹)','name':'Influencer'}
     )
-    st.plotly_chart(fig_top, use_container_width=True)
+    show_chart(fig_top, cache_key=figure_key(dm, 'payouts', 'top_influencers', dates=selected_range))
@@ -1,7 +1,28 @@
 import streamlit as st
 import pandas as pd
-from utils.calculations import calculate_roas, calculate_incremental_roas
+from utils.calculations import calculate_roas, calculate_roas_array, calculate_incremental_roas_array
+from utils.instrumentation import traced
 
+@traced
+def compute_campaign_roas(cube) -> pd.DataFrame:
+    """Revenue, cost, ROAS, incremental ROAS and break-even per campaign"""
+    total_revenue = cube.total_revenue()
+    rev_by_campaign = cube.revenue_by('campaign').set_index('campaign')['revenue']
+    cost_by_campaign = cube.cost_by('campaign').set_index('campaign')['total_payout']
+    camp_df = pd.DataFrame({'revenue': rev_by_campaign, 'total_payout': cost_by_campaign}).fillna(0)
+    # Basic ROAS
+    camp_df['roas'] = calculate_roas_array(camp_df['revenue'], camp_df['total_payout'])
+    # Incremental ROAS: baseline = total revenue - campaign revenue
+    camp_df = camp_df.reset_index()
+    camp_df['incremental_roas'] = calculate_incremental_roas_array(
+        camp_df['revenue'], total_revenue - camp_df['revenue'], camp_df['total_payout']
+    )
+    camp_df['incremental_roas'] = camp_df['incremental_roas'].round(2)
+    # Break-even revenue equal to cost
+    camp_df['break_even'] = camp_df['total_payout']
+    return camp_df
+
+@traced(category='page')
 def show_roas_calculator():
     st.title("💰 ROAS Calculator")
     st.markdown("### Return on Ad Spend analysis and profitability insights")
@@ -29,28 +50,14 @@ def show_roas_calculator():
         - **Break-even**: Point where revenue equals cost (1:1 ratio)
         """)
 
+    cube = dm.cube
+
     # Overall ROAS
-    total_revenue = dm.tracking_df['revenue'].sum()
-    total_cost = dm.payouts_df['total_payout'].sum()
+    total_revenue = cube.total_revenue()
+    total_cost = cube.total_cost()
     overall_roas = calculate_roas(total_revenue, total_cost)
     st.metric("Overall ROAS", f"{overall_roas:.2f}x")
 
     st.markdown("---")
     st.subheader("Campaign-level ROAS")
-    # Calculate campaign ROAS
-    rev_by_campaign = dm.tracking_df.groupby('campaign')['revenue'].sum()
-    cost_by_campaign = dm.payouts_df.groupby('campaign')['total_payout'].sum()
-    camp_df = pd.DataFrame({'revenue': rev_by_campaign, 'total_payout': cost_by_campaign}).fillna(0)
-    # Basic ROAS
-    camp_df['roas'] = camp_df.apply(lambda x: calculate_roas(x['revenue'], x['total_payout']), axis=1)
-    # Incremental ROAS: baseline = total revenue - campaign revenue
-    total_rev = dm.tracking_df['revenue'].sum()
-    camp_df = camp_df.reset_index()
-    camp_df['incremental_roas'] = camp_df.apply(
-        lambda x: calculate_incremental_roas(x['revenue'], total_rev - x['revenue'], x['total_payout']),
-        axis=1
-    )
-    camp_df['incremental_roas'] = camp_df['incremental_roas'].round(2)
-    # Break-even revenue equal to cost
-    camp_df['break_even'] = camp_df['total_payout']
-    st.dataframe(camp_df)
+    st.dataframe(compute_campaign_roas(cube))
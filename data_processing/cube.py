@@ -0,0 +1,124 @@
+"""
+Pre-aggregated metrics cube shared by every dashboard page
+
+Raw tracking and payout events are rolled up once, when data is loaded:
+
+- sales: orders and revenue per influencer x campaign x brand x product x day,
+  with the influencer's name, category and platform attached
+- costs: payouts per influencer x campaign x status x payment day
+
+Posts roll up separately (aggregate_posts) to the funnel grain, influencer x
+campaign x day, where they line up with the sales cells.
+
+Pages group and filter these frames instead of the raw events, so render
+cost depends on the number of cube cells rather than the number of events.
+"""
+import pandas as pd
+
+SALES_KEYS = ['influencer_id', 'campaign', 'brand', 'product', 'date']
+COST_KEYS = ['influencer_id', 'campaign', 'status', 'date']
+INFLUENCER_ATTRIBUTES = ['name', 'category', 'platform']
+FUNNEL_KEYS = ['influencer_id', 'campaign', 'date']
+
+
+def _day(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values).dt.normalize()
+
+
+def _present(keys, df):
+    return [key for key in keys if key in df.columns]
+
+
+def aggregate_sales(tracking_df: pd.DataFrame) -> pd.DataFrame:
+    """Roll tracking events up to the sales grain"""
+    events = tracking_df.assign(date=_day(tracking_df['date']), events=1)
+    keys = _present(SALES_KEYS, events)
+    return (events.groupby(keys, observed=True, dropna=False)
+            .agg(orders=('orders', 'sum'), revenue=('revenue', 'sum'), events=('events', 'sum'))
+            .reset_index())
+
+
+def aggregate_costs(payouts_df: pd.DataFrame) -> pd.DataFrame:
+    """Roll payout records up to the cost grain"""
+    payouts = payouts_df.assign(date=_day(payouts_df['payment_date']), payouts=1)
+    keys = _present(COST_KEYS, payouts)
+    return (payouts.groupby(keys, observed=True, dropna=False)
+            .agg(total_payout=('total_payout', 'sum'), payouts=('payouts', 'sum'))
+            .reset_index())
+
+
+def aggregate_posts(posts_df: pd.DataFrame, keys=FUNNEL_KEYS) -> pd.DataFrame:
+    """Roll posts up to reach, engagements and post counts per key cell"""
+    posts = posts_df.assign(engagements=posts_df['likes'].astype('int64') + posts_df['comments'].astype('int64'), posts=1)
+    if 'date' in keys:
+        posts['date'] = _day(posts['date'])
+    return (posts.groupby(_present(keys, posts), observed=True)
+            .agg(posts=('posts', 'sum'), reach=('reach', 'sum'), engagements=('engagements', 'sum'))
+            .reset_index())
+
+
+def attach_influencer_attributes(sales: pd.DataFrame, influencers_df: pd.DataFrame) -> pd.DataFrame:
+    attributes = _present(INFLUENCER_ATTRIBUTES, influencers_df)
+    lookup = influencers_df[['id'] + attributes].rename(columns={'id': 'influencer_id'})
+    return sales.merge(lookup, on='influencer_id', how='left')
+
+
+def _combine(current: pd.DataFrame, delta: pd.DataFrame, keys, metrics) -> pd.DataFrame:
+    """Add delta cells into current cells; cost depends on cube size, not event history"""
+    combined = pd.concat([current, delta], ignore_index=True)
+    for col in current.columns:
+        # concat falls back to object when the delta brings new categories
+        if isinstance(current[col].dtype, pd.CategoricalDtype) and not isinstance(combined[col].dtype, pd.CategoricalDtype):
+            combined[col] = combined[col].astype('category')
+    keys = _present(keys, combined)
+    aggregations = {col: 'sum' if col in metrics else 'first' for col in combined.columns if col not in keys}
+    return combined.groupby(keys, observed=True, dropna=False, sort=False).agg(aggregations).reset_index()
+
+
+class MetricsCube:
+    """Sales and cost aggregates of one loaded dataset"""
+
+    def __init__(self, sales: pd.DataFrame, costs: pd.DataFrame):
+        self.sales = sales
+        self.costs = costs
+
+    @classmethod
+    def build(cls, influencers_df, tracking_df, payouts_df):
+        sales = attach_influencer_attributes(aggregate_sales(tracking_df), influencers_df)
+        return cls(sales, aggregate_costs(payouts_df))
+
+    def append(self, influencers_df, tracking_delta=None, payouts_delta=None):
+        """New cube with only the delta events aggregated and folded in"""
+        sales, costs = self.sales, self.costs
+        if tracking_delta is not None and len(tracking_delta):
+            delta = attach_influencer_attributes(aggregate_sales(tracking_delta), influencers_df)
+            sales = _combine(sales, delta, SALES_KEYS, ['orders', 'revenue', 'events'])
+        if payouts_delta is not None and len(payouts_delta):
+            costs = _combine(costs, aggregate_costs(payouts_delta), COST_KEYS, ['total_payout', 'payouts'])
+        return MetricsCube(sales, costs)
+
+    def total_revenue(self) -> float:
+        return float(self.sales['revenue'].sum())
+
+    def total_orders(self) -> int:
+        return int(self.sales['orders'].sum())
+
+    def total_cost(self) -> float:
+        return float(self.costs['total_payout'].sum())
+
+    def totals(self, sales: pd.DataFrame = None) -> pd.Series:
+        """Orders and revenue summed over sales, or over the whole cube"""
+        sales = self.sales if sales is None else sales
+        return sales[['orders', 'revenue']].sum()
+
+    def revenue_by(self, keys, sales: pd.DataFrame = None) -> pd.DataFrame:
+        """Orders and revenue grouped by the given sales keys"""
+        sales = self.sales if sales is None else sales
+        return (sales.groupby(keys, observed=True)
+                .agg(orders=('orders', 'sum'), revenue=('revenue', 'sum'))
+                .reset_index())
+
+    def cost_by(self, keys, costs: pd.DataFrame = None) -> pd.DataFrame:
+        """Payout totals grouped by the given cost keys"""
+        costs = self.costs if costs is None else costs
+        return costs.groupby(keys, observed=True)['total_payout'].sum().reset_index()
@@ -1,53 +1,417 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+from data_processing.schema import apply_schema, concat_tables, frame_memory, read_table
+from data_processing import snapshots
+from data_processing.registry import frame_digest, shared_registry
+from data_processing.cube import MetricsCube, aggregate_costs
+from data_processing.leaderboard import LEADERBOARDS, Leaderboard
+from data_processing.time_index import PrefixSums
+from data_processing.sketches import SKETCHES, DistinctSketch
+from data_processing.sql_backend import BACKENDS, SQL_TABLES, SQLMetricsCube, SQLStore
+from data_processing.validation import validate_tables
+
+TABLE_NAMES = ('influencers', 'posts', 'tracking', 'payouts')
+# Tables that accept daily delta batches
+APPENDABLE_TABLES = ('tracking', 'payouts')
+# 'pandas' keeps every table in memory; 'sql' keeps tracking on disk (see sql_backend)
+DEFAULT_BACKEND = os.environ.get('ANALYTICS_BACKEND', 'pandas')
+
+# pandas >= 3 always copies on write, so a shallow copy of a cached frame is safe to hand out
+COPY_ON_WRITE = int(pd.__version__.split('.')[0]) >= 3
+
+
+def table_for_file(file_name):
+    """Map an uploaded file name to the table it holds, or None"""
+    name = file_name.lower()
+    for table in TABLE_NAMES:
+        if name.startswith(table):
+            return table
+    return None
+
+
+def file_size(file):
+    """Size of an uploaded file in bytes"""
+    size = getattr(file, 'size', None)
+    if size is None:
+        position = file.tell()
+        size = file.seek(0, os.SEEK_END)
+        file.seek(position)
+    return size
+
+
+def file_digest(file, chunk_size=8 * 1024 * 1024):
+    """Hash a file's content in chunks and rewind it for the next reader"""
+    hasher = hashlib.blake2b(digest_size=16)
+    file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b''):
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def _key_name(key):
+    """Short stable file name for a registry key"""
+    return hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def contains_sorted(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Boolean mask of which values appear in sorted_values, by binary search"""
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    idx = np.searchsorted(sorted_values, values)
+    idx[idx == len(sorted_values)] = 0
+    return sorted_values[idx] == values
+
+
+def read_only_view(df):
+    """A copy of a cached frame that caller edits cannot reach the cache through.
+
+    Shallow under copy-on-write; older pandas shares the data of a shallow
+    copy, so there it is a full copy.
+    """
+    if df is None:
+        return None
+    return df.copy(deep=not COPY_ON_WRITE)
+
+
+def _table_property(table):
+    def get_table(self):
+        source = self.table_source(table)
+        return source if isinstance(source, pd.DataFrame) else None
+
+    def set_table(self, df):
+        if df is None:
+            self._attach(table, None)
+            return
+        key = ('frame', table, frame_digest(df))
+        if table in self.sql_tables:
+            key = ('sql',) + key
+            handle = self.registry.get_or_build(key, lambda: SQLStore.from_frame(df, table, _key_name(key)))
+        else:
+            handle = self.registry.put(key, df)
+        self._attach(table, handle)
+
+    return property(get_table, set_table,
+                    doc=f"The {table} table, or None while it is not loaded or lives on disk; "
+                        f"replacing it bumps the data version")
+
 
 class DataManager:
-    def __init__(self):
-        self.influencers_df = None
-        self.posts_df = None
-        self.tracking_df = None
-        self.payouts_df = None
+    influencers_df = _table_property('influencers')
+    posts_df = _table_property('posts')
+    tracking_df = _table_property('tracking')
+    payouts_df = _table_property('payouts')
+
+    def __init__(self, registry=None, backend=None):
+        self.backend = backend or DEFAULT_BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {self.backend!r}; expected one of {', '.join(BACKENDS)}")
+        self.sql_tables = SQL_TABLES if self.backend == 'sql' else ()
+        # Tables and derived results live in the process-wide registry; this
+        # session only holds handles, so sessions loading the same data share it
+        self.registry = shared_registry() if registry is None else registry
+        self._handles = {}
+        # Bumped whenever any of the four tables is replaced
+        self.version = 0
+        # Handles to derived results keyed by name, each stored with the version it was built from
+        self._memo = {}
+        # Content hash of the file each table was parsed from
+        self.file_hashes = {}
+        # Per-table on-disk and in-memory sizes of the last parse
+        self.load_stats = {}
+        # Content hashes of delta files already appended, per table
+        self.applied_deltas = {}
+
+    def _attach(self, table, handle):
+        """Point table at a registry handle, releasing the previous one"""
+        previous = self._handles.pop(table, None)
+        if handle is not None:
+            self._handles[table] = handle
+        if previous is not None:
+            previous.release()
+        self.version += 1
+        # Results of older versions are never served again; releasing them lets the registry evict them
+        for key, (version, result) in list(self._memo.items()):
+            if version != self.version:
+                del self._memo[key]
+                result.release()
+
+    def table_source(self, table):
+        """The table as a DataFrame, or as a SQLStore when the SQL backend keeps it on disk"""
+        handle = self._handles.get(table)
+        return None if handle is None else handle.value
+
+    def row_count(self, table):
+        source = self.table_source(table)
+        return 0 if source is None else len(source)
+
+    def preview(self, table, rows=1000):
+        """The first rows of a table, read from disk for tables that live there"""
+        source = self.table_source(table)
+        if source is None or isinstance(source, pd.DataFrame):
+            return source
+        return source.head(rows)
+
+    def data_key(self):
+        """Registry keys of the four tables; equal keys mean equal data"""
+        return tuple(handle.key if handle else None for handle in map(self._handles.get, TABLE_NAMES))
+
+    def cached(self, key, build):
+        """Return the memoized result for key, rebuilding it if the data changed since.
+
+        Results are shared through the registry with every session holding
+        the same tables, so each is built once per dataset.
+        """
+        entry = self._memo.get(key)
+        if entry is None or entry[0] != self.version:
+            entry = (self.version, self.registry.get_or_build((self.data_key(), key), build))
+            self._memo[key] = entry
+        return entry[1].value
+
+    def _seed(self, key, value):
+        """Store a result built elsewhere as the memo for key at the current version"""
+        self._memo[key] = (self.version, self.registry.put((self.data_key(), key), value))
+
+    def _build_cube(self):
+        tracking = self.table_source('tracking')
+        if any(source is None for source in (self.influencers_df, tracking, self.payouts_df)):
+            return None
+        if isinstance(tracking, SQLStore):
+            return SQLMetricsCube(tracking, self.influencers_df, aggregate_costs(self.payouts_df))
+        return MetricsCube.build(self.influencers_df, tracking, self.payouts_df)
+
+    def _build_derived(self):
+        """Build shared aggregates at load time so the first page render does not pay for them"""
+        self.cached('cube', self._build_cube)
+
+    @property
+    def cube(self):
+        """Aggregates shared by the pages, rebuilt whenever a table is replaced"""
+        return self.cached('cube', self._build_cube)
+
+    def leaderboard(self, name):
+        """Entities ranked by one metric (see leaderboard.LEADERBOARDS), built once per data version"""
+        return self.cached(f'leaderboard_{name}', lambda: Leaderboard.from_cube(self.cube, name))
+
+    def time_index(self, name):
+        """Daily prefix sums for date-range totals (see time_index.TIME_INDEXES), built once per data version"""
+        return self.cached(f'time_index_{name}', lambda: PrefixSums.from_cube(self.cube, name))
+
+    def sketch(self, name):
+        """Mergeable per-cell sketches (see sketches.SKETCHES), built once per data version"""
+        return self.cached(f'sketch_{name}', lambda: SKETCHES[name](self))
+
+    def _current(self, key):
+        """The memoized result for key if it was built at this version, without building it"""
+        entry = self._memo.get(key)
+        return entry[1].value if entry is not None and entry[0] == self.version else None
+
+    def set_data(self, influencers_df, posts_df, tracking_df, payouts_df):
+        """Replace all four tables with frames that did not come from uploads"""
+        self.influencers_df = apply_schema(influencers_df, 'influencers')
+        self.posts_df = apply_schema(posts_df, 'posts')
+        self.tracking_df = apply_schema(tracking_df, 'tracking')
+        self.payouts_df = apply_schema(payouts_df, 'payouts')
+        self.file_hashes = {}
+        self.load_stats = {}
+        self.applied_deltas = {}
+        self._build_derived()
+
+    def frames(self):
+        """The four tables keyed by table name"""
+        return {table: getattr(self, f'{table}_df') for table in TABLE_NAMES}
+
+    def save_snapshot(self, name, directory=snapshots.SNAPSHOT_DIR):
+        """Persist the loaded tables, and the cube built from them, as a columnar snapshot"""
+        if self.sql_tables:
+            raise ValueError("Snapshots hold in-memory tables; the SQL backend already keeps tracking on disk")
+        frames = self.frames()
+        if self.cube is not None:
+            frames['cube_sales'] = self.cube.sales
+            frames['cube_costs'] = self.cube.costs
+        return snapshots.save_snapshot(frames, name, self.file_hashes, directory)
+
+    def open_snapshot(self, name, directory=snapshots.SNAPSHOT_DIR):
+        """Replace the loaded tables with a memory-mapped snapshot; returns seconds taken"""
+        if self.sql_tables:
+            raise ValueError("Snapshots hold in-memory tables and cannot be opened with the SQL backend")
+        frames, manifest, seconds = snapshots.load_snapshot(name, directory)
+        for table in TABLE_NAMES:
+            df = frames.get(table)
+            # A saved snapshot never changes, so its name and save time identify the content
+            key = ('snapshot', manifest['name'], manifest['saved_at'], table)
+            self._attach(table, None if df is None else self.registry.put(key, df))
+        # Keep upload hashes so re-uploading the same files is still a no-op
+        self.file_hashes = dict(manifest.get('file_hashes', {}))
+        self.load_stats = {}
+        self.applied_deltas = {}
+        if 'cube_sales' in frames and 'cube_costs' in frames:
+            self._seed('cube', MetricsCube(frames['cube_sales'], frames['cube_costs']))
+        self._build_derived()
+        return seconds
+
+    def _parse_upload(self, file, table):
+        """Hash one uploaded file and parse it unless it is unchanged or already registered.
+
+        Runs on a loader thread; it only reads this manager's state, and the
+        registry does its own locking.
+        """
+        start = time.perf_counter()
+        digest = file_digest(file)
+        hashed = time.perf_counter()
+        result = {'table': table, 'digest': digest, 'hash_seconds': hashed - start}
+        if self.file_hashes.get(table) == digest and self.table_source(table) is not None:
+            return {**result, 'status': 'unchanged'}
+        key = ('file', table, digest)
+        if table in self.sql_tables:
+            key = ('sql',) + key
+        handle = self.registry.lookup(key)
+        shared = handle is not None
+        if not shared and table in self.sql_tables:
+            handle = self.registry.put(key, SQLStore.import_csv(file, table, _key_name(key)))
+        elif not shared:
+            handle = self.registry.put(key, read_table(file, table))
+        return {**result, 'status': 'loaded', 'handle': handle, 'shared': shared,
+                'parse_seconds': time.perf_counter() - hashed}
 
     def load_csv_files(self, uploaded_files):
-        """Load and validate all CSV files into dataframes"""
+        """Load CSV files into typed dataframes, skipping files whose content is unchanged.
+
+        Returns a mapping of table name to 'loaded' or 'unchanged'. A file
+        another session already parsed is taken from the registry unread.
+        Files are hashed and parsed concurrently, one loader thread each; the
+        parsers release the GIL, so large files overlap on multiple cores.
+        """
+        uploads = [(file, table_for_file(file.name)) for file in uploaded_files]
+        uploads = [(file, table) for file, table in uploads if table is not None]
+        with ThreadPoolExecutor(max_workers=max(len(uploads), 1), thread_name_prefix='csv-load') as pool:
+            results = list(pool.map(lambda upload: self._parse_upload(*upload), uploads))
+
         files_loaded = {}
-        for file in uploaded_files:
-            name = file.name.lower()
-            if name.startswith('influencers'):
-                self.influencers_df = pd.read_csv(file)
-                files_loaded['influencers'] = True
-            elif name.startswith('posts'):
-                self.posts_df = pd.read_csv(file)
-                files_loaded['posts'] = True
-            elif name.startswith('tracking'):
-                self.tracking_df = pd.read_csv(file)
-                files_loaded['tracking'] = True
-            elif name.startswith('payouts'):
-                self.payouts_df = pd.read_csv(file)
-                files_loaded['payouts'] = True
+        # Attach in upload order so the last file for a table wins, as when read one by one
+        for (file, table), result in zip(uploads, results):
+            files_loaded[table] = result['status']
+            if result['status'] == 'unchanged':
+                continue
+            handle = result['handle']
+            self._attach(table, handle)
+            self.file_hashes[table] = result['digest']
+            self.load_stats[table] = {
+                'file': file.name,
+                'disk_bytes': file_size(file),
+                'memory_bytes': frame_memory(handle.value) if isinstance(handle.value, pd.DataFrame) else 0,
+                'rows': len(handle.value),
+                'shared': result['shared'],
+                'hash_seconds': result['hash_seconds'],
+                'parse_seconds': result['parse_seconds'],
+            }
+            self.applied_deltas.pop(table, None)
+        if 'loaded' in files_loaded.values():
+            self._build_derived()
         return files_loaded
 
+    def append_csv_files(self, uploaded_files):
+        """Fold delta CSVs of new tracking or payout rows into the loaded data.
+
+        Returns a mapping of file name to a result dict with a 'status' of
+        'appended', 'unchanged' (this exact file was already applied) or
+        'unsupported'.
+        """
+        results = {}
+        for file in uploaded_files:
+            table = table_for_file(file.name)
+            if table not in APPENDABLE_TABLES:
+                results[file.name] = {'status': 'unsupported'}
+                continue
+            digest = file_digest(file)
+            applied = self.applied_deltas.setdefault(table, set())
+            if digest in applied:
+                results[file.name] = {'status': 'unchanged', 'table': table}
+                continue
+            counts = self.append_rows(table, read_table(file, table))
+            applied.add(digest)
+            results[file.name] = {'status': 'appended', 'table': table, **counts}
+        return results
+
+    def append_rows(self, table, delta):
+        """Append rows whose id is not loaded yet and update the cube from them alone.
+
+        Returns the number of rows appended and of duplicate rows skipped.
+        """
+        if table not in APPENDABLE_TABLES:
+            raise ValueError(f"Cannot append to the {table} table")
+        if self.cube is None:
+            raise ValueError("Load a full dataset before appending batches")
+        if table in self.sql_tables:
+            return self._append_sql(table, delta)
+        # Loaded ids may be downcast to int8 or int16; int64 holds any id a batch brings
+        ids = self.cached(f'{table}_ids', lambda: np.sort(getattr(self, f'{table}_df')['id'].to_numpy().astype('int64')))
+        unique = apply_schema(delta.drop_duplicates('id', keep='last'), table)
+        new_rows = unique[~contains_sorted(ids, unique['id'].to_numpy().astype('int64'))]
+        counts = {'rows': len(new_rows), 'duplicates': len(delta) - len(new_rows)}
+        if new_rows.empty:
+            return counts
+        cube = self.cube
+        boards = {name: self._current(f'leaderboard_{name}') for name in LEADERBOARDS}
+        buyers = self._current('sketch_buyers') if table == 'tracking' else None
+        new_ids = np.sort(new_rows['id'].to_numpy().astype('int64'))
+        ids = np.insert(ids, np.searchsorted(ids, new_ids), new_ids)
+        # The same batch appended to the same table by another session is already registered
+        key = ('append', table, self._handles[table].key, frame_digest(new_rows))
+        handle = self.registry.lookup(key)
+        if handle is None:
+            handle = self.registry.put(key, concat_tables([getattr(self, f'{table}_df'), new_rows], table))
+        self._attach(table, handle)
+        # Carry the incrementally updated results over to the new data version
+        self.cached('cube', lambda: cube.append(self.influencers_df, **{f'{table}_delta': new_rows}))
+        self._seed(f'{table}_ids', ids)
+        for name, board in boards.items():
+            if board is not None:
+                self.cached(f'leaderboard_{name}', lambda board=board: board.updated(new_rows))
+        if buyers is not None:
+            self.cached('sketch_buyers', lambda: buyers.merged(DistinctSketch.from_events(new_rows)))
+        return counts
+
+    def _append_sql(self, table, delta):
+        """Append a batch to an on-disk table in place, skipping ids already present"""
+        store = self.table_source(table)
+        unique = apply_schema(delta.drop_duplicates('id', keep='last'), table)
+        key = ('append', table, self._handles[table].key, frame_digest(unique))
+        handle = self.registry.lookup(key)
+        if handle is None:
+            handle = self.registry.put(key, store.append(unique, _key_name(key)))
+        rows = len(handle.value) - len(store)
+        buyers = self._current('sketch_buyers') if table == 'tracking' else None
+        if rows:
+            self._attach(table, handle)
+            # Registers merge by maximum, so rows already counted change nothing
+            if buyers is not None:
+                self.cached('sketch_buyers', lambda: buyers.merged(DistinctSketch.from_events(unique)))
+        # Queries scan the table, so the next cube access sees the new rows without a fold
+        return {'rows': rows, 'duplicates': len(delta) - rows}
+
     def validate_data(self):
-        """Validate data integrity and relationships"""
-        errors = []
-        # Check loaded dataframes
-        if self.influencers_df is None:
-            errors.append("Influencers data not loaded")
-        if self.posts_df is None:
-            errors.append("Posts data not loaded")
-        if self.tracking_df is None:
-            errors.append("Tracking data not loaded")
-        if self.payouts_df is None:
-            errors.append("Payouts data not loaded")
-        if errors:
-            return False, errors
-        # Validate relationships
-        invalid_posts = ~self.posts_df['influencer_id'].isin(self.influencers_df['id'])
-        if invalid_posts.any():
-            errors.append("Some posts reference non-existent influencers")
-        return len(errors) == 0, errors
+        """Validate data integrity and relationships; returns (valid, error messages)"""
+        report = self.validation_report()
+        return report.valid, report.messages()
+
+    def validation_report(self):
+        """Full-schema and referential checks of the loaded tables, with row samples per failed check"""
+        return self.cached('validation', lambda: validate_tables({table: self.table_source(table) for table in TABLE_NAMES}))
 
     def get_merged_data(self):
-        """Merge posts and tracking data with influencer info"""
+        """Merge posts and tracking data with influencer info.
+
+        The merge runs once per data version; callers get read-only views.
+        """
+        posts_with_influencers, tracking_with_influencers = self.cached('merged', self._merge)
+        return read_only_view(posts_with_influencers), read_only_view(tracking_with_influencers)
+
+    def _merge(self):
         posts_with_influencers = self.posts_df.merge(
             self.influencers_df,
             left_on='influencer_id',
@@ -0,0 +1,114 @@
+"""
+Per-metric leaderboards answered by partial selection
+
+A leaderboard keeps one row of additive totals per entity (influencer or
+campaign) and the metric ranked on, which is either one of the totals or
+the ratio of two of them (ROAS is revenue over payout). Top-K for any K,
+optionally restricted to a subset of entities, is found with argpartition
+and only the K winners are sorted. Appending a batch adds the batch's totals
+to the matching rows instead of re-aggregating the whole table.
+"""
+import numpy as np
+import pandas as pd
+
+# name -> (entity key, ranked metric, (numerator, denominator) for ratio metrics)
+LEADERBOARDS = {
+    'influencer_revenue': ('influencer_id', 'revenue', None),
+    'influencer_payout': ('influencer_id', 'total_payout', None),
+    'influencer_roas': ('influencer_id', 'roas', ('revenue', 'total_payout')),
+    'campaign_revenue': ('campaign', 'revenue', None),
+}
+SALES_TOTALS = ('revenue', 'orders')
+COST_TOTALS = ('total_payout',)
+
+
+def top_positions(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, highest first, ties in position order"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype='int64')
+    if k < len(scores):
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > kth)
+        # Among scores tied with the k-th, the earliest positions win, as with nlargest
+        tied = np.flatnonzero(scores == kth)[:k - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def top_k(df: pd.DataFrame, column: str, k: int) -> pd.DataFrame:
+    """The k rows of df with the largest column, like nlargest but by partial selection"""
+    scores = df[column].to_numpy(dtype='float64', na_value=-np.inf)
+    return df.iloc[top_positions(scores, k)]
+
+
+class Leaderboard:
+    """Entities ranked by one metric, built once per data version"""
+
+    def __init__(self, totals: pd.DataFrame, key: str, metric: str, ratio=None):
+        self.key = key
+        self.metric = metric
+        self.ratio = ratio
+        self.totals = totals.reset_index(drop=True)
+        if ratio is not None:
+            numerator = self.totals[ratio[0]].to_numpy(dtype='float64')
+            denominator = self.totals[ratio[1]].to_numpy(dtype='float64')
+            values = np.zeros(len(self.totals))
+            np.divide(numerator, denominator, out=values, where=denominator != 0)
+            self.totals[metric] = values
+        self.scores = self.totals[metric].to_numpy(dtype='float64', na_value=-np.inf)
+        self.keys = pd.Index(self.totals[key])
+
+    @classmethod
+    def from_cube(cls, cube, name: str):
+        key, metric, ratio = LEADERBOARDS[name]
+        needed = ratio if ratio is not None else (metric,)
+        parts = []
+        if any(col in SALES_TOTALS for col in needed):
+            parts.append(cube.revenue_by(key)[[key] + [col for col in SALES_TOTALS if col in needed]])
+        if any(col in COST_TOTALS for col in needed):
+            parts.append(cube.cost_by(key))
+        totals = parts[0]
+        for part in parts[1:]:
+            totals = totals.merge(part, on=key, how='outer')
+        return cls(totals.fillna({col: 0 for col in needed}), key, metric, ratio)
+
+    def __len__(self):
+        return len(self.totals)
+
+    def top(self, k: int, among=None) -> pd.DataFrame:
+        """The k leading entities, optionally only those whose key is in among"""
+        if among is None:
+            return self.totals.iloc[top_positions(self.scores, k)]
+        candidates = np.flatnonzero(self.keys.isin(among))
+        return self.totals.iloc[candidates[top_positions(self.scores[candidates], k)]]
+
+    def updated(self, delta: pd.DataFrame) -> 'Leaderboard':
+        """A new leaderboard with delta's totals added to their entities' rows.
+
+        delta holds raw rows (or partial totals) with the key column and any
+        of the additive columns; entities not seen before are appended. This
+        leaderboard is shared read-only, so it is left unchanged.
+        """
+        # A ratio metric is derived from its totals; any other metric is itself a total
+        derived = (self.metric,) if self.ratio else ()
+        additive = [col for col in self.totals.columns
+                    if col != self.key and col not in derived and col in delta.columns]
+        if self.key not in delta.columns or not additive or delta.empty:
+            return self
+        sums = delta.groupby(self.key, observed=True)[additive].sum()
+        positions = self.keys.get_indexer(sums.index)
+        known = positions >= 0
+        totals = self.totals.copy()
+        for col in additive:
+            values = totals[col].to_numpy(dtype='float64', copy=True)
+            values[positions[known]] += sums[col].to_numpy(dtype='float64')[known]
+            totals[col] = values
+        if not known.all():
+            totals = pd.concat([totals, sums[~known].reset_index()], ignore_index=True)
+            # New entities start from zero on the totals this batch does not carry
+            others = [col for col in totals.columns if col != self.key and col not in derived]
+            totals[others] = totals[others].fillna(0)
+        return Leaderboard(totals.drop(columns=self.metric) if self.ratio else totals, self.key, self.metric, self.ratio)
@@ -0,0 +1,179 @@
+"""
+Process-wide registry of loaded data shared by every browser session
+
+Streamlit serves all sessions from one process. Tables and the results
+derived from them are registered under a content key, so sessions that load
+the same files share one read-only copy instead of holding their own. Each
+session keeps a handle per entry; an entry is referenced while any handle to
+it is alive. Entries nobody references stay cached for the next session that
+loads the same data and are evicted least recently used first once the
+registry grows past its memory cap.
+
+The cap defaults to ANALYTICS_MEMORY_CAP_MB megabytes (2048 when unset).
+"""
+import hashlib
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from data_processing.schema import frame_memory
+
+DEFAULT_MEMORY_CAP = int(os.environ.get('ANALYTICS_MEMORY_CAP_MB', 2048)) * 2**20
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Content hash of a frame's columns, dtypes and values"""
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode('utf-8'))
+    hasher.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+def estimate_bytes(value) -> int:
+    """Approximate memory held by a registered value"""
+    if isinstance(value, pd.DataFrame):
+        return frame_memory(value)
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_bytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(estimate_bytes(item) for item in value.values())
+    if hasattr(value, '__dict__'):
+        return sum(estimate_bytes(item) for item in vars(value).values())
+    return sys.getsizeof(value)
+
+
+class Handle:
+    """A session's reference to a registry entry, released when dropped"""
+
+    __slots__ = ('key', 'value', '_finalizer', '__weakref__')
+
+    def __init__(self, registry, key, value):
+        self.key = key
+        self.value = value
+        self._finalizer = weakref.finalize(self, registry._release, key)
+
+    def release(self):
+        self._finalizer()
+
+
+class _Entry:
+    __slots__ = ('value', 'nbytes', 'refs')
+
+    def __init__(self, value, nbytes):
+        self.value = value
+        self.nbytes = nbytes
+        self.refs = 0
+
+
+class DatasetRegistry:
+    """Reference-counted, memory-capped store of read-only values keyed by content"""
+
+    def __init__(self, memory_cap: int = DEFAULT_MEMORY_CAP):
+        self.memory_cap = memory_cap
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _handle(self, key, entry):
+        entry.refs += 1
+        self._entries.move_to_end(key)
+        return Handle(self, key, entry.value)
+
+    def lookup(self, key):
+        """Handle to the value registered under key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.hits += 1
+            return self._handle(key, entry)
+
+    def put(self, key, value):
+        """Register value under key and return a handle to it.
+
+        When another session registered the key first, its value is kept and
+        the handle points at that shared copy.
+        """
+        nbytes = estimate_bytes(value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(value, nbytes)
+                self.nbytes += nbytes
+                self.misses += 1
+            else:
+                self.hits += 1
+            handle = self._handle(key, entry)
+            self._evict()
+            return handle
+
+    def get_or_build(self, key, build):
+        """Handle to the value under key, building and registering it on a miss.
+
+        The build runs outside the lock so one slow build does not stall
+        other sessions; if two sessions race, the first registration wins.
+        """
+        handle = self.lookup(key)
+        if handle is not None:
+            return handle
+        return self.put(key, build())
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs -= 1
+            self._evict()
+
+    def _evict(self):
+        """Drop unreferenced entries, least recently used first, until under the cap"""
+        for key in list(self._entries):
+            if self.nbytes <= self.memory_cap:
+                break
+            entry = self._entries.get(key)
+            if entry is not None and entry.refs <= 0:
+                del self._entries[key]
+                self.nbytes -= entry.nbytes
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'referenced': sum(1 for entry in self._entries.values() if entry.refs > 0),
+                'referenced_bytes': sum(entry.nbytes for entry in self._entries.values() if entry.refs > 0),
+                'bytes': self.nbytes,
+                'memory_cap': self.memory_cap,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_registry() -> DatasetRegistry:
+    """The registry shared by every session in this process"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = DatasetRegistry()
+        return _shared
@@ -0,0 +1,237 @@
+"""
+Declared column types for the four input tables and typed, chunked CSV reading
+"""
+import io
+import time
+import tracemalloc
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from pandas.api.types import is_datetime64_any_dtype
+
+# Column kinds:
+#   'id'       - integer key, downcast to the smallest type that fits
+#   'int'      - integer count, downcast but kept at least int32 so sums of
+#                two columns (likes + comments) cannot overflow
+#   'float'    - kept as float64 so currency totals do not lose precision
+#   'category' - low-cardinality string stored as a categorical
+#   'string'   - free text / high-cardinality identifiers, left as parsed
+#   'date'     - parsed once into datetime64
+SCHEMAS = {
+    'influencers': {
+        'id': 'id',
+        'name': 'string',
+        'category': 'category',
+        'gender': 'category',
+        'follower_count': 'int',
+        'platform': 'category',
+        'created_date': 'date',
+    },
+    'posts': {
+        'id': 'id',
+        'influencer_id': 'id',
+        'platform': 'category',
+        'campaign': 'category',
+        'date': 'date',
+        'url': 'string',
+        'caption': 'string',
+        'reach': 'int',
+        'likes': 'int',
+        'comments': 'int',
+        'created_date': 'date',
+    },
+    'tracking': {
+        'id': 'id',
+        'source': 'category',
+        'campaign': 'category',
+        'influencer_id': 'id',
+        'user_id': 'string',
+        'product': 'category',
+        'brand': 'category',
+        'date': 'date',
+        'orders': 'int',
+        'revenue': 'float',
+        'created_date': 'date',
+    },
+    'payouts': {
+        'id': 'id',
+        'influencer_id': 'id',
+        'campaign': 'category',
+        'basis': 'category',
+        'rate': 'float',
+        'orders': 'int',
+        'posts': 'int',
+        'total_payout': 'float',
+        'payment_date': 'date',
+        'status': 'category',
+        'created_date': 'date',
+    },
+}
+
+DEFAULT_CHUNK_ROWS = 500_000
+# CSV parser used by read_table: 'pyarrow' (multithreaded C++ reader) or 'pandas'
+CSV_ENGINE = 'pyarrow'
+# Bytes of CSV text pyarrow parses into one record batch; blocks are parsed in parallel
+ARROW_BLOCK_BYTES = 16 * 2**20
+# pyarrow type each column kind is parsed as; ids and counts are downcast afterwards
+ARROW_TYPES = {
+    'id': pa.int64(),
+    'int': pa.int64(),
+    'float': pa.float64(),
+    'category': pa.dictionary(pa.int32(), pa.string()),
+    'string': pa.string(),
+    'date': pa.timestamp('us'),
+}
+
+
+def _read_dtypes(table):
+    """dtype mapping passed to read_csv so categoricals never materialize as objects"""
+    return {col: 'category' for col, kind in SCHEMAS[table].items() if kind == 'category'}
+
+
+def _coerce_chunk(chunk: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Per-chunk conversions that do not depend on the other chunks"""
+    for col, kind in SCHEMAS[table].items():
+        if col not in chunk.columns:
+            continue
+        if kind == 'date' and not is_datetime64_any_dtype(chunk[col]):
+            chunk[col] = pd.to_datetime(chunk[col], errors='coerce')
+        elif kind == 'category' and not isinstance(chunk[col].dtype, pd.CategoricalDtype):
+            chunk[col] = chunk[col].astype('category')
+    return chunk
+
+
+def _downcast(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    for col, kind in SCHEMAS[table].items():
+        if col not in df.columns or kind not in ('id', 'int'):
+            continue
+        try:
+            values = pd.to_numeric(df[col], downcast='integer')
+        except (ValueError, TypeError):
+            # Left as parsed so validation can report the offending rows
+            continue
+        if kind == 'int' and values.dtype.kind == 'i' and values.dtype.itemsize < 4:
+            values = values.astype('int32')
+        df[col] = values
+    return df
+
+
+def concat_tables(chunks, table):
+    """Concatenate frames of one table, unifying categories so categoricals survive the concat"""
+    chunks = list(chunks)
+    if len(chunks) == 1:
+        return chunks[0]
+    for col, kind in SCHEMAS[table].items():
+        if kind != 'category' or col not in chunks[0].columns:
+            continue
+        columns = [chunk[col].astype('category') for chunk in chunks]
+        categories = pd.Index([])
+        for column in columns:
+            categories = categories.union(column.cat.categories)
+        # assign() leaves the caller's frames untouched
+        chunks = [chunk.assign(**{col: column.cat.set_categories(categories)})
+                  for chunk, column in zip(chunks, columns)]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def apply_schema(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Convert an already loaded frame to the declared column types"""
+    if df is None:
+        return None
+    return _downcast(_coerce_chunk(df.copy(), table), table)
+
+
+def iter_table(source, table: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """Typed chunks of a CSV, for callers that never hold the whole table"""
+    for chunk in pd.read_csv(source, dtype=_read_dtypes(table), chunksize=chunk_rows):
+        yield _downcast(_coerce_chunk(chunk, table), table)
+
+
+def _arrow_chunk(batch) -> pd.DataFrame:
+    """A pyarrow batch as a frame typed the way the pandas parser would type it"""
+    chunk = batch.to_pandas(date_as_object=False)
+    for col in chunk.columns:
+        values = chunk[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # pyarrow orders categories by first appearance, pandas sorts them
+            chunk[col] = values.cat.reorder_categories(values.cat.categories.sort_values())
+        elif is_datetime64_any_dtype(values):
+            chunk[col] = values.astype('datetime64[us]')
+    return chunk
+
+
+def _arrow_chunks(source, table: str):
+    """Typed chunks parsed by pyarrow's multithreaded CSV reader, one per block of text.
+
+    Every declared column is parsed as its declared type, so nothing is
+    inferred from the first block.
+    """
+    parsed = pacsv.read_csv(
+        source,
+        read_options=pacsv.ReadOptions(use_threads=True, block_size=ARROW_BLOCK_BYTES),
+        convert_options=pacsv.ConvertOptions(
+            column_types={col: ARROW_TYPES[kind] for col, kind in SCHEMAS[table].items()}),
+    )
+    batches = parsed.to_batches()
+    empty = parsed.schema.empty_table()
+    del parsed
+    chunks = []
+    # Each block's Arrow buffers are freed as soon as it is converted
+    while batches:
+        chunks.append(_coerce_chunk(_arrow_chunk(batches.pop(0)), table))
+    # A header-only file yields no batches
+    return chunks or [_coerce_chunk(_arrow_chunk(empty), table)]
+
+
+def read_table(source, table: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, engine: str = CSV_ENGINE) -> pd.DataFrame:
+    """Stream a CSV in chunks, typing each chunk as it is read.
+
+    The pyarrow engine parses blocks of ARROW_BLOCK_BYTES on pyarrow's thread
+    pool, outside the GIL, as the types declared in SCHEMAS. A file holding
+    values that do not fit those types (an unparseable date, a non-numeric
+    count) is re-read with the pandas parser in chunks of chunk_rows, which
+    leaves such values for validation to report.
+    """
+    chunks = None
+    # pyarrow reads paths and binary files; text streams go to the pandas parser
+    if engine == 'pyarrow' and not isinstance(source, io.TextIOBase):
+        try:
+            chunks = _arrow_chunks(source, table)
+        except pa.ArrowInvalid:
+            if hasattr(source, 'seek'):
+                source.seek(0)
+    if chunks is None:
+        reader = pd.read_csv(source, dtype=_read_dtypes(table), chunksize=chunk_rows)
+        chunks = [_coerce_chunk(chunk, table) for chunk in reader]
+    if not chunks:
+        return pd.DataFrame(columns=list(SCHEMAS[table]))
+    return _downcast(concat_tables(chunks, table), table)
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """In-memory size of a frame in bytes, including string payloads"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def measure_ingestion(path, table: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """Compare plain read_csv with typed chunked reading for one file.
+
+    Peak memory is traced with tracemalloc, which sees NumPy buffers but not
+    Arrow-backed string buffers, so frame_bytes is the figure to compare for
+    resident size.
+    """
+    def measure(read):
+        if hasattr(path, 'seek'):
+            path.seek(0)
+        tracemalloc.start()
+        start = time.perf_counter()
+        df = read()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {'seconds': seconds, 'peak_bytes': peak, 'frame_bytes': frame_memory(df)}
+
+    return {
+        'plain': measure(lambda: pd.read_csv(path)),
+        'typed': measure(lambda: read_table(path, table, chunk_rows)),
+    }
@@ -0,0 +1,281 @@
+"""
+Mergeable per-cell sketches for distinct counts and percentiles
+
+Exact distinct buyers or percentiles of a filtered slice would need the raw
+rows of that slice. Instead each cube cell keeps a small sketch, and the
+sketches of the cells a filter selects are merged:
+
+- DistinctSketch: HyperLogLog registers of user_id per sales cell
+  (influencer x campaign x brand x product x day). Registers merge by
+  maximum, so the union of any cells (and of a dataset and its appended
+  batches) is exact in register form; estimates carry about
+  1.04 / sqrt(2 ** HLL_PRECISION) relative error.
+- QuantileSketch: counts per logarithmic value bucket, so every quantile is
+  within QUANTILE_ACCURACY of a value in the sketched set. Bucket counts
+  merge by addition. It answers the same questions as a t-digest, with
+  a merge that is a plain sum.
+
+Both store only the (cell, slot, value) triples that are set, sorted by
+cell, so a cell with three buyers costs three registers rather than
+2 ** HLL_PRECISION. Merging the selected cells per group is one pass over
+their triples into a dense group x slot array.
+"""
+import numpy as np
+import pandas as pd
+from data_processing.cube import FUNNEL_KEYS, SALES_KEYS
+from data_processing.sql_backend import iter_frames
+
+HLL_PRECISION = 12
+QUANTILE_ACCURACY = 0.01
+SKETCH_CHUNK_ROWS = 1_000_000
+# Values below this fall in the zero bucket, reported as 0
+MIN_QUANTILE_VALUE = 1e-6
+# Merges into at most this many group x slot counters run dense; larger ones group sparsely
+DENSE_MERGE_SLOTS = 1 << 24
+# ROAS is sketched per influencer, as the Influencers page reports it
+ROAS_KEYS = ['influencer_id']
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Number of significant bits of each uint64, exactly (no float rounding)"""
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype='int64')
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >> np.uint64(shift)
+        wide = high > 0
+        lengths += shift * wide
+        values = np.where(wide, high, values)
+    return lengths + (values > 0)
+
+
+def hll_registers(values, precision: int = HLL_PRECISION):
+    """HyperLogLog register and rank of each value's 64-bit hash"""
+    hashes = pd.util.hash_array(np.asarray(values, dtype=object))
+    registers = (hashes >> np.uint64(64 - precision)).astype('int32')
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    ranks = (64 - precision) - _bit_length(rest) + 1
+    return registers, ranks.astype('uint8')
+
+
+def _gamma(accuracy: float) -> float:
+    return (1 + accuracy) / (1 - accuracy)
+
+
+def quantile_buckets(values, accuracy: float = QUANTILE_ACCURACY) -> np.ndarray:
+    """Logarithmic bucket of each value; values below MIN_QUANTILE_VALUE share the lowest bucket"""
+    log_gamma = np.log(_gamma(accuracy))
+    floor = int(np.floor(np.log(MIN_QUANTILE_VALUE) / log_gamma))
+    values = np.asarray(values, dtype='float64')
+    buckets = np.full(len(values), floor, dtype='int64')
+    positive = values >= MIN_QUANTILE_VALUE
+    buckets[positive] = np.ceil(np.log(values[positive]) / log_gamma)
+    return buckets.astype('int32')
+
+
+def bucket_values(buckets: np.ndarray, accuracy: float = QUANTILE_ACCURACY) -> np.ndarray:
+    """The value each bucket stands for, within accuracy of everything in it"""
+    gamma = _gamma(accuracy)
+    floor = int(np.floor(np.log(MIN_QUANTILE_VALUE) / np.log(gamma)))
+    values = 2 * gamma ** buckets.astype('float64') / (gamma + 1)
+    return np.where(buckets <= floor, 0.0, values)
+
+
+def _group_starts(groups: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.diff(groups, prepend=-1)) if len(groups) else np.empty(0, dtype='int64')
+
+
+class CellSketch:
+    """Sketches of every cell of a grain, held as sorted (cell, slot, value) triples"""
+
+    combine = 'sum'
+    value_dtype = 'int64'
+
+    def __init__(self, cells: pd.DataFrame, cell: np.ndarray, slots: np.ndarray, values: np.ndarray):
+        self.cells = cells.reset_index(drop=True)
+        self.keys = list(cells.columns)
+        self._cell = cell
+        self._slots = slots
+        self._values = values
+
+    @classmethod
+    def from_parts(cls, parts, keys, **params):
+        """Combine frames of keys + slot + value rows, which may repeat cells and slots"""
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            empty = pd.DataFrame({key: pd.Series(dtype='object') for key in keys})
+            return cls(empty, np.empty(0, dtype='int64'), np.empty(0, dtype='int32'),
+                       np.empty(0, dtype=cls.value_dtype), **params)
+        combined = (pd.concat(parts, ignore_index=True)
+                    .groupby(keys + ['slot'], observed=True, dropna=False, sort=True)['value']
+                    .agg(cls.combine).reset_index())
+        # Sorted by cell then slot, so each cell's triples are one run
+        cell = combined.groupby(keys, observed=True, dropna=False, sort=True).ngroup().to_numpy().astype('int64')
+        cells = combined[keys].iloc[_group_starts(cell)]
+        return cls(cells, cell, combined['slot'].to_numpy().astype('int32'),
+                   combined['value'].to_numpy().astype(cls.value_dtype), **params)
+
+    def _params(self) -> dict:
+        return {}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def long(self) -> pd.DataFrame:
+        """One row per stored triple, with the cell's keys"""
+        return self.cells.iloc[self._cell].reset_index(drop=True).assign(slot=self._slots, value=self._values)
+
+    def merged(self, other: 'CellSketch') -> 'CellSketch':
+        """A sketch of both sketches' data; cells present in both are merged"""
+        return type(self).from_parts([self.long(), other.long()], self.keys, **self._params())
+
+    def _reduce(self, labels=None, positions=None):
+        """Merge the selected cells per label: sorted (group, slot, value) triples and the group labels.
+
+        labels gives each cell's group (missing labels are left out); None
+        merges every selected cell into one group. positions selects cells.
+        """
+        if labels is None:
+            codes, groups = np.zeros(len(self.cells), dtype='int64'), pd.Index([None])
+        else:
+            codes, groups = pd.factorize(np.asarray(labels))
+        pair_groups = codes[self._cell] if len(self._cell) else np.empty(0, dtype='int64')
+        keep = pair_groups >= 0
+        if positions is not None:
+            chosen = np.zeros(len(self.cells), dtype=bool)
+            chosen[positions] = True
+            keep &= chosen[self._cell]
+        base = int(self._slots.min()) if len(self._slots) else 0
+        span = int(self._slots.max()) - base + 1 if len(self._slots) else 1
+        flat = pair_groups[keep].astype('int64') * span + (self._slots[keep] - base)
+        values = self._values[keep]
+        if len(groups) * span <= DENSE_MERGE_SLOTS:
+            if self.combine == 'max':
+                dense = np.zeros(len(groups) * span, dtype=self.value_dtype)
+                np.maximum.at(dense, flat, values)
+            else:
+                dense = np.bincount(flat, weights=values, minlength=len(groups) * span).astype(self.value_dtype)
+            flat = np.flatnonzero(dense)
+            values = dense[flat]
+        else:
+            merged = pd.Series(values).groupby(flat, sort=True).agg(self.combine)
+            flat, values = merged.index.to_numpy(), merged.to_numpy()
+        return flat // span, (flat % span + base).astype('int32'), values, groups
+
+
+class DistinctSketch(CellSketch):
+    """HyperLogLog registers per cell; estimates distinct values over any union of cells"""
+
+    combine = 'max'
+    value_dtype = 'uint8'
+
+    def __init__(self, cells, cell, slots, values, precision: int = HLL_PRECISION):
+        super().__init__(cells, cell, slots, values)
+        self.precision = precision
+
+    def _params(self) -> dict:
+        return {'precision': self.precision}
+
+    @classmethod
+    def from_events(cls, events, column: str = 'user_id', keys=SALES_KEYS,
+                    chunk_rows: int = SKETCH_CHUNK_ROWS, precision: int = HLL_PRECISION):
+        """Registers of column's values per keys cell, read chunk by chunk from a DataFrame or SQLStore"""
+        keys = [key for key in keys if key in events.columns]
+        parts = []
+        for chunk in iter_frames(events, chunk_rows, columns=keys + [column]):
+            chunk = chunk[chunk[column].notna()]
+            registers, ranks = hll_registers(chunk[column], precision)
+            part = chunk[keys].assign(slot=registers, value=ranks)
+            if 'date' in keys:
+                part['date'] = pd.to_datetime(part['date']).dt.normalize()
+            parts.append(part.groupby(keys + ['slot'], observed=True, dropna=False)['value'].max().reset_index())
+        return cls.from_parts(parts, keys, precision=precision)
+
+    def estimate_by(self, labels, positions=None) -> pd.Series:
+        """Estimated distinct values per label over the selected cells"""
+        groups, _, ranks, labels = self._reduce(labels, positions)
+        m = 1 << self.precision
+        starts = _group_starts(groups)
+        present = np.diff(np.append(starts, len(groups)))
+        harmonic = np.add.reduceat(np.ldexp(1.0, -ranks.astype('int64')), starts) if len(starts) else np.empty(0)
+        empty = m - present
+        estimates = (0.7213 / (1 + 1.079 / m)) * m * m / (empty + harmonic)
+        # Small cardinalities leave registers empty; linear counting is more accurate there
+        small = (estimates <= 2.5 * m) & (empty > 0)
+        estimates[small] = m * np.log(m / empty[small])
+        result = pd.Series(0.0, index=labels, name='distinct')
+        result.iloc[groups[starts]] = estimates
+        return result
+
+    def estimate(self, positions=None) -> float:
+        """Estimated distinct values over the selected cells (all when positions is None)"""
+        return float(self.estimate_by(None, positions).iloc[0])
+
+
+class QuantileSketch(CellSketch):
+    """Value counts per logarithmic bucket per cell; quantiles over any union of cells"""
+
+    def __init__(self, cells, cell, slots, values, accuracy: float = QUANTILE_ACCURACY):
+        super().__init__(cells, cell, slots, values)
+        self.accuracy = accuracy
+
+    def _params(self) -> dict:
+        return {'accuracy': self.accuracy}
+
+    @classmethod
+    def from_values(cls, cells: pd.DataFrame, values, accuracy: float = QUANTILE_ACCURACY):
+        """Sketch values, each belonging to the cell in the same row of cells"""
+        values = np.asarray(values, dtype='float64')
+        known = ~np.isnan(values)
+        part = cells[known].assign(slot=quantile_buckets(values[known], accuracy), value=1)
+        return cls.from_parts([part], list(cells.columns), accuracy=accuracy)
+
+    def quantiles_by(self, labels, qs, positions=None) -> pd.DataFrame:
+        """Quantiles qs and value counts per label over the selected cells; NaN where a label has none"""
+        groups, buckets, counts, labels = self._reduce(labels, positions)
+        result = pd.DataFrame(np.nan, index=labels, columns=list(qs))
+        result['count'] = 0
+        starts = _group_starts(groups)
+        if not len(starts):
+            return result
+        running = np.cumsum(counts)
+        sizes = np.add.reduceat(counts, starts)
+        before = running[starts] - counts[starts]
+        rows = groups[starts]
+        for q in qs:
+            # The bucket holding the value of rank q * (n - 1) in each group
+            found = np.searchsorted(running, before + q * (sizes - 1), side='right')
+            result.iloc[rows, result.columns.get_loc(q)] = bucket_values(buckets[found], self.accuracy)
+        result.iloc[rows, result.columns.get_loc('count')] = sizes
+        return result
+
+    def quantiles(self, qs, positions=None) -> pd.Series:
+        """Quantiles qs over the selected cells (all when positions is None)"""
+        return self.quantiles_by(None, qs, positions).iloc[0][list(qs)]
+
+
+def roas_sketch(cube, keys=ROAS_KEYS, accuracy: float = QUANTILE_ACCURACY) -> QuantileSketch:
+    """ROAS of every entity of keys with a payout, one value per cell"""
+    keys = [key for key in keys if key in cube.costs.columns]
+    totals = cube.revenue_by(keys)[keys + ['revenue']].merge(cube.cost_by(keys), on=keys, how='outer')
+    totals = totals[totals['total_payout'].fillna(0) > 0]
+    roas = totals['revenue'].fillna(0).to_numpy(dtype='float64') / totals['total_payout'].to_numpy(dtype='float64')
+    return QuantileSketch.from_values(totals[keys], roas, accuracy)
+
+
+def engagement_sketch(posts_df: pd.DataFrame, keys=FUNNEL_KEYS, accuracy: float = QUANTILE_ACCURACY) -> QuantileSketch:
+    """Engagement rate (likes and comments, percent of reach) of every post with reach, per funnel cell"""
+    keys = [key for key in keys if key in posts_df.columns]
+    posts = posts_df[posts_df['reach'].fillna(0) > 0]
+    engagements = posts['likes'].to_numpy(dtype='float64', na_value=0) + posts['comments'].to_numpy(dtype='float64', na_value=0)
+    cells = posts[keys].reset_index(drop=True)
+    if 'date' in keys:
+        cells['date'] = pd.to_datetime(cells['date']).dt.normalize()
+    return QuantileSketch.from_values(cells, engagements / posts['reach'].to_numpy(dtype='float64') * 100, accuracy)
+
+
+# name -> builder from a DataManager
+SKETCHES = {
+    'buyers': lambda dm: DistinctSketch.from_events(dm.table_source('tracking')),
+    'roas': lambda dm: roas_sketch(dm.cube),
+    'engagement': lambda dm: engagement_sketch(dm.posts_df),
+}
@@ -0,0 +1,83 @@
+"""
+Columnar on-disk snapshots of a loaded dataset
+
+Each snapshot is a directory holding one uncompressed Arrow IPC (Feather v2)
+file per table plus a small JSON manifest. Uncompressed files can be memory
+mapped, so reopening a snapshot maps the columns instead of parsing CSV.
+"""
+import json
+import re
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+import pyarrow.feather as feather
+
+SNAPSHOT_DIR = Path(__file__).resolve().parent.parent / 'data' / 'snapshots'
+MANIFEST = 'manifest.json'
+
+
+def snapshot_name(name: str) -> str:
+    """Normalize a user supplied snapshot name into a safe directory name"""
+    cleaned = re.sub(r'[^A-Za-z0-9_-]+', '_', name.strip()).strip('_')
+    return cleaned or datetime.now().strftime('snapshot_%Y%m%d_%H%M%S')
+
+
+def save_snapshot(frames: dict, name: str, file_hashes: dict = None, directory: Path = SNAPSHOT_DIR) -> Path:
+    """Write each table as an Arrow IPC file and record a manifest"""
+    target = Path(directory) / snapshot_name(name)
+    staging = target.with_name(target.name + '.tmp')
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+    tables = {}
+    for table, df in frames.items():
+        path = staging / f'{table}.arrow'
+        feather.write_feather(df.reset_index(drop=True), path, compression='uncompressed')
+        tables[table] = {'rows': len(df), 'bytes': path.stat().st_size}
+    manifest = {
+        'name': target.name,
+        'saved_at': datetime.now().isoformat(timespec='seconds'),
+        'tables': tables,
+        'file_hashes': file_hashes or {},
+    }
+    (staging / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    # Swap the finished snapshot in so a crash never leaves a half-written one behind
+    if target.exists():
+        shutil.rmtree(target)
+    staging.rename(target)
+    return target
+
+
+def list_snapshots(directory: Path = SNAPSHOT_DIR) -> list:
+    """Manifests of all saved snapshots, newest first"""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    manifests = []
+    for manifest_path in directory.glob(f'*/{MANIFEST}'):
+        try:
+            manifests.append(json.loads(manifest_path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(manifests, key=lambda m: m.get('saved_at', ''), reverse=True)
+
+
+def load_snapshot(name: str, directory: Path = SNAPSHOT_DIR):
+    """Memory-map a snapshot's tables.
+
+    Returns (frames, manifest, seconds).
+    """
+    source = Path(directory) / snapshot_name(name)
+    manifest = json.loads((source / MANIFEST).read_text())
+    start = time.perf_counter()
+    frames = {}
+    for table in manifest['tables']:
+        arrow_table = feather.read_table(source / f'{table}.arrow', memory_map=True)
+        # split_blocks lets numeric and datetime columns stay views of the mapped file
+        frames[table] = arrow_table.to_pandas(split_blocks=True)
+    return frames, manifest, time.perf_counter() - start
+
+
+def delete_snapshot(name: str, directory: Path = SNAPSHOT_DIR):
+    shutil.rmtree(Path(directory) / snapshot_name(name), ignore_errors=True)
@@ -0,0 +1,398 @@
+"""
+On-disk SQL backend for tables too large to hold in pandas
+
+With the 'sql' backend the tracking table is imported chunk by chunk into a
+SQLite database under data/warehouse/ and never loaded as a DataFrame.
+Page aggregations run as GROUP BY queries that scan the file, and only their
+results come back as pandas frames. Databases are named by content hash, so
+an upload that was imported before, by any session or an earlier run of the
+app, is opened instead of re-imported. Appended batches are inserted into
+the database of the import they extend and recorded by rowid range, so an
+append costs the size of the batch, not of the history before it.
+
+Select the backend at startup with ANALYTICS_BACKEND=sql or
+`streamlit run app.py -- --backend sql`; pandas remains the default.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from itertools import chain
+from pathlib import Path
+import pandas as pd
+from data_processing.cube import INFLUENCER_ATTRIBUTES, SALES_KEYS, MetricsCube, attach_influencer_attributes
+from data_processing.schema import SCHEMAS, apply_schema, iter_table
+
+BACKENDS = ('pandas', 'sql')
+WAREHOUSE_DIR = Path(__file__).resolve().parent.parent / 'data' / 'warehouse'
+# Tables kept on disk by the SQL backend; the rest stay in pandas
+SQL_TABLES = ('tracking',)
+CHUNK_ROWS = 200_000
+# Seconds a query or append waits for another connection's write to finish
+BUSY_TIMEOUT = 30
+# Bound parameters per INSERT statement; 999 is the lowest limit SQLite builds ship with
+SQL_VARIABLES = 999
+# Columns the cube and filter queries select on, indexed once the bulk load is done
+INDEXED_COLUMNS = ('id', 'influencer_id', 'campaign', 'brand', 'date')
+SQL_TYPES = {'id': 'INTEGER', 'int': 'INTEGER', 'float': 'REAL', 'category': 'TEXT', 'string': 'TEXT', 'date': 'TEXT'}
+
+
+def _column_type(table: str, col: str, dtype) -> str:
+    kind = SCHEMAS.get(table, {}).get(col)
+    if kind is not None:
+        return SQL_TYPES[kind]
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    return 'REAL' if pd.api.types.is_float_dtype(dtype) else 'TEXT'
+
+
+def _sql_rows(chunk: pd.DataFrame) -> list:
+    """Rows of Python scalars sqlite3 can bind; dates become sortable ISO text"""
+    columns = []
+    for col in chunk.columns:
+        column = chunk[col]
+        if pd.api.types.is_datetime64_any_dtype(column):
+            column = column.dt.strftime('%Y-%m-%d %H:%M:%S')
+        columns.append(column.to_numpy(dtype=object, na_value=None) if column.hasnans else column.tolist())
+    return list(zip(*columns))
+
+
+def _insert_rows(conn: sqlite3.Connection, table: str, chunk: pd.DataFrame):
+    """INSERT OR IGNORE a chunk as multi-row statements of up to SQL_VARIABLES parameters"""
+    names = ', '.join(f'"{col}"' for col in chunk.columns)
+    row = '(' + ', '.join('?' * len(chunk.columns)) + ')'
+    per_statement = max(1, SQL_VARIABLES // len(chunk.columns))
+    rows = _sql_rows(chunk)
+    for start in range(0, len(rows), per_statement):
+        batch = rows[start:start + per_statement]
+        conn.execute(f'INSERT OR IGNORE INTO "{table}" ({names}) VALUES {", ".join([row] * len(batch))}',
+                     list(chain.from_iterable(batch)))
+
+
+def _rowid_condition(ranges) -> str:
+    """WHERE condition selecting the given (lo, hi) rowid ranges, adjacent ones merged"""
+    merged = []
+    for lo, hi in sorted(ranges):
+        if lo > hi:
+            continue
+        if merged and lo == merged[-1][1] + 1:
+            merged[-1][1] = hi
+        else:
+            merged.append([lo, hi])
+    # The unary plus keeps the planner on the filter column indexes rather than the rowid range
+    return ' OR '.join(f'+rowid BETWEEN {lo} AND {hi}' for lo, hi in merged) or '0'
+
+
+def _has_batches(path: Path) -> bool:
+    """Whether path is a database this version can open; older ones lack the batch table and are rebuilt"""
+    if not path.exists():
+        return False
+    with closing(sqlite3.connect(f'file:{path}?mode=ro', uri=True)) as conn:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE name = '_batches'").fetchone() is not None
+
+
+def iter_frames(source, chunk_rows: int = CHUNK_ROWS, columns=None):
+    """Chunks of a DataFrame or of a SQLStore table, so writers can take either.
+
+    columns, when given, limits the chunks to those columns.
+    """
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_rows):
+            chunk = source.iloc[start:start + chunk_rows]
+            yield chunk if columns is None else chunk[list(columns)]
+    else:
+        yield from source.iter_chunks(chunk_rows, columns)
+
+
+class SQLStore:
+    """One version of a table in a SQLite database file.
+
+    A file holds the imported rows plus every batch appended to them since,
+    each batch recorded in `_batches` with the range of rowids it was
+    inserted as. A store reads only the batches of its own version, through
+    a temporary view that shadows the table on its connections, so versions
+    that branch from the same import share one file.
+    """
+
+    def __init__(self, path, table: str, batches):
+        self.path = Path(path)
+        self.table = table
+        self.batches = tuple(batches)
+        self._local = threading.local()
+        with closing(sqlite3.connect(self.path)) as conn:
+            ranges = conn.execute(
+                'SELECT lo, hi FROM _batches WHERE key IN (SELECT value FROM json_each(?)) ORDER BY lo',
+                (json.dumps(self.batches),)).fetchall()
+        self._rowids = _rowid_condition(ranges)
+        self.columns = pd.Index(self.query(f'SELECT * FROM "{table}" LIMIT 0').columns)
+        self._rows = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # sqlite3 connections belong to the thread that opened them
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+            # Unqualified names resolve to the temp schema first, so queries see only this version
+            conn.execute(f'CREATE TEMP VIEW "{self.table}" AS SELECT * FROM main."{self.table}" WHERE {self._rowids}')
+        return conn
+
+    @classmethod
+    def build(cls, chunks, table: str, key: str, directory=None):
+        """Write chunks into a new database named key, or open it if it already exists"""
+        directory = Path(directory or WAREHOUSE_DIR)
+        path = directory / f'{table}_{key}.sqlite'
+        if _has_batches(path):
+            return cls(path, table, [key])
+        directory.mkdir(parents=True, exist_ok=True)
+        staging = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        conn = sqlite3.connect(staging)
+        try:
+            # The staging file is private until renamed, so a failed import is simply rebuilt
+            conn.execute('PRAGMA journal_mode = OFF')
+            conn.execute('PRAGMA synchronous = OFF')
+            for chunk in chunks:
+                columns = ', '.join(f'"{col}" {_column_type(table, col, dtype)}' for col, dtype in chunk.dtypes.items())
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns})')
+                _insert_rows(conn, table, chunk)
+            # An empty CSV still gets its table
+            columns = ', '.join(f'"{col}" {SQL_TYPES[kind]}' for col, kind in SCHEMAS[table].items())
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns})')
+            present = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+            for col in INDEXED_COLUMNS:
+                if col in present:
+                    conn.execute(f'CREATE INDEX "{table}_{col}" ON "{table}" ("{col}")')
+            # Statistics let the planner pick the most selective index of a filter
+            conn.execute('ANALYZE')
+            conn.execute('CREATE TABLE _batches (key TEXT PRIMARY KEY, lo INTEGER, hi INTEGER)')
+            conn.execute(f'INSERT INTO _batches SELECT ?, 1, COALESCE(MAX(rowid), 0) FROM "{table}"', (key,))
+            conn.commit()
+            # Appends then write in place while other sessions keep reading
+            conn.execute('PRAGMA journal_mode = WAL')
+        finally:
+            conn.close()
+        # Another session may have finished the same import first; either copy is complete
+        os.replace(staging, path)
+        return cls(path, table, [key])
+
+    @classmethod
+    def import_csv(cls, source, table: str, key: str, directory=None, chunk_rows: int = CHUNK_ROWS):
+        """Import a CSV in typed chunks, holding one chunk in memory at a time"""
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return cls.build(iter_table(source, table, chunk_rows), table, key, directory)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, table: str, key: str, directory=None):
+        return cls.build(iter_frames(df), table, key, directory)
+
+    def append(self, delta: pd.DataFrame, key: str):
+        """A new version holding this one plus the delta rows whose id is new.
+
+        The rows are inserted into the same file as batch key, in one
+        transaction; a batch already recorded under key is reused as it is.
+        """
+        with closing(sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)) as conn:
+            # IMMEDIATE takes the write lock up front, so racing appends of one batch run one after the other
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if conn.execute('SELECT 1 FROM _batches WHERE key = ?', (key,)).fetchone() is None:
+                    ids = json.dumps(delta['id'].astype('int64').tolist())
+                    present = conn.execute(
+                        f'SELECT id FROM main."{self.table}" WHERE id IN (SELECT value FROM json_each(?)) AND ({self._rowids})',
+                        (ids,)).fetchall()
+                    new_rows = delta[~delta['id'].isin([id_ for id_, in present])]
+                    lo = conn.execute(f'SELECT COALESCE(MAX(rowid), 0) + 1 FROM main."{self.table}"').fetchone()[0]
+                    for chunk in iter_frames(new_rows):
+                        _insert_rows(conn, self.table, chunk)
+                    conn.execute('INSERT INTO _batches VALUES (?, ?, ?)', (key, lo, lo + len(new_rows) - 1))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return SQLStore(self.path, self.table, self.batches + (key,))
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def __len__(self):
+        if self._rows is None:
+            self._rows = int(self.connection.execute(f'SELECT COUNT(*) FROM "{self.table}"').fetchone()[0])
+        return self._rows
+
+    def duplicated_ids(self):
+        """Ids held by more than one row"""
+        return self.query(f'SELECT id FROM "{self.table}" GROUP BY id HAVING COUNT(*) > 1')['id'].to_numpy()
+
+    def disk_bytes(self) -> int:
+        return self.path.stat().st_size
+
+    def head(self, rows: int = 1000) -> pd.DataFrame:
+        return apply_schema(self.query(f'SELECT * FROM "{self.table}" ORDER BY id LIMIT ?', (rows,)), self.table)
+
+    def iter_chunks(self, chunk_rows: int = CHUNK_ROWS, columns=None):
+        """Typed chunks of the whole table, or of the given columns, in id order"""
+        select = '*' if columns is None else ', '.join(f'"{col}"' for col in columns)
+        reader = pd.read_sql_query(f'SELECT {select} FROM "{self.table}" ORDER BY id', self.connection, chunksize=chunk_rows)
+        for chunk in reader:
+            yield apply_schema(chunk, self.table)
+
+
+def _day(column: str) -> str:
+    # Dates are stored as 'YYYY-MM-DD HH:MM:SS', so the day is the first ten characters
+    return f'substr("{column}", 1, 10)'
+
+
+class SalesSelection:
+    """A filtered slice of the on-disk tracking table, as a WHERE clause and its parameters"""
+
+    def __init__(self, conditions, params):
+        self.where = ' AND '.join(conditions)
+        self.params = tuple(params)
+
+
+class SalesFilter:
+    """Campaign page filters for the SQL cube, answered without loading the sales grain.
+
+    Offers the options, date_min, date_max and select() of
+    utils.filter_index.FilterIndex, but select() returns a SalesSelection
+    that SQLMetricsCube queries take in place of a filtered sales frame.
+    Influencer attributes filter through the ids of matching influencers.
+    """
+
+    def __init__(self, store: SQLStore, influencers_df: pd.DataFrame,
+                 columns=('brand', 'platform', 'campaign', 'product', 'category')):
+        table = f'"{store.table}"'
+        self.options = {}
+        self._attributes = {}
+        present = None
+        for col in columns:
+            if col in store.columns:
+                values = store.query(f'SELECT DISTINCT "{col}" FROM {table} WHERE "{col}" IS NOT NULL')[col]
+                self.options[col] = sorted(values)
+            elif col in INFLUENCER_ATTRIBUTES and col in influencers_df.columns and 'influencer_id' in store.columns:
+                if present is None:
+                    present = store.query(f'SELECT DISTINCT influencer_id FROM {table}')['influencer_id']
+                attribute = influencers_df.set_index('id')[col].dropna()
+                self._attributes[col] = attribute
+                self.options[col] = sorted(attribute[attribute.index.isin(present)].unique())
+        self.date_min = self.date_max = None
+        if 'date' in store.columns:
+            low, high = store.connection.execute(f'SELECT MIN({_day("date")}), MAX({_day("date")}) FROM {table}').fetchone()
+            if low is not None:
+                self.date_min, self.date_max = pd.Timestamp(low), pd.Timestamp(high)
+
+    def select(self, values: dict = None, date_range=None):
+        """The selection matching every given filter, or None when nothing is filtered.
+
+        `values` maps column to a selected value; 'All' and None are ignored.
+        """
+        conditions, params = [], []
+        for col, value in (values or {}).items():
+            if value in (None, 'All') or col not in self.options:
+                continue
+            if col in self._attributes:
+                attribute = self._attributes[col]
+                ids = attribute.index[attribute == value].astype('int64').tolist()
+                conditions.append('influencer_id IN (SELECT value FROM json_each(?))')
+                params.append(json.dumps(ids))
+            else:
+                conditions.append(f'"{col}" = ?')
+                params.append(value)
+        if date_range is not None and self.date_min is not None:
+            start, end = (pd.Timestamp(day).normalize() for day in date_range)
+            # Stored dates sort as text, and every time on the end day is before the next day
+            conditions.append('"date" >= ? AND "date" < ?')
+            params += [start.strftime('%Y-%m-%d'), (end + pd.Timedelta(days=1)).strftime('%Y-%m-%d')]
+        return SalesSelection(conditions, params) if conditions else None
+
+
+class SQLMetricsCube(MetricsCube):
+    """MetricsCube whose sales side is answered by queries on the on-disk tracking table.
+
+    Costs stay a pandas frame as in MetricsCube. Pages filter through
+    sales_filter(), whose selections every query takes in place of a sales
+    frame, so the sales grain stays on disk; `sales` still materializes it
+    on first use for callers that need the cells themselves.
+    """
+
+    def __init__(self, store: SQLStore, influencers_df: pd.DataFrame, costs: pd.DataFrame):
+        self.store = store
+        self.influencers_df = influencers_df
+        self.costs = costs
+        self._sales = None
+
+    def _sales_query(self, keys, dropna: bool = False, selection: SalesSelection = None) -> pd.DataFrame:
+        select = [f'{_day("date")} AS "date"' if key == 'date' else f'"{key}"' for key in keys]
+        select += ['SUM(orders) AS orders', 'SUM(revenue) AS revenue', 'COUNT(*) AS events']
+        sql = f'SELECT {", ".join(select)} FROM "{self.store.table}"'
+        conditions = [f'"{key}" IS NOT NULL' for key in keys] if dropna else []
+        params = ()
+        if selection is not None:
+            conditions.append(selection.where)
+            params = selection.params
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if keys:
+            sql += ' GROUP BY ' + ', '.join(str(i + 1) for i in range(len(keys)))
+        return self.query(sql, params)
+
+    def sales_filter(self) -> SalesFilter:
+        return SalesFilter(self.store, self.influencers_df)
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        """Run SQL against the tracking table and type the result's known columns"""
+        result = self.store.query(sql, params)
+        if 'date' in result.columns:
+            result['date'] = pd.to_datetime(result['date'])
+        return result
+
+    @property
+    def sales(self) -> pd.DataFrame:
+        if self._sales is None:
+            keys = [key for key in SALES_KEYS if key in self.store.columns]
+            sales = apply_schema(self._sales_query(keys), 'tracking')
+            self._sales = attach_influencer_attributes(sales, self.influencers_df)
+        return self._sales
+
+    def total_revenue(self) -> float:
+        return float(self.store.connection.execute(f'SELECT TOTAL(revenue) FROM "{self.store.table}"').fetchone()[0])
+
+    def total_orders(self) -> int:
+        return int(self.store.connection.execute(f'SELECT TOTAL(orders) FROM "{self.store.table}"').fetchone()[0])
+
+    def totals(self, sales=None) -> pd.Series:
+        """Orders and revenue of a SalesSelection, a sales frame, or the whole table"""
+        if sales is not None and not isinstance(sales, SalesSelection):
+            return super().totals(sales)
+        sql = f'SELECT TOTAL(orders), TOTAL(revenue) FROM "{self.store.table}"'
+        if sales is not None:
+            sql += f' WHERE {sales.where}'
+        orders, revenue = self.store.connection.execute(sql, sales.params if sales is not None else ()).fetchone()
+        return pd.Series({'orders': orders, 'revenue': revenue})
+
+    def revenue_by(self, keys, sales=None) -> pd.DataFrame:
+        """Orders and revenue grouped by keys, queried from disk unless a sales frame is given.
+
+        sales may also be a SalesSelection, which limits the query to its rows.
+        Influencer attributes are joined onto the per-influencer query result
+        in pandas, where the influencers table lives.
+        """
+        selection = sales if isinstance(sales, SalesSelection) else None
+        if selection is None and (sales is not None or self._sales is not None):
+            return super().revenue_by(keys, sales)
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        attributes = [key for key in keys if key in INFLUENCER_ATTRIBUTES]
+        sql_keys = [key for key in keys if key not in attributes]
+        if attributes and 'influencer_id' not in sql_keys:
+            sql_keys.append('influencer_id')
+        # pandas groupby drops missing keys, so the query does too
+        result = self._sales_query(sql_keys, dropna=True, selection=selection).drop(columns='events')
+        for key in sql_keys:
+            if key != 'date' and SCHEMAS['tracking'].get(key) == 'category':
+                result[key] = result[key].astype('category')
+        if attributes:
+            result = attach_influencer_attributes(result, self.influencers_df)
+            result = super().revenue_by(keys, result)
+        return result.sort_values(keys, ignore_index=True)
@@ -0,0 +1,120 @@
+"""
+Daily prefix sums for date-range totals without rescanning the cube
+
+Each index holds one entity's (campaign, brand or influencer; or the whole
+dataset) daily cube cells sorted by entity then day, with the running sum of
+every metric alongside. The totals of any date range, for one entity or for
+all of them at once, are then the difference of the running sums at two
+binary-searched positions, whatever the number of rows the range covers.
+"""
+import numpy as np
+import pandas as pd
+
+SALES_METRICS = ('orders', 'revenue')
+COST_METRICS = ('total_payout',)
+# name -> (entity key or None for dataset totals, metrics)
+TIME_INDEXES = {
+    'sales': (None, SALES_METRICS),
+    'campaign_sales': ('campaign', SALES_METRICS),
+    'brand_sales': ('brand', SALES_METRICS),
+    'influencer_sales': ('influencer_id', SALES_METRICS),
+    'payouts': (None, COST_METRICS),
+    'campaign_payouts': ('campaign', COST_METRICS),
+    'influencer_payouts': ('influencer_id', COST_METRICS),
+}
+
+
+def day_numbers(values) -> np.ndarray:
+    """Days since the epoch of dates, timestamps or date strings"""
+    return np.asarray(pd.to_datetime(values)).astype('datetime64[D]').astype('int64')
+
+
+class PrefixSums:
+    """Running metric totals per entity and day, built once per data version"""
+
+    def __init__(self, cells: pd.DataFrame, key, metrics, date_column: str = 'date'):
+        self.key = key
+        self.metrics = list(metrics)
+        cells = cells[cells[date_column].notna()]
+        if key is not None:
+            cells = cells[cells[key].notna()]
+        days = day_numbers(cells[date_column])
+        if key is None:
+            codes, self.keys = np.zeros(len(cells), dtype='int64'), pd.Index([None])
+        else:
+            codes, uniques = pd.factorize(cells[key], sort=True)
+            self.keys = pd.Index(uniques)
+        self.first_day = int(days.min()) if len(days) else 0
+        self.last_day = int(days.max()) if len(days) else -1
+        # Entities occupy consecutive runs of span values, so one sorted array serves them all
+        self._span = self.last_day - self.first_day + 2
+        composite = codes.astype('int64') * self._span + (days - self.first_day)
+        order = np.argsort(composite, kind='stable')
+        self._composite = composite[order]
+        values = cells[self.metrics].to_numpy(dtype='float64', na_value=0)[order]
+        self._running = np.vstack([np.zeros((1, len(self.metrics))), np.cumsum(values, axis=0)])
+
+    @classmethod
+    def from_cube(cls, cube, name: str):
+        key, metrics = TIME_INDEXES[name]
+        keys = ['date'] if key is None else [key, 'date']
+        cells = cube.revenue_by(keys) if metrics == SALES_METRICS else cube.cost_by(keys)
+        return cls(cells, key, metrics)
+
+    def __len__(self):
+        return len(self._composite)
+
+    def _offsets(self, start, end):
+        """Day offsets of an inclusive date range, clamped to the indexed days"""
+        first = 0 if start is None else int(day_numbers([start])[0]) - self.first_day
+        last = self._span - 2 if end is None else int(day_numbers([end])[0]) - self.first_day
+        return np.clip(first, 0, self._span - 1), np.clip(last, -1, self._span - 2)
+
+    def _bounds(self, codes: np.ndarray, start, end):
+        first, last = self._offsets(start, end)
+        base = codes.astype('int64') * self._span
+        lo = np.searchsorted(self._composite, base + first, side='left')
+        hi = np.searchsorted(self._composite, base + last, side='right')
+        return lo, np.maximum(hi, lo)
+
+    def total(self, start=None, end=None, key=None) -> pd.Series:
+        """Metric totals over start..end (inclusive; None is unbounded), for one entity or all"""
+        if self.key is None or key is None:
+            lo, hi = self._bounds(np.arange(len(self.keys)), start, end)
+            sums = (self._running[hi] - self._running[lo]).sum(axis=0)
+        elif key in self.keys:
+            lo, hi = self._bounds(np.array([self.keys.get_loc(key)]), start, end)
+            sums = self._running[hi[0]] - self._running[lo[0]]
+        else:
+            sums = np.zeros(len(self.metrics))
+        return pd.Series(sums, index=self.metrics)
+
+    def totals(self, start=None, end=None) -> pd.DataFrame:
+        """Metric totals over start..end per entity with any cells in the range"""
+        lo, hi = self._bounds(np.arange(len(self.keys)), start, end)
+        present = hi > lo
+        sums = self._running[hi[present]] - self._running[lo[present]]
+        result = pd.DataFrame(sums, columns=self.metrics)
+        result.insert(0, self.key or 'key', self.keys[present])
+        return result
+
+    def between(self, edges, key=None) -> pd.DataFrame:
+        """Metric totals from each edge up to the day before the next, for one entity or all.
+
+        edges are ascending dates; the result has one row per consecutive
+        pair, labelled by its starting edge.
+        """
+        edges = pd.DatetimeIndex(edges)
+        offsets = np.clip(day_numbers(edges) - self.first_day, 0, self._span - 1)
+        if self.key is None or key is None:
+            codes = np.arange(len(self.keys))
+        elif key in self.keys:
+            codes = np.array([self.keys.get_loc(key)])
+        else:
+            codes = np.empty(0, dtype='int64')
+        targets = (codes.astype('int64')[:, None] * self._span + offsets[None, :]).ravel()
+        positions = np.searchsorted(self._composite, targets, side='left').reshape(len(codes), len(edges))
+        running = self._running[positions].sum(axis=0)
+        result = pd.DataFrame(np.diff(running, axis=0), columns=self.metrics)
+        result.insert(0, 'start', edges[:-1])
+        return result
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_processing.attribution import PostTimeline, attribute_orders
+
+
+def random_tables(seed, id_scale=1):
+    rng = np.random.default_rng(seed)
+    n_posts, n_events = 400, 5_000
+    # Distinct publish times, so the most recent prior post is unique
+    post_hours = rng.choice(120 * 24, n_posts, replace=False)
+    posts = pd.DataFrame({
+        'id': np.arange(1, n_posts + 1),
+        'influencer_id': rng.integers(0, 30, n_posts) * id_scale,
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(post_hours, unit='h'),
+    })
+    events = pd.DataFrame({
+        'id': np.arange(n_events),
+        'influencer_id': rng.integers(-2, 33, n_events) * id_scale,
+        'date': pd.Timestamp('2023-12-25') + pd.to_timedelta(rng.integers(0, 140 * 24 * 60, n_events), unit='min'),
+        'orders': rng.integers(0, 4, n_events),
+        'revenue': rng.random(n_events) * 100,
+    })
+    events.loc[::50, 'date'] = pd.NaT
+    return posts, events
+
+
+def reference_match(posts, events, window_days):
+    """The same join through pandas' merge_asof"""
+    left = events.reset_index().dropna(subset=['date']).sort_values('date')
+    right = posts.reset_index().rename(columns={'index': 'row', 'date': 'post_date'}).sort_values('post_date')
+    joined = pd.merge_asof(left, right[['row', 'influencer_id', 'post_date']], left_on='date', right_on='post_date',
+                           by='influencer_id', direction='backward', tolerance=pd.Timedelta(days=window_days))
+    expected = np.full(len(events), -1)
+    matched = joined.dropna(subset=['row'])
+    expected[matched['index'].to_numpy()] = matched['row'].astype(int).to_numpy()
+    return expected
+
+
+@pytest.mark.parametrize('window_days', [0.5, 3, 30])
+@pytest.mark.parametrize('id_scale', [1, 10**12])
+def test_match_agrees_with_merge_asof(window_days, id_scale):
+    posts, events = random_tables(int(window_days * 10), id_scale)
+    matched = PostTimeline(posts).match(events['influencer_id'], events['date'], window_days)
+    assert matched.tolist() == reference_match(posts, events, window_days).tolist()
+
+
+def test_window_is_inclusive_and_ties_go_to_the_later_row():
+    posts = pd.DataFrame({'id': [1, 2, 3], 'influencer_id': [7, 7, 8],
+                          'date': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-01-01'])})
+    times = pd.to_datetime(['2024-01-08 00:00:00', '2024-01-08 00:00:01', '2023-12-31 00:00:00', '2024-01-02 00:00:00'])
+    assert PostTimeline(posts).match([7, 7, 7, 9], times, 7).tolist() == [1, -1, -1, -1]
+
+
+def test_totals_do_not_depend_on_chunk_size():
+    posts, events = random_tables(1)
+    whole = attribute_orders(posts, events, 7)
+    chunked = attribute_orders(posts, events, 7, chunk_rows=333)
+    pd.testing.assert_frame_equal(whole, chunked)
+    credited = reference_match(posts, events, 7)
+    assert whole['events'].sum() == (credited >= 0).sum()
+    assert whole['revenue'].sum() == pytest.approx(events['revenue'][credited >= 0].sum())
+    assert whole['post_id'].tolist() == posts['id'].tolist()
+
+
+def test_posts_without_dates_get_nothing():
+    posts = pd.DataFrame({'id': [1, 2], 'influencer_id': [1, 1], 'date': pd.to_datetime(['2024-01-01', None])})
+    events = pd.DataFrame({'influencer_id': [1], 'date': pd.to_datetime(['2024-01-03']), 'orders': [2], 'revenue': [50.0]})
+    result = attribute_orders(posts, events)
+    assert result['orders'].tolist() == [2, 0] and result['revenue'].tolist() == [50.0, 0.0]
@@ -0,0 +1,24 @@
+from benchmarks.bench_pages import find_regressions, run_suite
+
+
+def test_every_case_runs_on_a_small_dataset():
+    report = run_suite([500], repeat=1, log=lambda message: None)
+    cases = {result['case'] for result in report['results']}
+    assert {'overview_kpis', 'campaign_filters_and_aggregates', 'export_csv'} <= cases
+    assert all(result['seconds'] >= 0 and result['peak_bytes'] > 0 for result in report['results'])
+
+
+def test_find_regressions_flags_slowdowns_past_threshold():
+    baseline = {'results': [
+        {'case': 'overview_kpis', 'rows': 10, 'seconds': 1.0, 'peak_bytes': 100},
+        {'case': 'insights', 'rows': 10, 'seconds': 0.001, 'peak_bytes': 100},
+    ]}
+    current = {'results': [
+        {'case': 'overview_kpis', 'rows': 10, 'seconds': 1.5, 'peak_bytes': 100},
+        # Sub-millisecond timings are noise, only memory is compared
+        {'case': 'insights', 'rows': 10, 'seconds': 0.004, 'peak_bytes': 110},
+        {'case': 'new_case', 'rows': 10, 'seconds': 9.0, 'peak_bytes': 1},
+    ]}
+    regressions = find_regressions(current, baseline, threshold=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('overview_kpis')
@@ -1,6 +1,8 @@
 import pytest
+import numpy as np
 import pandas as pd
 from utils.calculations import calculate_roas, calculate_incremental_roas, calculate_engagement_rate, calculate_conversion_rate, analyze_influencer_performance
+from utils.calculations import calculate_roas_array, calculate_incremental_roas_array, calculate_engagement_rate_array, calculate_conversion_rate_array
 
 def test_calculate_roas_zero_cost():
     assert calculate_roas(1000, 0) == 0.0
@@ -41,3 +43,51 @@ def test_analyze_influencer_performance():
     assert perf.loc[0,'revenue'] == 300
     assert perf.loc[0,'total_payout'] == 50
     assert perf.loc[0,'roas'] == pytest.approx(300/50)
+
+
+def test_array_kernels_match_scalar_versions():
+    revenue = pd.Series([1000, 0, 750, 500], index=[10, 11, 12, 13])
+    cost = pd.Series([500, 100, 0, 250], index=[10, 11, 12, 13])
+    roas = calculate_roas_array(revenue, cost)
+    assert list(roas.index) == [10, 11, 12, 13]
+    assert roas.tolist() == [calculate_roas(r, c) for r, c in zip(revenue, cost)]
+    incremental = calculate_incremental_roas_array(revenue, 100, cost)
+    assert incremental.tolist() == [calculate_incremental_roas(r, 100, c) for r, c in zip(revenue, cost)]
+    likes, comments, reach = np.array([100, 0, 5]), np.array([50, 0, 1]), np.array([1000, 100, 0])
+    engagement = calculate_engagement_rate_array(likes, comments, reach)
+    assert engagement.tolist() == [calculate_engagement_rate(*args) for args in zip(likes, comments, reach)]
+    conversion = calculate_conversion_rate_array(comments, reach)
+    assert conversion.tolist() == [calculate_conversion_rate(o, r) for o, r in zip(comments, reach)]
+
+
+def test_build_conversion_funnel_aligns_posts_and_sales():
+    from data_processing.cube import aggregate_posts
+    from utils.calculations import build_conversion_funnel
+    posts = pd.DataFrame({
+        'influencer_id': [1, 1, 2], 'campaign': ['C1', 'C1', 'C2'],
+        'date': pd.to_datetime(['2024-01-01 09:00', '2024-01-01 18:00', '2024-01-02 12:00']),
+        'reach': [1000, 1000, 500], 'likes': [80, 60, 10], 'comments': [10, 10, 0],
+    })
+    sales = pd.DataFrame({
+        'influencer_id': [1, 3], 'campaign': ['C1', 'C1'], 'date': pd.to_datetime(['2024-01-01', '2024-01-01']),
+        'orders': [4, 2], 'revenue': [400.0, 150.0],
+    })
+    keys = ['influencer_id', 'campaign', 'date']
+    funnel = build_conversion_funnel(aggregate_posts(posts, keys), sales, keys).set_index('influencer_id')
+    # Two posts on one day collapse into a single cell joined to that day's sales
+    assert funnel.loc[1, ['posts', 'reach', 'engagements', 'orders']].tolist() == [2, 2000, 160, 4]
+    assert funnel.loc[1, 'engagement_rate'] == pytest.approx(8.0)
+    assert funnel.loc[1, 'conversion_rate'] == pytest.approx(0.2)
+    # Posts without sales and sales without posts both keep their cell, with zero rates
+    assert funnel.loc[2, 'orders'] == 0 and funnel.loc[2, 'revenue'] == 0.0
+    assert funnel.loc[3, 'reach'] == 0 and funnel.loc[3, 'conversion_rate'] == 0.0
+
+
+def test_post_performance_splits_payouts_across_posts():
+    from utils.calculations import build_post_performance
+    attributed = pd.DataFrame({'post_id': [1, 2, 3, 4], 'influencer_id': [1, 1, 2, 3], 'revenue': [300.0, 0.0, 80.0, 10.0]})
+    costs = pd.DataFrame({'influencer_id': [1, 2], 'total_payout': [100.0, 40.0]})
+    posts = build_post_performance(attributed, costs, ['influencer_id']).set_index('post_id')
+    assert posts['cost'].tolist() == [50.0, 50.0, 40.0, 0.0]
+    # Posts without any payout get a ROAS of 0, as elsewhere
+    assert posts['roas'].tolist() == [6.0, 0.0, 2.0, 0.0]
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+from data_processing.cube import MetricsCube
+
+
+@pytest.fixture
+def cube_inputs():
+    influencers = pd.DataFrame({'id': [1, 2], 'name': ['A', 'B'], 'category': ['Fitness', 'Health'],
+                                'platform': ['Instagram', 'YouTube']})
+    tracking = pd.DataFrame({
+        'influencer_id': [1, 1, 2, 2],
+        'campaign': ['C1', 'C1', 'C1', 'C2'],
+        'brand': ['X', 'X', 'Y', 'Y'],
+        'product': ['P', 'P', 'P', None],
+        'date': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-01-02', '2024-01-02']),
+        'orders': [1, 2, 3, 4],
+        'revenue': [10.0, 20.0, 30.0, 40.0],
+    })
+    payouts = pd.DataFrame({
+        'influencer_id': [1, 2, 2],
+        'campaign': ['C1', 'C1', 'C2'],
+        'status': ['paid', 'paid', 'pending'],
+        'payment_date': pd.to_datetime(['2024-01-05', '2024-01-05', '2024-02-01']),
+        'total_payout': [5.0, 10.0, 20.0],
+    })
+    return influencers, tracking, payouts
+
+
+def test_cube_collapses_events_to_cells(cube_inputs):
+    cube = MetricsCube.build(*cube_inputs)
+    # The two identical influencer 1 events share one cell
+    assert len(cube.sales) == 3
+    assert cube.sales.loc[cube.sales['influencer_id'] == 1, 'events'].item() == 2
+    assert list(cube.sales.loc[cube.sales['influencer_id'] == 2, 'name']) == ['B', 'B']
+
+
+def test_cube_totals_match_raw_events(cube_inputs):
+    _, tracking, payouts = cube_inputs
+    cube = MetricsCube.build(*cube_inputs)
+    # Rows with a missing key still count towards totals
+    assert cube.total_revenue() == tracking['revenue'].sum()
+    assert cube.total_orders() == tracking['orders'].sum()
+    assert cube.total_cost() == payouts['total_payout'].sum()
+    by_campaign = cube.revenue_by('campaign').set_index('campaign')['revenue']
+    assert by_campaign.to_dict() == {'C1': 60.0, 'C2': 40.0}
+    assert cube.cost_by('status').set_index('status')['total_payout'].to_dict() == {'paid': 15.0, 'pending': 20.0}
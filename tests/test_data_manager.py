@@ -0,0 +1,141 @@
+from io import BytesIO
+import pandas as pd
+import pytest
+from data_processing import data_manager
+from data_processing.data_manager import DataManager, file_digest, read_only_view
+
+
+def make_upload(name, text):
+    file = BytesIO(text.encode('utf-8'))
+    file.name = name
+    return file
+
+
+@pytest.fixture
+def uploads():
+    return [
+        make_upload('influencers.csv', 'id,name\n1,A\n2,B\n'),
+        make_upload('posts.csv', 'id,influencer_id,likes,comments,reach\n1,1,10,2,100\n'),
+        make_upload('tracking_data.csv', 'id,influencer_id,campaign,date,orders,revenue\n1,1,C1,2024-01-01,2,200\n'),
+        make_upload('payouts.csv', 'id,influencer_id,campaign,total_payout,payment_date,status\n1,1,C1,50,2024-01-02,paid\n'),
+    ]
+
+
+def test_file_digest_rewinds():
+    file = make_upload('posts.csv', 'a,b\n1,2\n')
+    assert file_digest(file) == file_digest(file)
+    assert file.tell() == 0
+
+
+def test_identical_upload_is_reused(uploads):
+    dm = DataManager()
+    first = dm.load_csv_files(uploads)
+    assert set(first.values()) == {'loaded'}
+    tracking = dm.tracking_df
+    second = dm.load_csv_files(uploads)
+    assert set(second.values()) == {'unchanged'}
+    assert dm.tracking_df is tracking
+
+
+def test_only_changed_file_is_reread(uploads):
+    dm = DataManager()
+    dm.load_csv_files(uploads)
+    uploads[2] = make_upload('tracking_data.csv', 'id,influencer_id,campaign,date,orders,revenue\n1,1,C1,2024-01-01,3,300\n')
+    status = dm.load_csv_files(uploads)
+    assert status['tracking'] == 'loaded'
+    assert status['influencers'] == 'unchanged'
+    assert dm.tracking_df['revenue'].sum() == 300
+
+
+def test_set_data_forgets_upload_hashes(uploads):
+    dm = DataManager()
+    dm.load_csv_files(uploads)
+    dm.set_data(dm.influencers_df, dm.posts_df, dm.tracking_df.iloc[0:0], dm.payouts_df)
+    assert dm.load_csv_files(uploads)['tracking'] == 'loaded'
+
+
+def test_snapshot_round_trip(uploads, tmp_path):
+    dm = DataManager()
+    dm.load_csv_files(uploads)
+    dm.save_snapshot('weekly export', directory=tmp_path)
+    restored = DataManager()
+    restored.open_snapshot('weekly export', directory=tmp_path)
+    for table, df in dm.frames().items():
+        pd.testing.assert_frame_equal(restored.frames()[table], df, check_categorical=False)
+    # Upload hashes travel with the snapshot
+    assert set(restored.load_csv_files(uploads).values()) == {'unchanged'}
+
+
+def test_merged_data_is_memoized_per_version(uploads):
+    dm = DataManager()
+    dm.load_csv_files(uploads)
+    _, tracking = dm.get_merged_data()
+    calls = []
+    original = dm._merge
+    dm._merge = lambda: calls.append(1) or original()
+    # Caller edits stay out of the cache
+    tracking['revenue'] = 0
+    _, again = dm.get_merged_data()
+    assert calls == []
+    assert again['revenue'].sum() == 200
+    # Replacing a table invalidates the cache
+    version = dm.version
+    dm.payouts_df = dm.payouts_df
+    assert dm.version == version + 1
+    dm.get_merged_data()
+    assert calls == [1]
+
+
+
+@pytest.mark.parametrize('copy_on_write', [True, False])
+def test_read_only_view_protects_the_cache(monkeypatch, copy_on_write):
+    monkeypatch.setattr(data_manager, 'COPY_ON_WRITE', copy_on_write)
+    cached = pd.DataFrame({'revenue': [1.0, 2.0]})
+    view = read_only_view(cached)
+    view.loc[0, 'revenue'] = 99.0
+    view['orders'] = 1
+    assert cached['revenue'].tolist() == [1.0, 2.0]
+    assert list(cached.columns) == ['revenue']
+
+def test_append_folds_only_new_rows_into_cube(uploads):
+    dm = DataManager()
+    dm.load_csv_files(uploads)
+    delta = make_upload(
+        'tracking_2024-01-02.csv',
+        'id,influencer_id,campaign,date,orders,revenue\n1,1,C1,2024-01-01,2,200\n2,1,C9,2024-01-02,1,50\n2,1,C9,2024-01-02,1,50\n',
+    )
+    result = dm.append_csv_files([delta])[delta.name]
+    assert result == {'status': 'appended', 'table': 'tracking', 'rows': 1, 'duplicates': 2}
+    assert len(dm.tracking_df) == 2
+    expected = DataManager()
+    expected.set_data(dm.influencers_df, dm.posts_df, dm.tracking_df, dm.payouts_df)
+    assert dm.cube.total_revenue() == expected.cube.total_revenue() == 250
+    by_campaign = dm.cube.revenue_by('campaign').set_index('campaign')['revenue'].to_dict()
+    assert by_campaign == {'C1': 200, 'C9': 50}
+    # The same delta file again is a no-op
+    assert dm.append_csv_files([delta])[delta.name]['status'] == 'unchanged'
+    assert len(dm.tracking_df) == 2
+
+
+
+def test_append_ids_wider_than_the_loaded_dtype(uploads):
+    dm = DataManager()
+    dm.load_csv_files(uploads)
+    assert dm.tracking_df['id'].dtype.itemsize == 1
+    rows = [f'{i},1,C1,2024-01-02,1,10' for i in range(101, 301)]
+    header = 'id,influencer_id,campaign,date,orders,revenue\n'
+    dm.append_rows('tracking', pd.read_csv(BytesIO((header + '\n'.join(rows)).encode())))
+    # The same ids again, in another order, are all duplicates
+    again = dm.append_rows('tracking', pd.read_csv(BytesIO((header + '\n'.join(reversed(rows))).encode())))
+    assert again == {'rows': 0, 'duplicates': 200}
+    assert len(dm.tracking_df) == 201
+    assert dm.tracking_df['id'].is_unique
+    assert dm.cube.total_revenue() == 200 + 200 * 10
+
+def test_load_records_per_file_timing(uploads):
+    dm = DataManager()
+    dm.load_csv_files(uploads)
+    stats = dm.load_stats['tracking']
+    assert stats['file'] == 'tracking_data.csv'
+    assert stats['rows'] == 1
+    assert stats['parse_seconds'] >= 0 and stats['hash_seconds'] >= 0
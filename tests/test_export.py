@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from io import BytesIO
+import pandas as pd
+from components import export
+from components.export import to_csv_bytes, to_excel_bytes, write_csv, write_excel
+from data_processing.sql_backend import iter_frames
+
+
+def sample_frame(rows=5):
+    return pd.DataFrame({
+        'id': range(1, rows + 1),
+        'revenue': [100.5] * (rows - 1) + [None],
+        'date': pd.to_datetime(['2024-01-01'] * rows),
+        'campaign': pd.Categorical(['C1'] * rows),
+    })
+
+
+def test_csv_written_in_chunks_matches_pandas(tmp_path):
+    df = sample_frame()
+    path = tmp_path / 'out.csv'
+    progress = list(write_csv(df, path, chunk_rows=2))
+    assert progress == [2, 4, 5]
+    assert path.read_text() == df.to_csv(index=False)
+    assert to_csv_bytes(df) == df.to_csv(index=False).encode('utf-8')
+
+
+def test_excel_round_trip_with_missing_values():
+    df = sample_frame()
+    back = pd.read_excel(BytesIO(to_excel_bytes(df, 'Sheet')))
+    assert list(back.columns) == list(df.columns)
+    assert back['id'].tolist() == df['id'].tolist()
+    assert pd.isna(back['revenue'].iloc[-1])
+
+
+def test_excel_spills_onto_extra_sheets(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, 'EXCEL_SHEET_ROWS', 3)
+    path = tmp_path / 'out.xlsx'
+    list(write_excel(sample_frame(), path, 'Data', chunk_rows=2))
+    sheets = pd.read_excel(path, sheet_name=None)
+    assert list(sheets) == ['Data', 'Data (2)']
+    assert [len(sheet) for sheet in sheets.values()] == [3, 2]
+
+
+def test_empty_frame_keeps_header():
+    df = sample_frame().iloc[:0]
+    assert to_csv_bytes(df) == b'id,revenue,date,campaign\n'
+    assert list(pd.read_excel(BytesIO(to_excel_bytes(df, 'Empty'))).columns) == list(df.columns)
+
+
+def test_export_directory_sweeps_old_and_excess_files(tmp_path):
+    from utils.export_files import finished, new_export_file, sweep
+    paths = [new_export_file('.csv', 'export_', tmp_path) for _ in range(4)]
+    for age, path in zip((7200, 1800, 1200, 30), paths):
+        with open(path, 'wb') as f:
+            f.write(b'x' * 100)
+        os.utime(path, (time.time() - age,) * 2)
+    # Files still being written survive even when expired
+    assert sweep(tmp_path, max_age=3600, max_bytes=150, grace=600) == 0
+    for path in paths:
+        finished(path)
+    # The expired file goes, then the oldest past the grace period; a recent file stays though over the cap
+    assert sweep(tmp_path, max_age=3600, max_bytes=150, grace=600) == 3
+    assert [os.path.exists(path) for path in paths] == [False, False, False, True]
+    assert sweep(tmp_path / 'missing') == 0
+
+
+def test_pending_report_is_kept_from_sweeps_until_finished(tmp_path, monkeypatch):
+    from utils import export_files, pdf_reports
+    monkeypatch.setattr(export_files, 'EXPORT_DIR', tmp_path)
+    gate = threading.Event()
+    monkeypatch.setattr(pdf_reports, 'iter_frames', lambda df, rows: (gate.wait(), iter_frames(df, rows))[1])
+    job = pdf_reports.start_report(pd.DataFrame({'id': range(5)}), 'Payouts')
+    assert job.path in export_files._writing
+    gate.set()
+    job.future.result(timeout=30)
+    assert job.status == 'done'
+    assert job.path not in export_files._writing
+    job.discard()
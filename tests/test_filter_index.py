@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.filter_index import FilterIndex
+
+
+@pytest.fixture
+def sales():
+    return pd.DataFrame({
+        'brand': pd.Categorical(['X', 'Y', 'X', 'X', None, 'Y']),
+        'platform': ['Instagram', 'YouTube', 'YouTube', 'Instagram', 'Instagram', 'YouTube'],
+        'campaign': ['C1', 'C1', 'C2', 'C1', 'C2', 'C2'],
+        'date': pd.to_datetime(['2024-01-03', '2024-01-01', '2024-01-02', '2024-01-05', '2024-01-01', '2024-01-04']),
+    })
+
+
+def reference(df, values, date_range=None):
+    mask = pd.Series(True, index=df.index)
+    for col, value in values.items():
+        if value != 'All':
+            mask &= df[col] == value
+    if date_range is not None:
+        mask &= (df['date'] >= pd.Timestamp(date_range[0])) & (df['date'] <= pd.Timestamp(date_range[1]))
+    return np.flatnonzero(mask.to_numpy())
+
+
+def test_options_are_precomputed_and_sorted(sales):
+    index = FilterIndex(sales)
+    assert index.options['brand'] == ['X', 'Y']
+    assert index.options['campaign'] == ['C1', 'C2']
+    assert 'product' not in index.options
+    assert index.date_min == pd.Timestamp('2024-01-01')
+    assert index.date_max == pd.Timestamp('2024-01-05')
+
+
+@pytest.mark.parametrize("values,date_range", [
+    ({'brand': 'X'}, None),
+    ({'brand': 'X', 'platform': 'Instagram'}, None),
+    ({'campaign': 'C2', 'brand': 'All'}, ('2024-01-01', '2024-01-02')),
+    ({'brand': 'Y', 'campaign': 'C1'}, ('2024-01-02', '2024-01-05')),
+    ({'brand': 'Z'}, None),
+    ({}, ('2024-01-04', '2024-01-04')),
+])
+def test_select_matches_boolean_masks(sales, values, date_range):
+    positions = FilterIndex(sales).select(values, date_range)
+    assert positions.tolist() == reference(sales, values, date_range).tolist()
+
+
+def test_select_without_filters_returns_none(sales):
+    assert FilterIndex(sales).select({'brand': 'All'}) is None
+
+
+@pytest.mark.parametrize("start,end", [('2024-01-10', '2024-01-10'), ('2024-01-05', '2024-03-20'), ('2025-01-01', '2025-02-01')])
+def test_day_positions_cover_whole_days_in_row_order(start, end):
+    rng = np.random.default_rng(3)
+    times = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90 * 24 * 60, 5_000), unit='min')
+    df = pd.DataFrame({'payment_date': times})
+    positions = FilterIndex(df, [], 'payment_date').day_positions(start, end)
+    days = df['payment_date'].dt.normalize()
+    expected = np.flatnonzero(((days >= start) & (days <= end)).to_numpy())
+    assert positions.tolist() == expected.tolist()
@@ -0,0 +1,14 @@
+import pandas as pd
+from components.insights import monthly_revenue
+
+
+def test_monthly_revenue_keeps_months_without_sales():
+    sales = pd.DataFrame({
+        'date': pd.to_datetime(['2024-01-05', '2024-01-20', '2024-03-02']),
+        'revenue': [100.0, 50.0, 300.0],
+    })
+    monthly = monthly_revenue(sales)
+    assert monthly['date'].tolist() == list(pd.to_datetime(['2024-01-01', '2024-02-01', '2024-03-01']))
+    assert monthly['revenue'].tolist() == [150.0, 0.0, 300.0]
+    assert monthly['pct_change'].iloc[1] == -100
+    assert monthly_revenue(sales.iloc[0:0]).empty
@@ -0,0 +1,77 @@
+import json
+import pandas as pd
+from utils.instrumentation import Recorder, recording, trace_methods, traced
+
+
+@traced
+def double(df):
+    return pd.concat([df, df])
+
+
+@traced(name='outer_step', category='page')
+def outer(df):
+    return double(df).head(3)
+
+
+def test_nothing_is_recorded_without_a_recorder():
+    recorder = Recorder()
+    df = pd.DataFrame({'a': range(4)})
+    assert len(outer(df)) == 3
+    with recording(None):
+        outer(df)
+    assert not recorder.events
+
+
+def test_calls_record_rows_memory_and_self_time():
+    recorder = Recorder()
+    with recording(recorder):
+        outer(pd.DataFrame({'a': range(4)}))
+    inner, top = recorder.events
+    assert (inner['name'], inner['depth'], inner['rows_in'], inner['rows_out']) == ('double', 1, 4, 8)
+    assert inner['bytes_out'] > 0
+    assert (top['name'], top['category'], top['depth'], top['rows_out']) == ('outer_step', 'page', 0, 3)
+    assert top['self_ms'] <= top['duration_ms'] - inner['duration_ms'] + 1e-6
+    summary = recorder.summary().set_index('name')
+    assert summary.loc['double', 'calls'] == 1
+
+
+def test_errors_are_recorded_and_reraised():
+    @traced
+    def fail():
+        raise ValueError("bad")
+
+    recorder = Recorder()
+    with recording(recorder):
+        try:
+            fail()
+        except ValueError:
+            pass
+    assert recorder.events[0]['error'] == 'ValueError'
+
+
+def test_exports():
+    recorder = Recorder()
+    with recording(recorder):
+        outer(pd.DataFrame({'a': [1]}))
+    trace = json.loads(recorder.to_chrome_trace())['traceEvents']
+    assert {event['ph'] for event in trace} == {'X'}
+    assert [event['name'] for event in trace] == ['double', 'outer_step']
+    exported = json.loads(recorder.to_json())
+    assert len(exported['events']) == 2 and len(exported['summary']) == 2
+
+
+def test_trace_methods_wraps_once():
+    class Manager:
+        def load(self):
+            return pd.DataFrame({'a': [1, 2]})
+
+        def size(self):
+            return 2
+
+    trace_methods('data', exclude=('size',))(Manager)
+    trace_methods('data', exclude=('size',))(Manager)
+    recorder = Recorder()
+    with recording(recorder):
+        Manager().load()
+        Manager().size()
+    assert [event['name'] for event in recorder.events] == ['Manager.load']
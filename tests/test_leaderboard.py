@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_processing.data_manager import DataManager
+from data_processing.leaderboard import LEADERBOARDS, Leaderboard, top_k
+from data_processing.registry import DatasetRegistry
+from data_processing.sample_data_generator import generate_sample_data
+
+
+@pytest.mark.parametrize('k', [0, 1, 5, 50, 500])
+def test_top_k_matches_a_full_sort(k):
+    rng = np.random.default_rng(k)
+    # Few distinct values, so ties at the cut-off are common
+    df = pd.DataFrame({'id': np.arange(200), 'score': rng.integers(0, 20, 200).astype(float)})
+    expected = df.sort_values('score', ascending=False, kind='stable').head(k)
+    pd.testing.assert_frame_equal(top_k(df, 'score', k), expected)
+
+
+def test_top_among_a_subset():
+    board = Leaderboard(pd.DataFrame({'campaign': ['a', 'b', 'c', 'd'], 'revenue': [4.0, 3.0, 2.0, 1.0]}),
+                        'campaign', 'revenue')
+    assert board.top(2, among=['b', 'c', 'd'])['campaign'].tolist() == ['b', 'c']
+    assert board.top(5, among=[]).empty
+
+
+def test_ratio_metric_is_zero_without_a_denominator():
+    totals = pd.DataFrame({'influencer_id': [1, 2, 3], 'revenue': [100.0, 50.0, 80.0], 'total_payout': [50.0, 0.0, 10.0]})
+    board = Leaderboard(totals, 'influencer_id', 'roas', ('revenue', 'total_payout'))
+    assert board.top(3)['roas'].tolist() == [8.0, 2.0, 0.0]
+
+
+def test_appends_update_leaderboards_like_a_rebuild():
+    influencers, posts, tracking, payouts = generate_sample_data(scale=0.2, seed=4)
+    dm = DataManager(DatasetRegistry())
+    dm.set_data(influencers, posts, tracking.iloc[:-300], payouts.iloc[:-20])
+    for name in LEADERBOARDS:
+        dm.leaderboard(name)
+    # The tail batches include a new campaign and an influencer with no earlier sales
+    tracking_delta = tracking.iloc[-300:].assign(campaign='Campaign_new')
+    tracking_delta.loc[tracking_delta.index[0], 'influencer_id'] = influencers['id'].max()
+    dm.append_rows('tracking', tracking_delta)
+    dm.append_rows('payouts', payouts.iloc[-20:])
+
+    rebuilt = DataManager(DatasetRegistry())
+    rebuilt.set_data(dm.influencers_df, dm.posts_df, dm.tracking_df, dm.payouts_df)
+    for name, (key, metric, _) in LEADERBOARDS.items():
+        updated = dm.leaderboard(name).top(len(influencers)).set_index(key)[metric]
+        expected = rebuilt.leaderboard(name).top(len(influencers)).set_index(key)[metric]
+        pd.testing.assert_series_equal(updated.sort_index(), expected.sort_index(),
+                                       check_dtype=False, check_index_type=False, check_categorical=False)
@@ -0,0 +1,65 @@
+import tracemalloc
+import pandas as pd
+from utils import pdf_reports
+from utils.pdf_reports import ReportJob, _render, start_report, write_pdf_report
+
+
+def sample_frame(rows):
+    return pd.DataFrame({
+        'id': range(rows),
+        'total_payout': [125.5] * rows,
+        'payment_date': pd.date_range('2024-01-01', periods=rows, freq='h'),
+        'status': pd.Categorical(['paid'] * rows),
+    })
+
+
+def test_every_row_is_paginated(tmp_path):
+    path = tmp_path / 'report.pdf'
+    progress = list(write_pdf_report(sample_frame(25), path, 'Payouts', rows_per_page=10))
+    assert progress == [10, 20, 25]
+    data = path.read_bytes()
+    assert data.startswith(b'%PDF')
+    assert data.count(b'/Type /Page\n') == 3
+
+
+def test_empty_table_still_renders_header_page(tmp_path):
+    path = tmp_path / 'report.pdf'
+    assert list(write_pdf_report(sample_frame(0), path, 'Payouts')) == []
+    assert path.read_bytes().count(b'/Type /Page\n') == 1
+
+
+def test_background_job_finishes(tmp_path):
+    job = start_report(sample_frame(120), 'Payouts', rows_per_page=50)
+    job.future.result(timeout=60)
+    assert job.status == 'done'
+    assert job.rows_done == 120
+    job.discard()
+
+
+def test_cancelled_job_stops_and_removes_file(tmp_path):
+    path = tmp_path / 'report.pdf'
+    path.touch()
+    job = ReportJob('Payouts', 100, str(path))
+    job.cancel()
+    _render(job, sample_frame(100), rows_per_page=10)
+    assert job.rows_done == 10
+    assert not path.exists()
+
+
+def test_peak_memory_stays_flat_as_rows_grow(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_reports, 'FORMAT_PAGES', 5)
+
+    def peak(rows):
+        df = sample_frame(rows)
+        tracemalloc.start()
+        try:
+            for _ in write_pdf_report(df, tmp_path / f'{rows}.pdf', 'Payouts', rows_per_page=40):
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small, large = peak(3_000), peak(30_000)
+    assert (tmp_path / '30000.pdf').read_bytes().count(b'/Type /Page\n') == 750
+    # Ten times the rows, not ten times the memory
+    assert large < 2 * small
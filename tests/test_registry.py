@@ -0,0 +1,92 @@
+import gc
+import numpy as np
+import pandas as pd
+from data_processing.data_manager import DataManager
+from data_processing.registry import DatasetRegistry, frame_digest
+from data_processing.sample_data_generator import generate_sample_data
+from tests.test_data_manager import make_upload
+
+
+def upload_set():
+    return [
+        make_upload('influencers.csv', 'id,name\n1,A\n2,B\n'),
+        make_upload('posts.csv', 'id,influencer_id,likes,comments,reach\n1,1,10,2,100\n'),
+        make_upload('tracking_data.csv', 'id,influencer_id,campaign,date,orders,revenue\n1,1,C1,2024-01-01,2,200\n'),
+        make_upload('payouts.csv', 'id,influencer_id,campaign,total_payout,payment_date,status\n1,1,C1,50,2024-01-02,paid\n'),
+    ]
+
+
+def test_frame_digest_follows_content():
+    df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+    assert frame_digest(df) == frame_digest(df.copy())
+    assert frame_digest(df) != frame_digest(df.assign(a=[1, 3]))
+    assert frame_digest(df) != frame_digest(df.astype({'a': 'int32'}))
+
+
+def test_handles_count_references():
+    registry = DatasetRegistry()
+    first = registry.put('key', np.zeros(10))
+    second = registry.lookup('key')
+    assert second.value is first.value
+    assert registry.stats()['referenced'] == 1
+    first.release()
+    assert registry.stats()['referenced'] == 1
+    del second
+    gc.collect()
+    assert registry.stats()['referenced'] == 0
+    assert 'key' in registry
+
+
+def test_unreferenced_entries_evicted_least_recently_used_first():
+    registry = DatasetRegistry(memory_cap=250)
+    for key in ('a', 'b', 'c'):
+        registry.put(key, np.zeros(10)).release()
+    registry.lookup('a').release()
+    held = registry.put('d', np.zeros(10))
+    assert 'b' not in registry
+    assert {'a', 'c', 'd'} <= set(registry._entries)
+    assert registry.stats()['evictions'] == 1
+    assert held.value is not None
+
+
+def test_referenced_entries_are_never_evicted():
+    registry = DatasetRegistry(memory_cap=0)
+    held = registry.put('a', np.zeros(10))
+    registry.put('b', np.zeros(10)).release()
+    assert 'a' in registry and 'b' not in registry
+    assert held.value.sum() == 0
+
+
+def test_sessions_share_tables_and_derived_results():
+    registry = DatasetRegistry()
+    first, second = DataManager(registry), DataManager(registry)
+    first.load_csv_files(upload_set())
+    second.load_csv_files(upload_set())
+    assert second.tracking_df is first.tracking_df
+    assert second.cube is first.cube
+    assert second.load_stats['tracking']['shared']
+    assert registry.stats()['misses'] == 5
+
+
+def test_closed_session_releases_its_data():
+    registry = DatasetRegistry()
+    dm = DataManager(registry)
+    dm.load_csv_files(upload_set())
+    assert registry.stats()['referenced'] == 5
+    del dm
+    gc.collect()
+    assert registry.stats()['referenced'] == 0
+
+
+def test_append_releases_results_of_the_previous_version():
+    registry = DatasetRegistry()
+    dm = DataManager(registry)
+    influencers, posts, tracking, payouts = generate_sample_data(seed=2)
+    dm.set_data(influencers, posts, tracking.iloc[:-1], payouts)
+    dm.get_merged_data()
+    dm.leaderboard('influencer_revenue')
+    before = registry.stats()['referenced_bytes']
+    dm.append_rows('tracking', tracking.iloc[-1:])
+    # The old merge, cube and leaderboard are no longer held; only the folded cube was carried over
+    assert registry.stats()['referenced_bytes'] < before
+    assert all(version == dm.version for version, _ in dm._memo.values())
@@ -0,0 +1,45 @@
+from datetime import date
+import pandas as pd
+from data_processing import sample_data_generator
+from data_processing.sample_data_generator import FILES, generate_sample_data, write_sample_data
+
+
+def test_same_seed_same_dataset():
+    first = generate_sample_data(seed=7, end_date=date(2024, 6, 30))
+    second = generate_sample_data(seed=7, end_date=date(2024, 6, 30))
+    for a, b in zip(first, second):
+        pd.testing.assert_frame_equal(a, b)
+
+
+def test_scale_multiplies_demo_size():
+    influencers, posts, tracking, payouts = generate_sample_data(scale=2, seed=1)
+    assert len(influencers) == 300
+    assert len(tracking) == 10000
+    assert posts['influencer_id'].isin(influencers['id']).all()
+    assert tracking['influencer_id'].between(1, 300).all()
+    assert payouts['influencer_id'].isin(influencers['id']).all()
+
+
+def test_write_sample_data_in_chunks(tmp_path):
+    written = write_sample_data(tmp_path, scale=1, seed=3, chunk_rows=700)
+    tracking = pd.read_csv(tmp_path / 'tracking_data.csv')
+    influencers = pd.read_csv(tmp_path / 'influencers.csv')
+    posts = pd.read_csv(tmp_path / 'posts.csv')
+    assert written['tracking_data.csv'] == len(tracking) == 5000
+    assert len(influencers) == 150
+    # Ids stay unique and contiguous across chunks
+    assert tracking['id'].tolist() == list(range(1, 5001))
+    assert posts['id'].is_unique
+
+
+def test_written_files_depend_only_on_seed_and_scale(tmp_path, monkeypatch):
+    # Small blocks so the dataset spans several of them
+    monkeypatch.setattr(sample_data_generator, 'INFLUENCER_BLOCK', 40)
+    monkeypatch.setattr(sample_data_generator, 'TRACKING_BLOCK', 1200)
+    end = date(2024, 6, 30)
+    write_sample_data(tmp_path / 'small', seed=5, end_date=end, chunk_rows=300)
+    write_sample_data(tmp_path / 'large', seed=5, end_date=end, chunk_rows=100_000)
+    generated = generate_sample_data(seed=5, end_date=end)
+    for name, df in zip(FILES, generated):
+        assert (tmp_path / 'small' / name).read_bytes() == (tmp_path / 'large' / name).read_bytes()
+        assert (tmp_path / 'small' / name).read_text() == df.to_csv(index=False)
@@ -0,0 +1,64 @@
+from io import BytesIO, StringIO
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+from data_processing import schema
+from data_processing.schema import apply_schema, read_table
+
+TRACKING_CSV = """id,source,campaign,influencer_id,user_id,product,brand,date,orders,revenue,created_date
+1,influencer_post,C1,1,user_1,Protein,MuscleBlaze,2024-01-01,2,200.5,2024-01-01
+2,influencer_post,C2,2,user_2,Vitamins,HKVitals,2024-01-02,1,100.0,2024-01-02
+3,influencer_post,C3,1,user_3,Protein,Gritzo,2024-01-03,0,0.0,2024-01-03
+"""
+
+
+def test_read_table_types_columns_across_chunks():
+    df = read_table(StringIO(TRACKING_CSV), 'tracking', chunk_rows=1)
+    assert len(df) == 3
+    # Categories from every chunk survive the concat
+    assert isinstance(df['campaign'].dtype, pd.CategoricalDtype)
+    assert list(df['campaign']) == ['C1', 'C2', 'C3']
+    assert is_datetime64_any_dtype(df['date'])
+    assert df['id'].dtype.itemsize == 1
+    # Counts stay wide enough to add together safely
+    assert df['orders'].dtype.itemsize >= 4
+    assert df['revenue'].dtype == 'float64'
+
+
+def test_apply_schema_leaves_input_untouched():
+    raw = pd.read_csv(StringIO(TRACKING_CSV))
+    typed = apply_schema(raw, 'tracking')
+    assert not is_datetime64_any_dtype(raw['date'])
+    assert is_datetime64_any_dtype(typed['date'])
+    assert isinstance(typed['brand'].dtype, pd.CategoricalDtype)
+
+
+def test_pyarrow_engine_matches_pandas(monkeypatch):
+    # Blocks of a few rows make pyarrow yield several batches to unify
+    monkeypatch.setattr(schema, 'ARROW_BLOCK_BYTES', 128)
+    expected = read_table(BytesIO(TRACKING_CSV.encode()), 'tracking', engine='pandas')
+    result = read_table(BytesIO(TRACKING_CSV.encode()), 'tracking', engine='pyarrow')
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_pyarrow_engine_falls_back_when_later_rows_break_inferred_types(monkeypatch):
+    monkeypatch.setattr(schema, 'ARROW_BLOCK_BYTES', 128)
+    text = TRACKING_CSV + "4,influencer_post,C1,1,user_4,Protein,Gritzo,not a date,1,n/a,2024-01-04\n"
+    df = read_table(BytesIO(text.encode()), 'tracking', engine='pyarrow')
+    assert len(df) == 4
+    assert df['date'].isna().sum() == 1
+
+
+def test_pyarrow_engine_parses_declared_types_past_the_first_block(monkeypatch):
+    monkeypatch.setattr(schema, 'ARROW_BLOCK_BYTES', 128)
+    # Whole-number revenue in the first block, decimals later
+    text = TRACKING_CSV.replace('200.5', '200').replace('100.0', '100').replace('0.0', '0')
+    text += "4,influencer_post,C1,1,user_4,Protein,Gritzo,2024-01-04,1,99.75,2024-01-04\n"
+    expected = read_table(BytesIO(text.encode()), 'tracking', engine='pandas')
+
+    def fallback(*args, **kwargs):
+        raise AssertionError('re-read with the pandas parser')
+
+    monkeypatch.setattr(schema.pd, 'read_csv', fallback)
+    df = read_table(BytesIO(text.encode()), 'tracking', engine='pyarrow')
+    assert df['revenue'].tolist() == [200.0, 100.0, 0.0, 99.75]
+    pd.testing.assert_frame_equal(df, expected)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_processing.data_manager import DataManager
+from data_processing.registry import DatasetRegistry
+from data_processing.sample_data_generator import generate_sample_data
+from data_processing.sketches import DistinctSketch, QuantileSketch, bucket_values, hll_registers, quantile_buckets
+
+KEYS = ['campaign', 'influencer_id', 'date']
+
+
+@pytest.fixture
+def events():
+    rng = np.random.default_rng(9)
+    n = 60_000
+    return pd.DataFrame({
+        'campaign': pd.Categorical(rng.choice(['A', 'B', 'C', None], n)),
+        'influencer_id': rng.integers(0, 40, n),
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 20 * 86_400, n), unit='s'),
+        'user_id': pd.Series(rng.integers(0, 30_000, n)).astype(str).radd('user_'),
+    })
+
+
+def test_ranks_count_leading_zeros_exactly():
+    registers, ranks = hll_registers(pd.Series([f'u{i}' for i in range(50_000)]), precision=12)
+    assert registers.min() >= 0 and registers.max() < 4096
+    # Half of the hashes have rank 1, a quarter rank 2, ...
+    shares = np.bincount(ranks)[1:4] / len(ranks)
+    assert np.allclose(shares, [0.5, 0.25, 0.125], atol=0.01)
+
+
+def test_distinct_estimates_are_close(events):
+    sketch = DistinctSketch.from_events(events, keys=KEYS, chunk_rows=7_000)
+    assert np.all(np.diff(sketch._cell) >= 0)
+    assert sketch.estimate() == pytest.approx(events['user_id'].nunique(), rel=0.05)
+    expected = events.groupby('campaign', observed=True)['user_id'].nunique()
+    estimates = sketch.estimate_by(sketch.cells['campaign'].to_numpy())
+    assert np.allclose(estimates[expected.index].to_numpy(), expected.to_numpy(), rtol=0.05)
+    # Small selections fall back to linear counting, which is near exact
+    positions = np.flatnonzero((sketch.cells['influencer_id'] == 3) & (sketch.cells['campaign'] == 'A'))
+    exact = events[(events['influencer_id'] == 3) & (events['campaign'] == 'A')]['user_id'].nunique()
+    assert sketch.estimate(positions) == pytest.approx(exact, rel=0.03)
+    assert sketch.estimate(np.empty(0, dtype='int64')) == 0
+
+
+def test_merged_sketches_equal_one_built_from_all_rows(events):
+    whole = DistinctSketch.from_events(events, keys=KEYS)
+    merged = DistinctSketch.from_events(events.iloc[:25_000], keys=KEYS).merged(
+        DistinctSketch.from_events(events.iloc[20_000:], keys=KEYS))
+    pd.testing.assert_frame_equal(merged.long(), whole.long())
+
+
+def test_bucket_values_are_within_accuracy():
+    values = np.array([0.0, 1e-9, 0.003, 0.5, 1.0, 7.25, 1234.5])
+    estimates = bucket_values(quantile_buckets(values, 0.01), 0.01)
+    assert estimates[:2].tolist() == [0.0, 0.0]
+    assert np.allclose(estimates[2:], values[2:], rtol=0.01)
+
+
+def test_quantiles_match_exact_per_group():
+    rng = np.random.default_rng(3)
+    cells = pd.DataFrame({'group': rng.choice(['x', 'y', 'z'], 20_000), 'day': rng.integers(0, 30, 20_000)})
+    values = rng.lognormal(0, 1, 20_000)
+    sketch = QuantileSketch.from_values(cells, values)
+    bands = sketch.quantiles_by(sketch.cells['group'].to_numpy(), [0.1, 0.5, 0.9])
+    for group, rows in cells.groupby('group').groups.items():
+        exact = np.quantile(values[rows], [0.1, 0.5, 0.9], method='lower')
+        assert np.allclose(bands.loc[group, [0.1, 0.5, 0.9]].to_numpy(dtype='float64'), exact, rtol=0.011)
+        assert bands.loc[group, 'count'] == len(rows)
+    first_days = np.flatnonzero(sketch.cells['day'] < 10)
+    exact = np.quantile(values[cells['day'] < 10], 0.5, method='lower')
+    assert sketch.quantiles([0.5], first_days).iloc[0] == pytest.approx(exact, rel=0.011)
+    assert np.isnan(sketch.quantiles([0.5], np.empty(0, dtype='int64')).iloc[0])
+
+
+def test_buyer_sketch_follows_appends():
+    influencers, posts, tracking, payouts = generate_sample_data(seed=4)
+    dm = DataManager(registry=DatasetRegistry())
+    dm.set_data(influencers, posts, tracking.iloc[:3000], payouts)
+    dm.sketch('buyers')
+    dm.append_rows('tracking', tracking.iloc[2500:])
+    appended = dm.sketch('buyers')
+    rebuilt = DistinctSketch.from_events(dm.tracking_df)
+    pd.testing.assert_frame_equal(appended.long(), rebuilt.long(), check_categorical=False)
+    assert dm.sketch('roas').quantiles([0.5]).notna().all()
@@ -0,0 +1,178 @@
+import pandas as pd
+import pytest
+from components.export import to_csv_bytes
+from data_processing import sql_backend
+from data_processing.data_manager import DataManager
+from data_processing.registry import DatasetRegistry
+from data_processing.sample_data_generator import generate_sample_data
+from data_processing.sql_backend import SQLMetricsCube, SQLStore
+from utils.filter_index import FilterIndex
+from tests.test_data_manager import make_upload
+
+
+@pytest.fixture(autouse=True)
+def warehouse(tmp_path, monkeypatch):
+    monkeypatch.setattr(sql_backend, 'WAREHOUSE_DIR', tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(scope='module')
+def raw():
+    return generate_sample_data(scale=2, seed=3)
+
+
+def managers(raw):
+    pandas_dm = DataManager(DatasetRegistry())
+    pandas_dm.set_data(*raw)
+    sql_dm = DataManager(DatasetRegistry(), backend='sql')
+    sql_dm.set_data(*raw)
+    return pandas_dm, sql_dm
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        DataManager(DatasetRegistry(), backend='spark')
+
+
+def test_tracking_stays_on_disk(raw):
+    _, dm = managers(raw)
+    assert dm.tracking_df is None
+    assert isinstance(dm.cube, SQLMetricsCube)
+    assert dm.row_count('tracking') == len(raw[2])
+    assert len(dm.preview('tracking', 10)) == 10
+    assert dm.validate_data()[0]
+
+
+@pytest.mark.parametrize('keys', ['date', 'campaign', ['brand', 'product'], ['influencer_id', 'name'], 'platform'])
+def test_queries_match_pandas(raw, keys):
+    pandas_dm, sql_dm = managers(raw)
+    expected = pandas_dm.cube.revenue_by(keys).reset_index(drop=True)
+    result = sql_dm.cube.revenue_by(keys).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
+    assert sql_dm.cube.total_revenue() == pytest.approx(pandas_dm.cube.total_revenue())
+    assert sql_dm.cube.total_orders() == pandas_dm.cube.total_orders()
+
+
+def test_sales_grain_matches_pandas(raw):
+    pandas_dm, sql_dm = managers(raw)
+    order = ['influencer_id', 'campaign', 'brand', 'product', 'date']
+    expected = pandas_dm.cube.sales.sort_values(order, ignore_index=True)
+    result = sql_dm.cube.sales.sort_values(order, ignore_index=True)[expected.columns]
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
+
+
+@pytest.mark.parametrize('values', [
+    {},
+    {'campaign': 'first'},
+    {'platform': 'first', 'brand': 'first'},
+    {'category': 'first', 'product': 'last'},
+    {'brand': 'no such brand'},
+])
+def test_filtered_queries_match_pandas(raw, values):
+    pandas_dm, sql_dm = managers(raw)
+    index = FilterIndex(pandas_dm.cube.sales)
+    sales_filter = sql_dm.cube.sales_filter()
+    assert sales_filter.options == index.options
+    assert (sales_filter.date_min, sales_filter.date_max) == (index.date_min, index.date_max)
+    values = {col: index.options[col][0 if pick == 'first' else -1] if pick in ('first', 'last') else pick
+              for col, pick in values.items()}
+    date_range = ((index.date_min + pd.Timedelta(days=9)).date(), (index.date_max - pd.Timedelta(days=9)).date())
+    positions = index.select(values, date_range)
+    filtered = pandas_dm.cube.sales.iloc[positions]
+    selection = sales_filter.select(values, date_range)
+    assert sql_dm.cube._sales is None
+    for keys in ['date', 'platform', ['influencer_id', 'name']]:
+        expected = pandas_dm.cube.revenue_by(keys, filtered).reset_index(drop=True)
+        result = sql_dm.cube.revenue_by(keys, selection).reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
+    expected = pandas_dm.cube.totals(filtered)
+    assert sql_dm.cube.totals(selection).tolist() == pytest.approx(expected.tolist())
+    # The grain was never loaded
+    assert sql_dm.cube._sales is None
+    assert sales_filter.select({'brand': 'All'}, None) is None
+
+
+def test_import_in_multi_row_batches(raw, warehouse, monkeypatch):
+    monkeypatch.setattr(sql_backend, 'SQL_VARIABLES', 50)
+    tracking = raw[2].copy()
+    tracking.loc[tracking.index[::7], 'brand'] = None
+    store = SQLStore.from_frame(tracking, 'tracking', 'batched', warehouse)
+    assert len(store) == len(tracking)
+    stored = store.query('SELECT * FROM tracking ORDER BY id')
+    assert stored['brand'].isna().sum() == tracking['brand'].isna().sum()
+    assert stored['revenue'].sum() == pytest.approx(tracking['revenue'].sum())
+
+
+def test_duplicate_ids_are_reported_like_pandas(raw):
+    influencers, posts, tracking, payouts = raw
+    tracking = pd.concat([tracking, tracking.iloc[[3, 8]]], ignore_index=True)
+    reports = []
+    for backend in ('pandas', 'sql'):
+        dm = DataManager(DatasetRegistry(), backend=backend)
+        dm.set_data(influencers, posts, tracking, payouts)
+        reports.append(dm.validation_report())
+    pandas_report, sql_report = reports
+    assert sql_report.messages() == pandas_report.messages() == ["tracking: 4 rows with a duplicated 'id'"]
+    assert sorted(sql_report.issues[0].sample['id']) == sorted(pandas_report.issues[0].sample['id'])
+
+
+def test_filter_columns_are_indexed(raw):
+    _, dm = managers(raw)
+    store = dm.table_source('tracking')
+    plan = store.connection.execute(
+        'EXPLAIN QUERY PLAN SELECT SUM(revenue) FROM tracking WHERE campaign = ?', ('x',)).fetchall()
+    assert 'USING INDEX tracking_campaign' in plan[-1][-1]
+    indexes = {row[0] for row in store.connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'tracking_date', 'tracking_brand', 'tracking_influencer_id'} <= indexes
+
+
+def test_upload_import_and_append(warehouse):
+    dm = DataManager(DatasetRegistry(), backend='sql')
+    dm.load_csv_files([
+        make_upload('influencers.csv', 'id,name\n1,A\n'),
+        make_upload('posts.csv', 'id,influencer_id,likes,comments,reach\n1,1,10,2,100\n'),
+        make_upload('tracking_data.csv', 'id,influencer_id,campaign,date,orders,revenue\n1,1,C1,2024-01-01,2,200\n'),
+        make_upload('payouts.csv', 'id,influencer_id,campaign,total_payout,payment_date,status\n1,1,C1,50,2024-01-02,paid\n'),
+    ])
+    assert list(warehouse.glob('tracking_*.sqlite'))
+    delta = pd.DataFrame({'id': [1, 2], 'influencer_id': [1, 1], 'campaign': ['C1', 'C2'],
+                          'date': ['2024-01-01', '2024-01-03'], 'orders': [2, 1], 'revenue': [200.0, 80.0]})
+    assert dm.append_rows('tracking', delta) == {'rows': 1, 'duplicates': 1}
+    assert dm.cube.total_revenue() == 280.0
+    assert dm.cube.revenue_by('campaign')['revenue'].tolist() == [200.0, 80.0]
+
+
+def test_appends_write_in_place(raw, warehouse):
+    dm = DataManager(DatasetRegistry(), backend='sql')
+    influencers, posts, tracking, payouts = raw
+    dm.set_data(influencers, posts, tracking.iloc[:-30], payouts)
+    first = dm.table_source('tracking')
+    for start in range(-30, 0, 10):
+        batch = tracking.iloc[start:start + 10 or None]
+        assert dm.append_rows('tracking', batch) == {'rows': 10, 'duplicates': 0}
+    assert len(list(warehouse.glob('*.sqlite'))) == 1
+    assert len(dm.table_source('tracking')) == len(tracking)
+    assert dm.cube.total_revenue() == pytest.approx(tracking['revenue'].sum())
+    # Older versions still read only their own rows, and a branch from one skips the other branch's batches
+    assert len(first) == len(tracking) - 30
+    other = DataManager(DatasetRegistry(), backend='sql')
+    other.set_data(influencers, posts, tracking.iloc[:-30], payouts)
+    branch = tracking.iloc[-5:].assign(revenue=1.0)
+    assert other.append_rows('tracking', branch) == {'rows': 5, 'duplicates': 0}
+    assert other.cube.total_revenue() == pytest.approx(tracking['revenue'].iloc[:-30].sum() + 5)
+    assert dm.cube.total_revenue() == pytest.approx(tracking['revenue'].sum())
+    assert len(list(warehouse.glob('*.sqlite'))) == 1
+
+
+def test_exports_read_from_disk(raw):
+    pandas_dm, sql_dm = managers(raw)
+    exported = pd.read_csv(pd.io.common.BytesIO(to_csv_bytes(sql_dm.table_source('tracking'))))
+    expected = pd.read_csv(pd.io.common.BytesIO(to_csv_bytes(pandas_dm.tracking_df)))
+    pd.testing.assert_frame_equal(exported, expected)
+
+
+def test_post_attribution_reads_tracking_from_disk(raw):
+    from data_processing.attribution import attribute_orders
+    pandas_dm, sql_dm = managers(raw)
+    expected = attribute_orders(pandas_dm.posts_df, pandas_dm.tracking_df)
+    pd.testing.assert_frame_equal(attribute_orders(sql_dm.posts_df, sql_dm.table_source('tracking'), chunk_rows=1000), expected)
@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+# Generous for a cold interpreter on a slow runner; override with ANALYTICS_IMPORT_BUDGET
+IMPORT_BUDGET_SECONDS = float(os.environ.get('ANALYTICS_IMPORT_BUDGET', '3.0'))
+# Loaded only when the page needing them is opened
+DEFERRED_MODULES = [
+    'plotly.express', 'openpyxl', 'reportlab',
+    'data_processing.sample_data_generator', 'utils.visualizations', 'components.export',
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % (DEFERRED_MODULES,)
+
+
+def test_import_app_within_budget(record_property):
+    # A fresh interpreter, so modules imported by other tests do not hide the cost
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    record_property('import_app_seconds', result['seconds'])
+    print(f"import app: {result['seconds']:.2f}s")
+    assert result['loaded'] == []
+    assert result['seconds'] < IMPORT_BUDGET_SECONDS, f"import app took {result['seconds']:.2f}s"
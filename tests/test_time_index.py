@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_processing.data_manager import DataManager
+from data_processing.registry import DatasetRegistry
+from data_processing.sample_data_generator import generate_sample_data
+from data_processing.time_index import TIME_INDEXES, PrefixSums
+
+
+@pytest.fixture
+def cells():
+    rng = np.random.default_rng(5)
+    n = 2_000
+    return pd.DataFrame({
+        'campaign': rng.choice(['A', 'B', 'C', None], n),
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 120, n), unit='D'),
+        'orders': rng.integers(0, 5, n),
+        'revenue': rng.random(n) * 100,
+    })
+
+
+def in_range(df, start, end):
+    mask = df['campaign'].notna()
+    if start is not None:
+        mask &= df['date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['date'] <= pd.Timestamp(end)
+    return df[mask]
+
+
+@pytest.mark.parametrize("start,end", [
+    (None, None), ('2024-02-03', '2024-03-09'), ('2024-02-03', '2024-02-03'),
+    ('2023-01-01', '2023-06-01'), ('2024-04-01', None), ('2024-03-01', '2024-02-01'),
+])
+def test_range_totals_match_a_scan(cells, start, end):
+    index = PrefixSums(cells, 'campaign', ['orders', 'revenue'])
+    expected = in_range(cells, start, end).groupby('campaign')[['orders', 'revenue']].sum().reset_index()
+    pd.testing.assert_frame_equal(index.totals(start, end), expected, check_dtype=False)
+    single = index.total(start, end, key='B')
+    assert np.allclose(single.to_numpy(), expected[expected['campaign'] == 'B'][['orders', 'revenue']].sum().to_numpy())
+    assert np.allclose(index.total(start, end).to_numpy(), expected[['orders', 'revenue']].sum().to_numpy())
+    assert index.total(start, end, key='missing').tolist() == [0.0, 0.0]
+
+
+def test_between_sums_each_interval(cells):
+    index = PrefixSums(cells, None, ['revenue'])
+    edges = pd.DatetimeIndex(['2023-12-01', '2024-01-15', '2024-02-01', '2024-06-01'])
+    result = index.between(edges)
+    for (start, end), total in zip(zip(edges[:-1], edges[1:]), result['revenue']):
+        window = cells[(cells['date'] >= start) & (cells['date'] < end)]
+        assert np.isclose(total, window['revenue'].sum())
+    assert result['start'].tolist() == list(edges[:-1])
+
+
+def test_empty_index_answers_zero():
+    index = PrefixSums(pd.DataFrame({'date': pd.to_datetime([]), 'total_payout': []}), None, ['total_payout'])
+    assert index.total('2024-01-01', '2024-02-01').tolist() == [0.0]
+    assert index.totals().empty
+
+
+def test_cube_indexes_follow_appends():
+    influencers, posts, tracking, payouts = generate_sample_data(seed=4)
+    dm = DataManager(registry=DatasetRegistry())
+    dm.set_data(influencers, posts, tracking.iloc[:3000], payouts)
+    for name in TIME_INDEXES:
+        dm.time_index(name)
+    dm.append_rows('tracking', tracking.iloc[3000:])
+    sales = dm.cube.sales
+    start, end = sales['date'].min() + pd.Timedelta(days=7), sales['date'].max() - pd.Timedelta(days=7)
+    window = sales[(sales['date'] >= start) & (sales['date'] <= end)]
+    totals = dm.time_index('campaign_sales').totals(start, end).set_index('campaign')
+    expected = window.groupby('campaign', observed=True)[['orders', 'revenue']].sum()
+    assert np.allclose(totals.loc[expected.index].to_numpy(), expected.to_numpy())
+    assert np.isclose(dm.time_index('payouts').total()['total_payout'], dm.cube.total_cost())
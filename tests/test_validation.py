@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+from data_processing.schema import apply_schema
+from data_processing.validation import validate_tables
+
+
+@pytest.fixture
+def tables():
+    return {
+        'influencers': pd.DataFrame({'id': [1, 2], 'name': ['A', 'B']}),
+        'posts': pd.DataFrame({'id': [1, 2], 'influencer_id': [1, 2]}),
+        'tracking': pd.DataFrame({'id': [1, 2, 3], 'influencer_id': [1, 2, 2],
+                                  'date': pd.to_datetime(['2024-01-01'] * 3),
+                                  'orders': [1, 2, 3], 'revenue': [10.0, 20.0, 30.0]}),
+        'payouts': pd.DataFrame({'id': [1], 'influencer_id': [1], 'total_payout': [5.0],
+                                 'payment_date': pd.to_datetime(['2024-01-02'])}),
+    }
+
+
+def issues_by_check(report):
+    return {(issue.table, issue.check, issue.column): issue for issue in report.issues}
+
+
+def test_clean_tables_pass(tables):
+    report = validate_tables(tables)
+    assert report.valid
+    assert report.messages() == []
+
+
+def test_missing_table_and_columns(tables):
+    tables['payouts'] = None
+    assert validate_tables(tables).messages() == ["Payouts data not loaded"]
+    tables['payouts'] = pd.DataFrame({'id': [1]})
+    issue, = validate_tables(tables).issues
+    assert issue.check == 'columns'
+    assert 'influencer_id' in issue.message
+
+
+def test_row_checks_report_counts_and_samples(tables):
+    tables['tracking'] = apply_schema(pd.DataFrame({
+        'id': [1, 2, 2, 4],
+        'influencer_id': [1, 9, 2, None],
+        'date': ['2024-01-01', 'not a date', '2024-01-02', '2024-01-03'],
+        'orders': [1, 2, -1, 3],
+        'revenue': [10.0, -5.0, 20.0, 'n/a'],
+    }), 'tracking')
+    found = issues_by_check(validate_tables(tables))
+    assert found['tracking', 'unique', 'id'].count == 2
+    assert list(found['tracking', 'unique', 'id'].sample.index) == [1, 2]
+    assert found['tracking', 'foreign_key', 'influencer_id'].count == 2
+    assert found['tracking', 'dtype', 'influencer_id'].count == 1
+    assert found['tracking', 'date', 'date'].count == 1
+    assert found['tracking', 'dtype', 'revenue'].count == 1
+    assert list(found['tracking', 'non_negative', 'revenue'].sample.index) == [1]
+    assert found['tracking', 'non_negative', 'orders'].count == 1
+
+
+def test_posts_with_unknown_influencer(tables):
+    tables['posts'] = pd.DataFrame({'id': [1, 2], 'influencer_id': [1, 3]})
+    issue, = validate_tables(tables).issues
+    assert issue.message == "posts: 1 row with an 'influencer_id' not found in influencers"
+    assert issue.sample['influencer_id'].tolist() == [3]
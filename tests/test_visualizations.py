@@ -0,0 +1,81 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from utils.visualizations import FigureCache, _compact_numeric, downsample_series, lttb_indices, normalize_filters
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    y = np.sin(np.arange(10_000) / 300)
+    y[4321] = 25
+    idx = lttb_indices(np.arange(10_000), y, 200)
+    assert len(idx) == 200
+    assert idx[0] == 0 and idx[-1] == 9_999
+    assert np.all(np.diff(idx) > 0)
+    assert 4321 in idx
+
+
+def test_lttb_leaves_short_series_alone():
+    assert lttb_indices(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_downsample_series_caps_each_trace():
+    df = pd.DataFrame({
+        'date': pd.date_range('2020-01-01', periods=3000, freq='D'),
+        'orders': np.random.default_rng(0).random(3000),
+        'revenue': np.random.default_rng(1).random(3000),
+    }).iloc[::-1]
+    sampled = downsample_series(df, 'date', ['orders', 'revenue'], max_points=500)
+    assert len(sampled) <= 500
+    assert sampled['date'].is_monotonic_increasing
+    assert sampled['date'].iloc[0] == df['date'].min()
+
+
+def test_compact_numeric_narrows_numbers_only():
+    df = pd.DataFrame({'a': [1, 2], 'b': [0.5, None], 'c': ['x', 'y'], 'd': [True, False],
+                       'e': pd.array([1, None], dtype='Int64'), 'f': [1, 2**40]})
+    dtypes = _compact_numeric(df).dtypes
+    assert (dtypes['a'], dtypes['b']) == (np.dtype('int32'), np.dtype('float32'))
+    assert (dtypes['e'], dtypes['f']) == (np.dtype('float32'), np.dtype('int64'))
+    assert dtypes['d'] == np.dtype('bool')
+
+
+def test_compact_numeric_keeps_amounts_exact():
+    df = pd.DataFrame({'revenue': [6_011_597.45, 312_456_789.12], 'roas': [1.23, 4.5]})
+    compact = _compact_numeric(df)
+    assert compact['revenue'].dtype == np.dtype('float64')
+    assert compact['revenue'].tolist() == df['revenue'].tolist()
+    assert compact['roas'].tolist() == df['roas'].tolist()
+
+
+def test_figure_cache_builds_once_and_evicts_least_recent():
+    cache = FigureCache(max_entries=2)
+    builds = []
+
+    def build(name):
+        return lambda: builds.append(name) or (px.bar(x=[name], y=[1]), f"note {name}")
+
+    first = cache.get_or_build('a', build('a'))
+    assert cache.get_or_build('a', build('a')) is first and first.note == 'note a' and first.payload > 0
+    cache.get_or_build('b', build('b'))
+    cache.get_or_build('a', build('a'))
+    cache.get_or_build('c', build('c'))
+    # 'b' was least recently used when 'c' arrived
+    cache.get_or_build('b', build('b'))
+    assert builds == ['a', 'b', 'c', 'b']
+    assert (cache.hits, cache.misses, len(cache)) == (2, 4, 2)
+
+
+def test_figure_cache_respects_byte_budget():
+    cache = FigureCache(max_entries=10, max_bytes=1)
+    cache.get_or_build('a', lambda: px.bar(x=[1], y=[1]))
+    cache.get_or_build('b', lambda: px.bar(x=[2], y=[2]))
+    # The newest figure is kept even when it alone exceeds the budget
+    assert len(cache) == 1 and cache.nbytes == cache.get_or_build('b', None).payload
+
+
+def test_normalize_filters_is_order_independent_and_hashable():
+    first = normalize_filters({'campaign': 'All', 'date_range': (date(2024, 1, 1), pd.Timestamp('2024-02-01'))})
+    second = normalize_filters({'date_range': [date(2024, 1, 1), date(2024, 2, 1)], 'campaign': 'All'})
+    assert first == second
+    assert hash(normalize_filters({'followers': (np.int64(1), np.int64(5)), 'ids': {3, 1}}))
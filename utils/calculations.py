@@ -1,42 +1,126 @@
+import numpy as np
 import pandas as pd
+from utils.instrumentation import traced
+
+
+def _safe_divide(numerator, denominator, scale: float = 1.0):
+    """Element-wise numerator / denominator * scale, with 0.0 wherever the denominator is 0.
+
+    Returns a Series aligned to the first Series argument, otherwise an ndarray.
+    """
+    num = np.asarray(numerator, dtype='float64')
+    den = np.asarray(denominator, dtype='float64')
+    result = np.zeros(np.broadcast(num, den).shape)
+    np.divide(num, den, out=result, where=den != 0)
+    if scale != 1.0:
+        result *= scale
+    for arg in (numerator, denominator):
+        if isinstance(arg, pd.Series):
+            return pd.Series(result, index=arg.index)
+    return result
 
 # ROAS calculations
+@traced
 def calculate_roas(revenue: float, cost: float) -> float:
     if cost == 0:
         return 0.0
     return revenue / cost
 
+@traced
 def calculate_incremental_roas(campaign_revenue: float, baseline_revenue: float, campaign_cost: float) -> float:
     incremental = campaign_revenue - baseline_revenue
     if campaign_cost == 0:
         return 0.0
     return incremental / campaign_cost
 
+@traced
+def calculate_roas_array(revenue, cost):
+    """Vectorized calculate_roas over Series or arrays"""
+    return _safe_divide(revenue, cost)
+
+@traced
+def calculate_incremental_roas_array(campaign_revenue, baseline_revenue, campaign_cost):
+    """Vectorized calculate_incremental_roas; baseline may be a scalar or an array"""
+    incremental = np.asarray(campaign_revenue, dtype='float64') - np.asarray(baseline_revenue, dtype='float64')
+    if isinstance(campaign_revenue, pd.Series):
+        incremental = pd.Series(incremental, index=campaign_revenue.index)
+    return _safe_divide(incremental, campaign_cost)
+
+@traced
 def calculate_platform_roas(df: pd.DataFrame) -> pd.DataFrame:
-    metrics = df.groupby('platform').agg({'revenue': 'sum', 'total_payout': 'sum'}).reset_index()
-    metrics['roas'] = metrics.apply(lambda x: calculate_roas(x['revenue'], x['total_payout']), axis=1)
+    metrics = df.groupby('platform', observed=True).agg({'revenue': 'sum', 'total_payout': 'sum'}).reset_index()
+    metrics['roas'] = calculate_roas_array(metrics['revenue'], metrics['total_payout'])
     return metrics
 
 # Engagement and conversion
 
+@traced
 def calculate_engagement_rate(likes: int, comments: int, reach: int) -> float:
     if reach == 0:
         return 0.0
     return ((likes + comments) / reach) * 100.0
 
+@traced
 def calculate_conversion_rate(orders: int, reach: int) -> float:
     if reach == 0:
         return 0.0
     return (orders / reach) * 100.0
 
+@traced
+def calculate_engagement_rate_array(likes, comments, reach):
+    """Vectorized calculate_engagement_rate over Series or arrays"""
+    engagements = np.asarray(likes, dtype='float64') + np.asarray(comments, dtype='float64')
+    if isinstance(likes, pd.Series):
+        engagements = pd.Series(engagements, index=likes.index)
+    return _safe_divide(engagements, reach, 100.0)
+
+@traced
+def calculate_conversion_rate_array(orders, reach):
+    """Vectorized calculate_conversion_rate over Series or arrays"""
+    return _safe_divide(orders, reach, 100.0)
+
+@traced
+def funnel_rates(funnel: pd.DataFrame) -> pd.DataFrame:
+    """Add engagement and conversion rates (percent of reach) to summed funnel counts"""
+    funnel['engagement_rate'] = _safe_divide(funnel['engagements'], funnel['reach'], 100.0)
+    funnel['conversion_rate'] = calculate_conversion_rate_array(funnel['orders'], funnel['reach'])
+    return funnel
+
+@traced
+def build_conversion_funnel(post_cells: pd.DataFrame, sales_cells: pd.DataFrame, keys) -> pd.DataFrame:
+    """Reach -> engagements -> orders -> revenue per key cell.
+
+    Both inputs are already aggregated to keys, so one outer join on the
+    unique keys aligns them; cells with posts but no sales, or sales but no
+    posts, keep zeros on the missing side.
+    """
+    funnel = post_cells[keys + ['posts', 'reach', 'engagements']].merge(
+        sales_cells[keys + ['orders', 'revenue']], on=keys, how='outer')
+    for col in ('posts', 'reach', 'engagements', 'orders'):
+        funnel[col] = funnel[col].fillna(0).astype('int64')
+    funnel['revenue'] = funnel['revenue'].fillna(0.0)
+    return funnel_rates(funnel)
+
+@traced
+def build_post_performance(attributed: pd.DataFrame, cost_cells: pd.DataFrame, keys) -> pd.DataFrame:
+    """Attributed revenue per post with its share of payouts and its ROAS.
+
+    cost_cells holds payouts summed to keys; each cell is split evenly
+    across the posts sharing its keys.
+    """
+    posts = attributed.copy()
+    share = posts.groupby(keys, observed=True, dropna=False)['post_id'].transform('size').to_numpy()
+    cost = posts[keys].merge(cost_cells[keys + ['total_payout']], on=keys, how='left')['total_payout']
+    posts['cost'] = cost.fillna(0.0).to_numpy() / share
+    posts['roas'] = calculate_roas_array(posts['revenue'], posts['cost'])
+    return posts
+
+@traced
 def analyze_influencer_performance(posts_df: pd.DataFrame, tracking_df: pd.DataFrame, payouts_df: pd.DataFrame) -> pd.DataFrame:
     """Comprehensive influencer performance analysis"""
     # Calculate engagement rate per post
     posts = posts_df.copy()
-    posts['engagement_rate'] = posts.apply(
-        lambda x: calculate_engagement_rate(x['likes'], x['comments'], x['reach']),
-        axis=1
-    )
+    posts['engagement_rate'] = calculate_engagement_rate_array(posts['likes'], posts['comments'], posts['reach'])
     # Aggregate post metrics by influencer
     influencer_posts = posts.groupby('influencer_id').agg(
         reach=('reach', 'sum'),
@@ -55,8 +139,5 @@ def analyze_influencer_performance(posts_df: pd.DataFrame, tracking_df: pd.DataF
     perf['revenue'] = perf['revenue'].fillna(0)
     perf['total_payout'] = perf['total_payout'].fillna(0)
     # Calculate ROAS
-    perf['roas'] = perf.apply(
-        lambda x: calculate_roas(x['revenue'], x['total_payout']),
-        axis=1
-    )
+    perf['roas'] = calculate_roas_array(perf['revenue'], perf['total_payout'])
     return perf
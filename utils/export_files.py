@@ -0,0 +1,94 @@
+"""
+One bounded directory for the files exports and PDF reports are written to
+
+Sessions keep prepared files until the data changes, but Streamlit gives no
+hook for a session ending, so files of abandoned sessions would otherwise
+stay in the temp directory for good. Every new export file is created here,
+and creating one first sweeps the directory: files older than
+EXPORT_MAX_AGE_SECONDS go, then the oldest files until the rest fit in
+EXPORT_DIR_BYTES. Files still being written by this process are never
+swept, and the size cap never takes a file modified within
+EXPORT_GRACE_SECONDS, so another session's export is neither cut off
+mid-write nor removed before it can be downloaded. Pages treat a file that
+was swept as never prepared.
+"""
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+EXPORT_DIR = Path(os.environ.get('ANALYTICS_EXPORT_DIR', Path(tempfile.gettempdir()) / 'analytics_exports'))
+EXPORT_MAX_AGE_SECONDS = float(os.environ.get('ANALYTICS_EXPORT_MAX_AGE_MIN', '60')) * 60
+EXPORT_DIR_BYTES = int(float(os.environ.get('ANALYTICS_EXPORT_DIR_MB', '2048')) * 1024 * 1024)
+EXPORT_GRACE_SECONDS = float(os.environ.get('ANALYTICS_EXPORT_GRACE_MIN', '10')) * 60
+
+# Files this process created and has not finished writing
+_writing = set()
+_writing_lock = threading.Lock()
+
+
+def finished(path):
+    """Mark a file from new_export_file as complete, so sweeps may remove it once it ages"""
+    with _writing_lock:
+        _writing.discard(os.fspath(path))
+
+
+def discard(path):
+    """Remove a file if it is still there"""
+    finished(path)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def sweep(directory=None, max_age: float = None, max_bytes: int = None, grace: float = None) -> int:
+    """Remove expired files, then the oldest ones past the grace period until the rest fit.
+
+    Files still being written are skipped. Returns the number removed.
+    """
+    directory = Path(directory or EXPORT_DIR)
+    max_age = EXPORT_MAX_AGE_SECONDS if max_age is None else max_age
+    max_bytes = EXPORT_DIR_BYTES if max_bytes is None else max_bytes
+    grace = EXPORT_GRACE_SECONDS if grace is None else grace
+    with _writing_lock:
+        writing = set(_writing)
+    files = []
+    for entry in os.scandir(directory) if directory.is_dir() else ():
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        if entry.is_file():
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort()
+    now = time.time()
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for mtime, size, path in files:
+        age = now - mtime
+        # Files are sorted oldest first, so every later file is kept for the same reason
+        if age <= max_age and (total <= max_bytes or age <= grace):
+            break
+        if path in writing:
+            continue
+        discard(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def new_export_file(suffix: str, prefix: str, directory=None) -> str:
+    """Path of a new empty file in the export directory, swept first.
+
+    Sweeps skip the file until it is passed to finished() or discard().
+    """
+    directory = Path(directory or EXPORT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    sweep(directory)
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix=prefix, dir=directory)
+    os.close(fd)
+    with _writing_lock:
+        _writing.add(path)
+    return path
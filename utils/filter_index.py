@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ['brand', 'platform', 'campaign', 'product', 'category']
+# Date ranges covering more than 1/DENSE_RANGE_FRACTION of the rows skip the sort of their positions
+DENSE_RANGE_FRACTION = 16
+
+
+def _intersect_sorted(small: np.ndarray, large: np.ndarray) -> np.ndarray:
+    """Elements of sorted `small` that also appear in sorted `large`, by binary search"""
+    if len(small) == 0 or len(large) == 0:
+        return small[:0]
+    idx = np.searchsorted(large, small)
+    idx[idx == len(large)] = 0
+    return small[large[idx] == small]
+
+
+class FilterIndex:
+    """Row positions per filter value plus a sorted date index, built once per dataset.
+
+    A filter combination resolves to a single array of row positions, so the
+    frame is sliced once instead of being copied and masked per filter.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns=FILTER_COLUMNS, date_column: str = 'date'):
+        self.n_rows = len(df)
+        self.options = {}
+        self._positions = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col])
+            # Stable sort keeps each value's positions in ascending row order
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            start = int((codes < 0).sum())
+            positions = {}
+            for value, count in zip(uniques, counts):
+                positions[value] = order[start:start + count]
+                start += count
+            self._positions[col] = positions
+            self.options[col] = sorted(positions)
+        self.date_column = date_column if date_column in df.columns else None
+        if self.date_column is not None:
+            dates = pd.to_datetime(df[date_column]).to_numpy(dtype='datetime64[ns]')
+            self._date_order = np.argsort(dates, kind='stable')
+            self._sorted_dates = dates[self._date_order]
+            valid = self._sorted_dates[~np.isnat(self._sorted_dates)]
+            self.date_min = pd.Timestamp(valid[0]) if len(valid) else None
+            self.date_max = pd.Timestamp(valid[-1]) if len(valid) else None
+
+    def value_positions(self, column: str, value) -> np.ndarray:
+        """Sorted row positions holding value in column"""
+        return self._positions[column].get(value, np.empty(0, dtype=np.intp))
+
+    def date_positions(self, start, end) -> np.ndarray:
+        """Sorted row positions with start <= date <= end, found by binary search"""
+        lo = np.searchsorted(self._sorted_dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+        hi = np.searchsorted(self._sorted_dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right')
+        if (hi - lo) * DENSE_RANGE_FRACTION < self.n_rows:
+            return np.sort(self._date_order[lo:hi])
+        # Wide ranges are put back in row order by marking them, which is linear rather than a sort
+        selected = np.zeros(self.n_rows, dtype=bool)
+        selected[self._date_order[lo:hi]] = True
+        return np.flatnonzero(selected)
+
+    def day_positions(self, start_day, end_day) -> np.ndarray:
+        """Sorted row positions whose date falls on a day from start_day to end_day, inclusive"""
+        end = pd.Timestamp(end_day) + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+        return self.date_positions(pd.Timestamp(start_day), end)
+
+    def select(self, values: dict = None, date_range=None):
+        """Row positions matching every given filter, or None when nothing is filtered.
+
+        `values` maps column to a selected value; 'All' and None are ignored.
+        """
+        selections = [
+            self.value_positions(col, value)
+            for col, value in (values or {}).items()
+            if value not in (None, 'All') and col in self._positions
+        ]
+        if date_range is not None and self.date_column is not None:
+            selections.append(self.date_positions(*date_range))
+        if not selections:
+            return None
+        selections.sort(key=len)
+        result = selections[0]
+        for other in selections[1:]:
+            result = _intersect_sorted(result, other)
+        return result
@@ -0,0 +1,181 @@
+"""
+Timing and memory instrumentation of the data manager, pages and calculations
+
+Functions wrapped with `traced` (and classes with `trace_methods`) report
+each call to the Recorder active in the current context: wall time, time
+spent outside traced callees, rows of the DataFrames and Series passed in
+and returned, and the memory of the returned frames. With no recorder
+active a wrapped call costs one ContextVar lookup.
+
+The sidebar's Debug Timings panel (components/debug_panel.py) turns
+recording on for a session; it starts on when ANALYTICS_PROFILE=1.
+Recordings export as JSON or as a Chrome trace (open in chrome://tracing or
+https://ui.perfetto.dev).
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import pandas as pd
+
+PROFILE_DEFAULT = os.environ.get('ANALYTICS_PROFILE', '0') == '1'
+MAX_EVENTS = 20_000
+
+_active = ContextVar('analytics_recorder', default=None)
+
+
+def _rows(value) -> int:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_rows(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_rows(item) for item in value.values())
+    return 0
+
+
+def _frame_bytes(value) -> int:
+    # Shallow sizes: a deep scan of string columns would cost more than the step
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=False))
+    if isinstance(value, (tuple, list)):
+        return sum(_frame_bytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_frame_bytes(item) for item in value.values())
+    return 0
+
+
+class Recorder:
+    """Call events of one session, newest MAX_EVENTS kept"""
+
+    def __init__(self, max_events: int = MAX_EVENTS):
+        self.events = deque(maxlen=max_events)
+        self._stack = []
+        self._origin = time.perf_counter_ns()
+
+    def call(self, name: str, category: str, func, args, kwargs):
+        rows_in = _rows(args) + _rows(kwargs)
+        # Each open call accumulates the time of its traced callees
+        self._stack.append(0)
+        start = time.perf_counter_ns()
+        error = None
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except BaseException as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            duration = time.perf_counter_ns() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += duration
+            self.events.append({
+                'name': name,
+                'category': category,
+                'start_us': (start - self._origin) / 1000,
+                'duration_ms': duration / 1e6,
+                'self_ms': (duration - children) / 1e6,
+                'depth': len(self._stack),
+                'thread': threading.get_ident(),
+                'rows_in': rows_in,
+                'rows_out': _rows(result),
+                'bytes_out': _frame_bytes(result),
+                'error': error,
+            })
+
+    def clear(self):
+        self.events.clear()
+
+    def summary(self) -> pd.DataFrame:
+        """Per-step call counts, times, rows and returned memory, slowest total first"""
+        columns = ['name', 'category', 'calls', 'total_ms', 'self_ms', 'mean_ms', 'max_ms', 'rows_in', 'rows_out', 'bytes_out']
+        if not self.events:
+            return pd.DataFrame(columns=columns)
+        events = pd.DataFrame(list(self.events))
+        summary = events.groupby(['name', 'category'], sort=False).agg(
+            calls=('duration_ms', 'size'),
+            total_ms=('duration_ms', 'sum'),
+            self_ms=('self_ms', 'sum'),
+            mean_ms=('duration_ms', 'mean'),
+            max_ms=('duration_ms', 'max'),
+            rows_in=('rows_in', 'max'),
+            rows_out=('rows_out', 'max'),
+            bytes_out=('bytes_out', 'max'),
+        ).reset_index()
+        return summary.sort_values('total_ms', ascending=False, ignore_index=True)[columns]
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'events': list(self.events),
+            'summary': self.summary().to_dict(orient='records'),
+        }, indent=2, default=str)
+
+    def to_chrome_trace(self) -> str:
+        """Complete ('X') events in the Trace Event Format"""
+        pid = os.getpid()
+        trace = [{
+            'name': event['name'],
+            'cat': event['category'],
+            'ph': 'X',
+            'ts': event['start_us'],
+            'dur': event['duration_ms'] * 1000,
+            'pid': pid,
+            'tid': event['thread'],
+            'args': {key: event[key] for key in ('rows_in', 'rows_out', 'bytes_out', 'error')},
+        } for event in self.events]
+        return json.dumps({'traceEvents': trace, 'displayTimeUnit': 'ms'})
+
+
+@contextmanager
+def recording(recorder):
+    """Report traced calls in this context to recorder; None records nothing"""
+    token = _active.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _active.reset(token)
+
+
+def traced(func=None, *, name: str = None, category: str = 'calculation'):
+    """Decorator reporting each call of func to the active recorder"""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _active.get()
+            if recorder is None:
+                return func(*args, **kwargs)
+            return recorder.call(label, category, func, args, kwargs)
+        wrapper.traced = True
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+def trace_methods(category: str, exclude=()):
+    """Class decorator tracing every method the class defines, except dunders and exclude.
+
+    Methods already traced are left alone, so applying it again (as a
+    rerun of the Streamlit script does) adds no second layer.
+    """
+    def decorate(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('__') or attr in exclude:
+                continue
+            if isinstance(value, (staticmethod, classmethod)):
+                if not getattr(value.__func__, 'traced', False):
+                    wrapped = traced(value.__func__, name=f"{cls.__name__}.{attr}", category=category)
+                    setattr(cls, attr, type(value)(wrapped))
+            elif callable(value) and not isinstance(value, type) and not getattr(value, 'traced', False):
+                setattr(cls, attr, traced(value, name=f"{cls.__name__}.{attr}", category=category))
+        return cls
+    return decorate
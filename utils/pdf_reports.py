@@ -0,0 +1,237 @@
+"""
+Paginated PDF reports of whole tables, rendered off the Streamlit script thread
+
+Rows are formatted and drawn one page chunk at a time, and each finished
+page is compressed and written to the file before the next is drawn. A
+ReportLab canvas keeps every page until it saves, so its memory grows with
+the report; the small writer here keeps only the byte offsets of the
+objects already written, so memory stays flat however many rows there are.
+Pages use the standard Helvetica fonts, which PDF viewers supply. Every
+page repeats the title and column header.
+Reports run on a small process-wide worker pool; the page polls the job for
+progress and offers the file once it is finished.
+"""
+import os
+import threading
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from data_processing.sql_backend import iter_frames
+from utils.export_files import discard, finished, new_export_file
+
+PAGE_SIZE = landscape(letter)
+MARGIN = 36
+FONT = 'Helvetica'
+FONT_SIZE = 7
+ROW_HEIGHT = 11
+# Rows per page that fit under the title and header at ROW_HEIGHT
+ROWS_PER_PAGE = int((PAGE_SIZE[1] - 2 * MARGIN - 3 * ROW_HEIGHT) // ROW_HEIGHT)
+# Pages of rows formatted together; per-call pandas overhead dominates a single page
+FORMAT_PAGES = 50
+REPORT_WORKERS = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _format_chunk(chunk: pd.DataFrame, max_chars: int):
+    """Cell text per column of chunk, truncated to fit the column width"""
+    columns = []
+    for col in chunk.columns:
+        values = chunk[col]
+        if pd.api.types.is_float_dtype(values):
+            text = values.map('{:,.2f}'.format)
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            text = values.dt.strftime('%Y-%m-%d')
+        else:
+            text = values.astype(str)
+        columns.append(text.where(values.notna(), '').str.slice(0, max_chars).tolist())
+    return columns
+
+
+def _pdf_string(text: str) -> bytes:
+    """text as a PDF string literal in the fonts' WinAnsi encoding"""
+    data = text.encode('cp1252', errors='replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _color(color, operator: str) -> bytes:
+    return ('%.3f %.3f %.3f ' % color.rgb()).encode() + operator.encode()
+
+
+class _PDFWriter:
+    """Writes a PDF one page at a time, keeping only the offsets of written objects"""
+
+    # Object numbers fixed up front; pages and their content streams follow
+    CATALOG, PAGES, FONT, BOLD_FONT, INFO = range(1, 6)
+
+    def __init__(self, file, title: str):
+        self.file = file
+        # Byte offset of each object, by object number; 8 bytes per object
+        self.offsets = array('q', [0] * (self.INFO + 1))
+        file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        for number, name in ((self.FONT, FONT), (self.BOLD_FONT, FONT + '-Bold')):
+            self._object(number, f'<< /Type /Font /Subtype /Type1 /BaseFont /{name} /Encoding /WinAnsiEncoding >>'.encode())
+        self._object(self.INFO, b'<< /Title ' + _pdf_string(title) + b' /Producer (Influencer Campaign Analytics) >>')
+
+    def _object(self, number: int, body: bytes):
+        self.offsets[number] = self.file.tell()
+        self.file.write(f'{number} 0 obj\n'.encode() + body + b'\nendobj\n')
+
+    def add_page(self, content: bytes):
+        stream = zlib.compress(content)
+        contents, page = len(self.offsets), len(self.offsets) + 1
+        self.offsets.extend((0, 0))
+        self._object(contents, f'<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n'.encode() + stream + b'\nendstream')
+        width, height = PAGE_SIZE
+        self._object(page, (
+            f'<<\n/Type /Page\n/Parent {self.PAGES} 0 R\n/MediaBox [0 0 {width:g} {height:g}]\n'
+            f'/Resources << /Font << /F1 {self.FONT} 0 R /F2 {self.BOLD_FONT} 0 R >> >>\n/Contents {contents} 0 R\n>>'
+        ).encode())
+
+    def close(self):
+        # Pages follow the fixed objects as (contents, page) pairs, so their numbers need not be kept
+        pages = range(self.INFO + 2, len(self.offsets), 2)
+        self.offsets[self.PAGES] = self.file.tell()
+        self.file.write(f'{self.PAGES} 0 obj\n<< /Type /Pages /Kids ['.encode())
+        for page in pages:
+            self.file.write(f'{page} 0 R '.encode())
+        self.file.write(f'] /Count {len(pages)} >>\nendobj\n'.encode())
+        self._object(self.CATALOG, f'<< /Type /Catalog /Pages {self.PAGES} 0 R >>'.encode())
+        xref = self.file.tell()
+        self.file.write(f'xref\n0 {len(self.offsets)}\n0000000000 65535 f \n'.encode())
+        for number in range(1, len(self.offsets)):
+            self.file.write(f'{self.offsets[number]:010d} 00000 n \n'.encode())
+        self.file.write(f'trailer\n<< /Size {len(self.offsets)} /Root {self.CATALOG} 0 R /Info {self.INFO} 0 R >>\n'
+                        f'startxref\n{xref}\n%%EOF\n'.encode())
+
+
+def _text(x: float, y: float, font: str, size: float, line: str) -> bytes:
+    return f'BT /{font} {size:g} Tf {x:.2f} {y:.2f} Td '.encode() + _pdf_string(line) + b' Tj ET\n'
+
+
+def _draw_page(title: str, header, columns, rows: int, page: int, pages: int, col_width: float) -> bytes:
+    """Content stream of one page"""
+    width, height = PAGE_SIZE
+    left = MARGIN
+    top = height - MARGIN
+    ops = [_color(colors.black, 'rg\n'), _text(left, top - ROW_HEIGHT, 'F2', FONT_SIZE + 3, title)]
+    number = f"Page {page} of {pages}"
+    ops.append(_text(width - MARGIN - stringWidth(number, FONT, FONT_SIZE), top - ROW_HEIGHT, 'F1', FONT_SIZE, number))
+
+    y = top - 3 * ROW_HEIGHT
+    ops.append(_color(colors.grey, 'rg\n'))
+    ops.append(f'{left:.2f} {y - 3:.2f} {col_width * len(header):.2f} {ROW_HEIGHT} re f\n'.encode())
+    ops.append(_color(colors.whitesmoke, 'rg\n'))
+    for i, name in enumerate(header):
+        ops.append(_text(left + 2 + i * col_width, y, 'F2', FONT_SIZE, name))
+
+    ops.append(_color(colors.black, 'rg\n'))
+    # One text object per column keeps the drawing operators per page constant
+    for i, cells in enumerate(columns):
+        ops.append(f'BT /F1 {FONT_SIZE} Tf {ROW_HEIGHT} TL {left + 2 + i * col_width:.2f} {y - ROW_HEIGHT:.2f} Td\n'.encode())
+        ops.append(b' Tj T*\n'.join(_pdf_string(cell) for cell in cells) + b' Tj\nET\n')
+    ops.append(_color(colors.lightgrey, 'RG\n'))
+    right = left + col_width * len(header)
+    for n in range(1, rows + 1):
+        line_y = y - 3 - n * ROW_HEIGHT
+        ops.append(f'{left:.2f} {line_y:.2f} m {right:.2f} {line_y:.2f} l\n'.encode())
+    if rows:
+        ops.append(b'S\n')
+    return b''.join(ops)
+
+
+def write_pdf_report(df, target, title: str, rows_per_page: int = ROWS_PER_PAGE):
+    """Render every row of df, a DataFrame or SQLStore, as a paginated PDF, yielding rows written after each page"""
+    if isinstance(target, os.PathLike):
+        target = os.fspath(target)
+    header = [str(col) for col in df.columns]
+    col_width = (PAGE_SIZE[0] - 2 * MARGIN) / max(len(header), 1)
+    # Helvetica averages about half an em per character
+    max_chars = max(int(col_width / (FONT_SIZE * 0.55)) - 1, 1)
+    header = [name[:max_chars] for name in header]
+    pages = max(-(-len(df) // rows_per_page), 1)
+    subtitle = f"{title} · {len(df):,} rows · generated {datetime.now():%Y-%m-%d %H:%M}"
+    with open(target, 'wb') as file:
+        pdf = _PDFWriter(file, title)
+        if len(df) == 0:
+            pdf.add_page(_draw_page(subtitle, header, [], 0, 1, 1, col_width))
+        written = 0
+        page = 0
+        for chunk in iter_frames(df, rows_per_page * FORMAT_PAGES):
+            columns = _format_chunk(chunk, max_chars)
+            for start in range(0, len(chunk), rows_per_page):
+                rows = min(rows_per_page, len(chunk) - start)
+                page += 1
+                cells = [column[start:start + rows] for column in columns]
+                pdf.add_page(_draw_page(subtitle, header, cells, rows, page, pages, col_width))
+                written += rows
+                yield written
+        pdf.close()
+
+
+class ReportJob:
+    """A PDF report rendering on the worker pool"""
+
+    def __init__(self, title: str, total_rows: int, path: str):
+        self.title = title
+        self.total_rows = total_rows
+        self.path = path
+        self.rows_done = 0
+        self.cancelled = threading.Event()
+        self.future = None
+
+    @property
+    def progress(self) -> float:
+        return self.rows_done / self.total_rows if self.total_rows else 1.0
+
+    @property
+    def status(self) -> str:
+        if self.future is None or not self.future.done():
+            return 'running'
+        if self.cancelled.is_set():
+            return 'cancelled'
+        return 'failed' if self.future.exception() is not None else 'done'
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def discard(self):
+        self.cancel()
+        discard(self.path)
+
+
+def _render(job: ReportJob, df, rows_per_page: int):
+    writer = write_pdf_report(df, job.path, job.title, rows_per_page)
+    try:
+        for done in writer:
+            job.rows_done = done
+            if job.cancelled.is_set():
+                writer.close()
+                job.discard()
+                return
+    except BaseException:
+        job.discard()
+        raise
+    finished(job.path)
+
+
+def _worker_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix='pdf-report')
+        return _pool
+
+
+def start_report(df, title: str, rows_per_page: int = ROWS_PER_PAGE) -> ReportJob:
+    """Queue df for rendering to a PDF file in the export directory and return its job"""
+    path = new_export_file('.pdf', 'report_')
+    job = ReportJob(title, len(df), path)
+    job.future = _worker_pool().submit(_render, job, df, rows_per_page)
+    return job
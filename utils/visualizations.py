@@ -1,45 +1,244 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+import numpy as np
 import streamlit as st
 import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+from utils.filter_index import FilterIndex
 
-def create_dynamic_filters(df: pd.DataFrame):
-    """Create filter widgets and apply to df"""
+# Points per line series sent to the browser; longer series are downsampled with LTTB
+LINE_POINT_BUDGET = 2000
+# Scatters with more points render as WebGL traces
+WEBGL_THRESHOLD = 1000
+# Built figures kept across reruns and sessions, least recently used evicted first
+FIGURE_CACHE_SIZE = int(os.environ.get('ANALYTICS_FIGURE_CACHE_SIZE', 256))
+FIGURE_CACHE_BYTES = int(os.environ.get('ANALYTICS_FIGURE_CACHE_MB', 128)) * 2**20
+
+
+def lttb_indices(x, y, threshold: int) -> np.ndarray:
+    """Positions of the points Largest-Triangle-Three-Buckets keeps from a series sorted by x.
+
+    The first and last points are always kept; each bucket in between keeps
+    the point forming the largest triangle with the previously kept point
+    and the average of the next bucket, which preserves peaks and troughs.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x)
+    x = x.view('int64') if np.issubdtype(x.dtype, np.datetime64) else x
+    x = x.astype('float64')
+    y = np.nan_to_num(np.asarray(y, dtype='float64'))
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_series(df: pd.DataFrame, x: str, y, max_points: int = LINE_POINT_BUDGET) -> pd.DataFrame:
+    """Rows of df, sorted by x, that LTTB keeps for any of the y columns.
+
+    Each y column gets an equal share of max_points, so every trace drawn
+    from the result has at most max_points points.
+    """
+    columns = [y] if isinstance(y, str) else list(y)
+    if len(df) <= max_points:
+        return df
+    if not df[x].is_monotonic_increasing:
+        df = df.sort_values(x)
+    per_series = max(max_points // len(columns), 3)
+    keep = np.unique(np.concatenate([
+        lttb_indices(df[x].to_numpy(), df[col].to_numpy(), per_series) for col in columns
+    ]))
+    return df.iloc[keep]
+
+
+class CachedFigure:
+    """A built figure with its note and the size of its JSON payload"""
+
+    __slots__ = ('fig', 'note', 'payload')
+
+    def __init__(self, fig, note: str = None):
+        self.fig = fig
+        self.note = note
+        self.payload = len(pio.to_json(fig, validate=False))
+
+
+def _cached_figure(built) -> CachedFigure:
+    return CachedFigure(*built) if isinstance(built, tuple) else CachedFigure(built)
+
+
+class FigureCache:
+    """Process-wide LRU of built figures keyed by data, page, chart and filter values.
+
+    Bounded by entry count and by the total size of the figures' JSON.
+    Figures are treated as read-only once cached, so sessions looking at
+    the same data and filters share them.
+    """
+
+    def __init__(self, max_entries: int = FIGURE_CACHE_SIZE, max_bytes: int = FIGURE_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_build(self, key, build) -> CachedFigure:
+        """The figure cached under key, or the one build() returns, a figure or (figure, note)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = _cached_figure(build())
+        with self._lock:
+            self.misses += 1
+            previous = self._entries.pop(key, None)
+            self.nbytes += entry.payload - (previous.payload if previous else 0)
+            self._entries[key] = entry
+            # The payload size stands in for the memory the figure holds
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+                self.nbytes -= self._entries.popitem(last=False)[1].payload
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+figure_cache = FigureCache()
+
+
+def normalize_filters(value):
+    """Filter widget values as a hashable key; equal selections give equal keys"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), normalize_filters(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(normalize_filters(v) for v in value))
+    if isinstance(value, (list, tuple, pd.Index, pd.Series, np.ndarray)):
+        return tuple(normalize_filters(v) for v in value)
+    if isinstance(value, date):
+        # Dates and timestamps of the same day compare equal
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def figure_key(dm, page: str, chart: str, **filters) -> tuple:
+    """Figure cache key: the data manager's data, the page and chart, and the filter values"""
+    return (dm.data_key(), page, chart, normalize_filters(filters))
+
+
+def _render(entry: CachedFigure, key: str = None):
+    st.plotly_chart(entry.fig, use_container_width=True, key=key)
+    st.caption(f"📦 {entry.payload / 1024:,.1f} KB sent" + (f" · {entry.note}" if entry.note else ''))
+
+
+def show_chart(fig, key: str = None, note: str = None, cache_key=None):
+    """Render a Plotly figure and report the size of the JSON sent to the browser.
+
+    fig may also be a callable returning the figure or a (figure, note)
+    pair. With cache_key it is only called when no figure is cached under
+    the key, so unchanged charts skip building and serializing.
+    """
+    build = fig if callable(fig) else lambda: (fig, note)
+    entry = _cached_figure(build()) if cache_key is None else figure_cache.get_or_build(cache_key, build)
+    _render(entry, key)
+
+
+def line_figure(df: pd.DataFrame, x: str, y, max_points: int = LINE_POINT_BUDGET, **kwargs):
+    """px.line over an LTTB-downsampled copy of df, with a note on the points kept"""
+    sampled = downsample_series(df, x, y, max_points)
+    note = f"{len(sampled):,} of {len(df):,} points" if len(sampled) < len(df) else None
+    return px.line(sampled, x=x, y=y, **kwargs), note
+
+
+def plot_line(df: pd.DataFrame, x: str, y, key: str = None, max_points: int = LINE_POINT_BUDGET,
+              cache_key=None, **kwargs):
+    """px.line over an LTTB-downsampled copy of df once it exceeds the point budget"""
+    show_chart(lambda: line_figure(df, x, y, max_points, **kwargs), key, cache_key=cache_key)
+
+
+def _compact_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast numeric columns to the narrowest NumPy dtype that holds every value exactly.
+
+    Plotly sends NumPy arrays base64-encoded, so a 32-bit column halves its
+    share of the payload; nullable extension dtypes would otherwise be sent
+    as JSON lists. Values shown in hover labels must not change, so amounts
+    such as revenue that float32 cannot represent stay float64.
+    """
+    columns = {}
+    for col, dtype in df.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype) or not pd.api.types.is_numeric_dtype(dtype):
+            continue
+        values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+        if pd.api.types.is_integer_dtype(dtype) and not np.isnan(values).any():
+            ints = df[col].to_numpy(dtype='int64')
+            fits = not len(ints) or (ints.min() >= np.iinfo('int32').min and ints.max() <= np.iinfo('int32').max)
+            columns[col] = ints.astype('int32') if fits else ints
+        else:
+            narrow = values.astype('float32')
+            columns[col] = narrow if np.array_equal(narrow.astype('float64'), values, equal_nan=True) else values
+    return df.assign(**columns) if columns else df
+
+
+def scatter_figure(df: pd.DataFrame, x: str, y: str, **kwargs):
+    """px.scatter, in WebGL with compact binary arrays above WEBGL_THRESHOLD points, with a note"""
+    webgl = len(df) > WEBGL_THRESHOLD
+    if webgl:
+        df = _compact_numeric(df)
+    fig = px.scatter(df, x=x, y=y, render_mode='webgl' if webgl else 'svg', **kwargs)
+    return fig, f"{len(df):,} points, WebGL" if webgl else None
+
+
+def plot_scatter(df: pd.DataFrame, x: str, y: str, key: str = None, cache_key=None, **kwargs):
+    """px.scatter that switches to WebGL, with compact binary arrays, above WEBGL_THRESHOLD points"""
+    show_chart(lambda: scatter_figure(df, x, y, **kwargs), key, cache_key=cache_key)
+
+
+def filter_widgets(index):
+    """Create filter widgets from an index's options; returns the filters and the complete date range or None.
+
+    index is a FilterIndex or anything with its options, date_min and date_max.
+    """
     # Row 1 filters: Brand, Platform, Campaign, Product
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        brands = ['All'] + sorted(df['brand'].dropna().unique())
-        selected_brand = st.selectbox('Brand', brands)
+        selected_brand = st.selectbox('Brand', ['All'] + index.options.get('brand', []))
     with col2:
-        platforms = ['All'] + sorted(df['platform'].dropna().unique())
-        selected_platform = st.selectbox('Platform', platforms)
+        selected_platform = st.selectbox('Platform', ['All'] + index.options.get('platform', []))
     with col3:
-        campaigns = ['All'] + sorted(df['campaign'].dropna().unique())
-        selected_campaign = st.selectbox('Campaign', campaigns)
+        selected_campaign = st.selectbox('Campaign', ['All'] + index.options.get('campaign', []))
     with col4:
-        products = ['All'] + sorted(df['product'].dropna().unique())
-        selected_product = st.selectbox('Product', products)
+        selected_product = st.selectbox('Product', ['All'] + index.options.get('product', []))
     # Row 2 filters: Category, Date Range
     col5, col6 = st.columns(2)
     with col5:
-        categories = ['All'] + sorted(df['category'].dropna().unique())
-        selected_category = st.selectbox('Category', categories)
+        selected_category = st.selectbox('Category', ['All'] + index.options.get('category', []))
     with col6:
-        date_min = pd.to_datetime(df['date']).min()
-        date_max = pd.to_datetime(df['date']).max()
+        date_min = index.date_min
+        date_max = index.date_max
         selected_dates = st.date_input('Date Range', value=(date_min, date_max), min_value=date_min, max_value=date_max)
-    filtered = df.copy()
-    if selected_brand != 'All':
-        filtered = filtered[filtered['brand'] == selected_brand]
-    if selected_platform != 'All':
-        filtered = filtered[filtered['platform'] == selected_platform]
-    if selected_campaign != 'All':
-        filtered = filtered[filtered['campaign'] == selected_campaign]
-    if selected_product != 'All':
-        filtered = filtered[filtered['product'] == selected_product]
-    if selected_category != 'All':
-        filtered = filtered[filtered['category'] == selected_category]
-    if isinstance(selected_dates, tuple) and len(selected_dates) == 2:
-        filtered['date'] = pd.to_datetime(filtered['date'])
-        filtered = filtered[(filtered['date'] >= pd.to_datetime(selected_dates[0])) & (filtered['date'] <= pd.to_datetime(selected_dates[1]))]
     filters = {
         'brand': selected_brand,
         'platform': selected_platform,
@@ -48,4 +247,18 @@ def create_dynamic_filters(df: pd.DataFrame):
         'category': selected_category,
         'date_range': selected_dates
     }
+    date_range = selected_dates if isinstance(selected_dates, tuple) and len(selected_dates) == 2 else None
+    return filters, date_range
+
+
+def create_dynamic_filters(df: pd.DataFrame, index: FilterIndex = None):
+    """Create filter widgets and apply to df.
+
+    Pass a FilterIndex built once for df to avoid rebuilding it on every rerun.
+    """
+    if index is None:
+        index = FilterIndex(df)
+    filters, date_range = filter_widgets(index)
+    positions = index.select(filters, date_range)
+    filtered = df if positions is None else df.iloc[positions]
     return filtered, filters